@@ -65,6 +65,7 @@ void main(List<String> args) async {
   final automationManager = AutomationManager(dataStorage.dataDir + '/automations.json');
 
   websocketManager.onMoveHuman = thingManager.moveHuman;
+  websocketManager.onDeviceAttributesChanged = thingManager.onDeviceAttributesChanged;
 
   // Set Home Assistant state change callback
   haIntegration.setStateChangeCallback(thingManager.onHaStateChange);
@@ -15,6 +15,7 @@ class EventsController {
     final router = Router();
 
     router.get('/api/events', _getEvents);
+    router.post('/api/events/batch', _addEvents);
 
     return router;
   }
@@ -53,4 +54,21 @@ class EventsController {
 
     return Response.ok(jsonEncode(filteredEvents.map((e) => e.toJson()).toList()), headers: {'Content-Type': 'application/json'});
   }
+
+  Future<Response> _addEvents(Request request) async {
+    try {
+      final payload = await request.readAsString();
+      final List<dynamic> json = jsonDecode(payload);
+      final events = json.map((e) => EventData.fromJson(e as Map<String, dynamic>)).toList();
+
+      // one write to events.json per batch
+      _storage.eventList.addAll(events);
+      _storage.saveEvents();
+
+      return Response.ok(jsonEncode({"status": "success", "added": events.length}), headers: {'Content-Type': 'application/json'});
+    } catch (e) {
+      print("Error adding events: $e");
+      return Response.badRequest(body: jsonEncode({"error": e.toString()}), headers: {'Content-Type': 'application/json'});
+    }
+  }
 }
@@ -247,6 +247,12 @@ class ThingManager {
     return true;
   }
 
+  Future<void> onDeviceAttributesChanged(List<Map<String, dynamic>> changes) async {
+    // Attribute changes pushed by the integration microservices (device_id, name, value, type, timestamp).
+    // Their device ids are not linked to Home Assistant devices, so they are relayed to clients as they are.
+    await _websocketManager.broadcastJson({"type": "device_attributes_changed", "data": changes});
+  }
+
   Future<bool> deleteHuman(String humanId) async {
     final humanToDelete = _storage.humans.firstWhereOrNull((h) => h.id == humanId);
     if (humanToDelete == null) return false;
@@ -12,6 +12,7 @@ class WebsocketManager {
   final Uuid _uuid = Uuid();
 
   void Function(String, double, double)? onMoveHuman;
+  void Function(List<Map<String, dynamic>>)? onDeviceAttributesChanged;
 
   Future<void> addConnection(WebSocketChannel websocket) async {
     final connectionId = _uuid.v4();
@@ -35,6 +36,8 @@ class WebsocketManager {
 
       if (payload['type'] == 'move_human') {
         onMoveHuman?.call(payload['data']['human_id'], payload['data']['x'], payload['data']['y']);
+      } else if (payload['type'] == 'device_attributes_changed') {
+        onDeviceAttributesChanged?.call(List<Map<String, dynamic>>.from(payload['data']));
       }
     } catch (e) {
       print("WS: Unknown message[$e]: $message");
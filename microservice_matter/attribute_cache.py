@@ -0,0 +1,105 @@
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+ClusterKey = Tuple[int, int]
+CachedValue = Tuple[Any, float]
+
+
+def parse_attribute_path(path: str) -> Tuple[int, int, int]:
+    endpoint_id, cluster_id, attribute_id = path.replace('.', '/').split('/')
+    return int(endpoint_id), int(cluster_id), int(attribute_id)
+
+
+def format_timestamp(reported_at: float) -> str:
+    return datetime.fromtimestamp(reported_at).isoformat()
+
+
+class AttributeCache:
+    def __init__(self):
+        # node_id -> (endpoint_id, cluster_id) -> attribute_id -> (value, reported_at)
+        self.nodes: Dict[int, Dict[ClusterKey, Dict[int, CachedValue]]] = {}
+        self.node_info: Dict[int, dict] = {}
+        self.node_listeners: List[Callable[[int, Optional[dict]], None]] = []
+        self.attribute_listeners: List[Callable[[int, int, int, int, Any, float], None]] = []
+
+    def add_node_listener(self, listener: Callable[[int, Optional[dict]], None]):
+        self.node_listeners.append(listener)
+
+    def add_attribute_listener(self, listener: Callable[[int, int, int, int, Any, float], None]):
+        self.attribute_listeners.append(listener)
+
+    def load_node(self, node: Dict[str, Any]):
+        node_id = node['node_id']
+        reported_at = time.time()
+        # a node already cached is being reloaded (reconnect replay, node_updated): report what differs
+        previous = self.nodes.get(node_id)
+        clusters: Dict[ClusterKey, Dict[int, CachedValue]] = {}
+        changes = []
+
+        for path, value in node.get('attributes', {}).items():
+            try:
+                endpoint_id, cluster_id, attribute_id = parse_attribute_path(path)
+            except ValueError:
+                continue
+            clusters.setdefault((endpoint_id, cluster_id), {})[attribute_id] = (value, reported_at)
+            if previous is not None:
+                cached = previous.get((endpoint_id, cluster_id), {}).get(attribute_id)
+                if cached is None or cached[0] != value:
+                    changes.append((endpoint_id, cluster_id, attribute_id, value))
+
+        self.nodes[node_id] = clusters
+        self.node_info[node_id] = {k: v for k, v in node.items() if k != 'attributes'}
+
+        for listener in self.node_listeners:
+            listener(node_id, self.node_info[node_id])
+        for endpoint_id, cluster_id, attribute_id, value in changes:
+            for listener in self.attribute_listeners:
+                listener(node_id, endpoint_id, cluster_id, attribute_id, value, reported_at)
+
+    def remove_node(self, node_id: int):
+        self.nodes.pop(node_id, None)
+        self.node_info.pop(node_id, None)
+
+        for listener in self.node_listeners:
+            listener(node_id, None)
+
+    def update(self, node_id: int, path: str, value: Any, reported_at: Optional[float] = None) -> bool:
+        endpoint_id, cluster_id, attribute_id = parse_attribute_path(path)
+        cluster = self.nodes.setdefault(node_id, {}).setdefault((endpoint_id, cluster_id), {})
+
+        previous = cluster.get(attribute_id)
+        reported_at = reported_at if reported_at is not None else time.time()
+        cluster[attribute_id] = (value, reported_at)
+
+        changed = previous is None or previous[0] != value
+        if changed:
+            for listener in self.attribute_listeners:
+                listener(node_id, endpoint_id, cluster_id, attribute_id, value, reported_at)
+        return changed
+
+    def set_available(self, node_id: int, available: bool):
+        if node_id in self.node_info:
+            self.node_info[node_id]['available'] = available
+
+    def get(self, node_id: int, endpoint_id: int, cluster_id: int, attribute_id: int) -> Optional[CachedValue]:
+        cluster = self.nodes.get(node_id, {}).get((endpoint_id, cluster_id))
+        if cluster is None:
+            return None
+        return cluster.get(attribute_id)
+
+    def get_cluster(self, node_id: int, endpoint_id: int, cluster_id: int) -> Dict[int, CachedValue]:
+        return self.nodes.get(node_id, {}).get((endpoint_id, cluster_id), {})
+
+    def get_node(self, node_id: int) -> Optional[Dict[ClusterKey, Dict[int, CachedValue]]]:
+        return self.nodes.get(node_id)
+
+    def get_attribute_value(self, node_id: int, path: str, default: Any = None) -> Any:
+        cached = self.get(node_id, *parse_attribute_path(path))
+        return cached[0] if cached is not None else default
+
+    def has_node(self, node_id: int) -> bool:
+        return node_id in self.nodes
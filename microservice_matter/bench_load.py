@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import random
+from typing import List
+from aiohttp.test_utils import TestClient, TestServer
+
+import config as service_config
+from fake_matter_server import FakeMatterServer
+from main import MatterMicroservice
+from python_common.bench import Workload, add_load_arguments, report, setup
+
+# Offline load test: python bench_load.py --concurrency 1,8,32,128 --latency 0.05 --failure-rate 0.01
+
+class NullEventPublisher:
+    def publish(self, event):
+        pass
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+def make_nodes(count: int) -> List[dict]:
+    return [
+        {
+            'node_id': node_id,
+            'available': True,
+            'attributes': {
+                '0/40/2': 4874,
+                '0/40/3': f'Load Test Light {node_id}',
+                '0/40/4': 1234,
+                '1/29/0': [{'0': 0x0101, '1': 1}],
+                '1/6/0': False,
+                '1/8/0': 128,
+            }
+        }
+        for node_id in range(1, count + 1)
+    ]
+
+def make_workload(client: TestClient, device_ids: List[str], read_ratio: float, rng: random.Random) -> Workload:
+    async def read_attributes():
+        return await client.get(f'/devices/{rng.choice(device_ids)}/attributes')
+
+    async def read_attribute():
+        return await client.get(f'/devices/{rng.choice(device_ids)}/attributes/1.6.0')
+
+    async def list_devices():
+        return await client.get('/devices')
+
+    async def command():
+        return await client.post('/devices/commands', json={'commands': [
+            {'device_id': rng.choice(device_ids), 'command': rng.choice(['turn_on', 'turn_off'])}
+        ]})
+
+    async def scene():
+        return await client.post('/devices/commands', json={'commands': [
+            {'device_id': device_id, 'command': 'turn_off'} for device_id in rng.sample(device_ids, min(8, len(device_ids)))
+        ]})
+
+    reads = [read_attributes, read_attribute, read_attribute, list_devices]
+    commands = [command, command, command, scene]
+
+    def next_request():
+        return rng.choice(reads if rng.random() < read_ratio else commands)()
+
+    return next_request
+
+async def main():
+    parser = argparse.ArgumentParser(description='Load test the Matter microservice against a simulated Matter server')
+    add_load_arguments(parser, latency=0.05)
+    parser.add_argument('--nodes', type=int, default=50)
+    args = parser.parse_args()
+
+    setup(args)
+    fake_server = FakeMatterServer(make_nodes(args.nodes), latency=args.latency, failure_rate=args.failure_rate)
+
+    async with TestServer(fake_server.app) as matter_server:
+        service_config.config.matter_server_url = str(matter_server.make_url('/ws'))
+        service = MatterMicroservice(event_publisher=NullEventPublisher())
+
+        async with TestClient(TestServer(service.app)) as client:
+            while len(service.devices) < args.nodes:
+                await asyncio.sleep(0.05)
+            device_ids = list(service.devices)
+
+            await report(args, lambda rng: make_workload(client, device_ids, args.read_ratio, rng), f"{args.nodes} nodes")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,13 +1,45 @@
+import time
 from typing import Dict, Any
 import logging
 
+from python_common.metrics import counter, histogram
+
 logger = logging.getLogger(__name__)
 
+SUPPORTED_COMMANDS = {
+    "turn_on",
+    "turn_off",
+    "toggle",
+    "set_brightness",
+    "set_color_temp",
+    "set_color",
+    "lock",
+    "unlock",
+    "set_temperature",
+    "set_mode",
+    "open",
+    "close",
+    "set_position",
+}
+
+COMMAND_SECONDS = histogram('command_execution_seconds', 'Command execution time by command type', ['command'])
+COMMAND_FAILURES = counter('command_failures_total', 'Failed command executions by command type', ['command'])
+
 class CommandExecutor:
     def __init__(self, matter_client):
         self.matter_client = matter_client
 
     async def execute_command(self, node_id: int, command: str, params: Dict[str, Any]) -> bool:
+        start = time.perf_counter()
+        success = await self._execute(node_id, command, params)
+
+        label = command if command in SUPPORTED_COMMANDS else "unknown"
+        COMMAND_SECONDS.labels(label).observe(time.perf_counter() - start)
+        if not success:
+            COMMAND_FAILURES.labels(label).inc()
+        return success
+
+    async def _execute(self, node_id: int, command: str, params: Dict[str, Any]) -> bool:
         try:
             if command == "turn_on":
                 return await self._turn_on(node_id)
@@ -76,14 +108,16 @@ class CommandExecutor:
         return True
 
     async def _set_temperature(self, node_id: int, temperature: float) -> bool:
+        # Thermostat OccupiedHeatingSetpoint, in 0.01 °C
         temp_scaled = int(temperature * 100)
-        await self.matter_client.send_command(node_id, 0x0201, 0x00, {"occupiedHeatingSetpoint": temp_scaled})
+        await self.matter_client.write_attribute(node_id, "1/513/18", temp_scaled)
         return True
 
     async def _set_mode(self, node_id: int, mode: str) -> bool:
         mode_mapping = {"off": 0, "heat": 4, "cool": 3, "auto": 1}
         mode_value = mode_mapping.get(mode, 0)
-        await self.matter_client.send_command(node_id, 0x0201, 0x00, {"systemMode": mode_value})
+        # Thermostat SystemMode
+        await self.matter_client.write_attribute(node_id, "1/513/28", mode_value)
         return True
 
     async def _open(self, node_id: int) -> bool:
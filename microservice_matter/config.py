@@ -8,7 +8,16 @@ class Config:
         self.listen_host: str = os.getenv('LISTEN_HOST', '0.0.0.0')
         self.listen_port: int = int(os.getenv('LISTEN_PORT', '5581'))
         self.log_level: str = os.getenv('LOG_LEVEL', 'INFO')
+        self.compression_min_size: int = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
         self.commission_timeout: int = int(os.getenv('COMMISSION_TIMEOUT', '300'))
         self.reconnect_interval: int = int(os.getenv('RECONNECT_INTERVAL', '5'))
+        self.long_poll_timeout: float = float(os.getenv('LONG_POLL_TIMEOUT', '30'))
+        self.max_reconnect_interval: int = int(os.getenv('MAX_RECONNECT_INTERVAL', '60'))
+        self.request_timeout: float = float(os.getenv('REQUEST_TIMEOUT', '10'))
+        self.backend_ws_url: str = os.getenv('BACKEND_WS_URL', self.backend_url.replace('http', 'ws', 1) + '/ws')
+        self.event_batch_window: float = int(os.getenv('EVENT_BATCH_WINDOW_MS', '100')) / 1000
+        self.bulk_command_concurrency: int = int(os.getenv('BULK_COMMAND_CONCURRENCY', '8'))
+        self.bulk_command_max_concurrency: int = int(os.getenv('BULK_COMMAND_MAX_CONCURRENCY', '64'))
+        self.bulk_command_max_entries: int = int(os.getenv('BULK_COMMAND_MAX_ENTRIES', '1000'))
 
 config = Config()
@@ -1,4 +1,5 @@
-from typing import Dict, List, Any, Optional
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, NamedTuple, Optional, Tuple
 
 MATTER_TO_COMMON_TYPES = {
     0x0100: "light",
@@ -29,83 +30,175 @@ CLUSTER_TO_ATTRIBUTES = {
     0x0405: ["humidity"],
 }
 
+# (cluster_id, attribute_id) -> common attribute name, used for attribute reports
+MATTER_ATTRIBUTE_NAMES = {
+    (0x0006, 0x0000): "state",
+    (0x0008, 0x0000): "brightness",
+    (0x0300, 0x0000): "hue",
+    (0x0300, 0x0001): "saturation",
+    (0x0300, 0x0007): "color_temp",
+    (0x0402, 0x0000): "temperature",
+    (0x0045, 0x0000): "contact",
+    (0x0406, 0x0000): "occupancy",
+    (0x0101, 0x0000): "lock_state",
+    (0x0201, 0x0000): "current_temperature",
+    (0x0201, 0x0012): "target_temperature",
+    (0x0201, 0x001C): "mode",
+    (0x0102, 0x000E): "position",
+    (0x0403, 0x0000): "pressure",
+    (0x0405, 0x0000): "humidity",
+}
+
+ATTRIBUTE_TYPES = {
+    "state": "boolean",
+    "brightness": "percentage",
+    "color_temp": "color_temperature",
+    "hue": "number",
+    "saturation": "number",
+    "temperature": "temperature",
+    "contact": "boolean",
+    "occupancy": "boolean",
+    "lock_state": "boolean",
+    "target_temperature": "temperature",
+    "current_temperature": "temperature",
+    "mode": "string",
+    "position": "percentage",
+    "pressure": "number",
+    "humidity": "percentage",
+}
+
+# Thermostat SystemMode enum
+SYSTEM_MODES = {0: "off", 1: "auto", 3: "cool", 4: "heat", 5: "emergency_heat", 6: "precooling", 7: "fan_only", 8: "dry", 9: "sleep"}
+
+# common attribute name -> conversion of the raw Matter value to the unit of its common type
+ATTRIBUTE_CONVERSIONS = {
+    "brightness": lambda level: round(level * 100 / 254),  # CurrentLevel 0-254
+    "temperature": lambda value: value / 100,  # 0.01 °C
+    "target_temperature": lambda value: value / 100,
+    "current_temperature": lambda value: value / 100,
+    "lock_state": lambda state: state == 1,  # LockState 1 = Locked
+    "occupancy": lambda bitmap: bool(bitmap & 1),
+    "mode": lambda mode: SYSTEM_MODES.get(mode, str(mode)),
+    "position": lambda value: value / 100,  # CurrentPositionLiftPercent100ths
+    "humidity": lambda value: value / 100,  # 0.01 %
+}
+
+DEVICE_COMMANDS = {
+    0x0100: ["turn_on", "turn_off", "toggle"],
+    0x0101: ["turn_on", "turn_off", "set_brightness"],
+    0x010C: ["turn_on", "turn_off", "set_brightness", "set_color_temp"],
+    0x010D: ["turn_on", "turn_off", "set_brightness", "set_color", "set_color_temp"],
+    0x010A: ["lock", "unlock"],
+    0x0202: ["set_temperature", "set_mode"],
+    0x0303: ["open", "close", "set_position"],
+}
+
+class DeviceProfile(NamedTuple):
+    device_type: int
+    common_type: str
+    # cluster_id -> ((attribute name, attribute type), ...)
+    cluster_attributes: Mapping[int, Tuple[Tuple[str, str], ...]]
+    commands: Tuple[str, ...]
+
+def _build_profiles() -> Mapping[int, DeviceProfile]:
+    cluster_attributes = MappingProxyType({
+        cluster_id: tuple((name, ATTRIBUTE_TYPES.get(name, "string")) for name in names)
+        for cluster_id, names in CLUSTER_TO_ATTRIBUTES.items()
+    })
+    return MappingProxyType({
+        device_type: DeviceProfile(
+            device_type=device_type,
+            common_type=common_type,
+            cluster_attributes=cluster_attributes,
+            commands=tuple(DEVICE_COMMANDS.get(device_type, [])),
+        )
+        for device_type, common_type in MATTER_TO_COMMON_TYPES.items()
+    })
+
+DEVICE_PROFILES = _build_profiles()
+
 class DeviceMapper:
     @staticmethod
     def map_matter_device(matter_node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        node_id = matter_node.get("node_id")
-        device_type = matter_node.get("device_type_id")
-
-        if device_type not in MATTER_TO_COMMON_TYPES:
+        profile = DEVICE_PROFILES.get(matter_node.get("device_type_id"))
+        if profile is None:
             return None
+        return DeviceMapper._map_with_profile(matter_node, profile)
 
-        common_type = MATTER_TO_COMMON_TYPES[device_type]
-        attributes = DeviceMapper._extract_attributes(matter_node)
-        commands = DeviceMapper._get_available_commands(device_type)
+    @staticmethod
+    def map_matter_devices(matter_nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        profiles = DEVICE_PROFILES
+        map_with_profile = DeviceMapper._map_with_profile
+
+        devices = []
+        for matter_node in matter_nodes:
+            profile = profiles.get(matter_node.get("device_type_id"))
+            if profile is not None:
+                devices.append(map_with_profile(matter_node, profile))
+        return devices
+
+    @staticmethod
+    def _map_with_profile(matter_node: Dict[str, Any], profile: DeviceProfile) -> Dict[str, Any]:
+        node_id = matter_node.get("node_id")
 
         return {
             "id": f"matter_{node_id}",
-            "type": common_type,
+            "type": profile.common_type,
             "name": matter_node.get("name", f"Matter Device {node_id}"),
             "protocol": "matter",
-            "attributes": attributes,
-            "commands": commands,
+            "attributes": DeviceMapper._extract_attributes(matter_node, profile),
+            "commands": list(profile.commands),
             "metadata": {
                 "node_id": node_id,
                 "vendor_id": matter_node.get("vendor_id"),
                 "product_id": matter_node.get("product_id"),
-                "device_type_id": device_type,
+                "device_type_id": profile.device_type,
             }
         }
 
     @staticmethod
-    def _extract_attributes(matter_node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def map_attribute_report(node_id: int, cluster_id: int, attribute_id: int, value: Any) -> Optional[Dict[str, Any]]:
+        attr_name = MATTER_ATTRIBUTE_NAMES.get((cluster_id, attribute_id))
+        if attr_name is None:
+            return None
+
+        convert = ATTRIBUTE_CONVERSIONS.get(attr_name)
+        if convert is not None and value is not None:
+            value = convert(value)
+
+        return {
+            "device_id": f"matter_{node_id}",
+            "name": attr_name,
+            "value": value,
+            "type": DeviceMapper._get_attribute_type(attr_name)
+        }
+
+    @staticmethod
+    def _extract_attributes(matter_node: Dict[str, Any], profile: DeviceProfile) -> List[Dict[str, Any]]:
         attributes = []
-        clusters = matter_node.get("clusters", [])
-
-        for cluster in clusters:
-            cluster_id = cluster.get("cluster_id")
-            if cluster_id in CLUSTER_TO_ATTRIBUTES:
-                for attr_name in CLUSTER_TO_ATTRIBUTES[cluster_id]:
-                    attr_value = cluster.get("attributes", {}).get(attr_name)
-                    if attr_value is not None:
-                        attributes.append({
-                            "name": attr_name,
-                            "value": attr_value,
-                            "type": DeviceMapper._get_attribute_type(attr_name)
-                        })
+        cluster_attributes = profile.cluster_attributes
+
+        for cluster in matter_node.get("clusters", []):
+            known = cluster_attributes.get(cluster.get("cluster_id"))
+            if known is None:
+                continue
+            values = cluster.get("attributes", {})
+            for attr_name, attr_type in known:
+                attr_value = values.get(attr_name)
+                if attr_value is not None:
+                    attributes.append({
+                        "name": attr_name,
+                        "value": attr_value,
+                        "type": attr_type
+                    })
 
         return attributes
 
     @staticmethod
     def _get_attribute_type(attr_name: str) -> str:
-        type_mapping = {
-            "state": "boolean",
-            "brightness": "percentage",
-            "color_temp": "color_temperature",
-            "hue": "number",
-            "saturation": "number",
-            "temperature": "temperature",
-            "contact": "boolean",
-            "occupancy": "boolean",
-            "lock_state": "boolean",
-            "target_temperature": "temperature",
-            "current_temperature": "temperature",
-            "mode": "string",
-            "position": "percentage",
-            "pressure": "number",
-            "humidity": "percentage",
-        }
-        return type_mapping.get(attr_name, "string")
+        return ATTRIBUTE_TYPES.get(attr_name, "string")
 
     @staticmethod
     def _get_available_commands(device_type: int) -> List[str]:
-        command_mapping = {
-            0x0100: ["turn_on", "turn_off", "toggle"],
-            0x0101: ["turn_on", "turn_off", "set_brightness"],
-            0x010C: ["turn_on", "turn_off", "set_brightness", "set_color_temp"],
-            0x010D: ["turn_on", "turn_off", "set_brightness", "set_color", "set_color_temp"],
-            0x010A: ["lock", "unlock"],
-            0x0202: ["set_temperature", "set_mode"],
-            0x0303: ["open", "close", "set_position"],
-        }
-        return command_mapping.get(device_type, [])
+        profile = DEVICE_PROFILES.get(device_type)
+        return list(profile.commands) if profile is not None else []
@@ -0,0 +1,86 @@
+import asyncio
+import aiohttp
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EventPublisher:
+    def __init__(self, url: str, batch_window: float, reconnect_interval: float):
+        self.url = url
+        self.batch_window = batch_window
+        self.reconnect_interval = reconnect_interval
+        # (device_id, attribute name) -> latest event, so repeated reports collapse into one
+        self.pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.events_received = 0
+        self.events_sent = 0
+        self.batches_sent = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self, event: Dict[str, Any]):
+        self.events_received += 1
+        self.pending[(event['device_id'], event['name'])] = event
+        self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        logger.info(f"Connected to backend event stream at {self.url}")
+                        reader = asyncio.create_task(self._drain(ws))
+                        sender = asyncio.create_task(self._send_batches(ws))
+                        done, _ = await asyncio.wait({reader, sender}, return_when=asyncio.FIRST_COMPLETED)
+                        for task in (reader, sender):
+                            task.cancel()
+                        for task in done:
+                            if not task.cancelled() and task.exception() is not None:
+                                raise task.exception()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Backend event stream error: {e}")
+
+                await asyncio.sleep(self.reconnect_interval)
+
+    async def _drain(self, ws: aiohttp.ClientWebSocketResponse):
+        async for msg in ws:
+            if msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                break
+
+    async def _send_batches(self, ws: aiohttp.ClientWebSocketResponse):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.batch_window)
+            self._wakeup.clear()
+
+            if not self.pending:
+                continue
+
+            batch = self.pending
+            self.pending = {}
+            try:
+                await ws.send_json({'type': 'device_attributes_changed', 'data': list(batch.values())})
+            except BaseException:
+                # Keep anything newer that arrived while sending, requeue the rest for the next connection
+                batch.update(self.pending)
+                self.pending = batch
+                self._wakeup.set()
+                raise
+
+            self.events_sent += len(batch)
+            self.batches_sent += 1
@@ -0,0 +1,157 @@
+import asyncio
+import copy
+import random
+from aiohttp import web
+from typing import Any, Dict, List, Optional, Set
+
+# Minimal stand-in for python-matter-server's WebSocket API, used to run the
+# microservice locally and in benchmarks without a Thread/Wi-Fi radio.
+
+SAMPLE_NODES = [
+    {
+        'node_id': 1,
+        'available': True,
+        'attributes': {
+            '0/40/2': 4874,
+            '0/40/3': 'Matter Light Bulb',
+            '0/40/4': 1234,
+            '1/29/0': [{'0': 0x010D, '1': 1}],
+            '1/6/0': False,
+            '1/8/0': 128,
+            '1/768/0': 0,
+            '1/768/1': 0,
+            '1/768/7': 250,
+        }
+    },
+    {
+        'node_id': 2,
+        'available': True,
+        'attributes': {
+            '0/40/2': 4874,
+            '0/40/3': 'Matter Temperature Sensor',
+            '0/40/4': 5678,
+            '1/29/0': [{'0': 0x0302, '1': 1}],
+            '1/1026/0': 2150,
+        }
+    }
+]
+
+# (cluster_id, command_name) -> (attribute_id, value) applied when the command is received
+COMMAND_EFFECTS = {
+    (6, 'On'): (0, True),
+    (6, 'Off'): (0, False),
+    (257, 'LockDoor'): (0, 1),
+    (257, 'UnlockDoor'): (0, 2),
+}
+
+class FakeMatterServer:
+    def __init__(self, nodes: Optional[List[dict]] = None, latency: float = 0.0, failure_rate: float = 0.0):
+        self.nodes: Dict[int, dict] = {node['node_id']: copy.deepcopy(node) for node in (nodes if nodes is not None else SAMPLE_NODES)}
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.listeners: Set[web.WebSocketResponse] = set()
+        self.connections: Set[web.WebSocketResponse] = set()
+        self.received: List[dict] = []
+        self.app = web.Application()
+        self.app.router.add_get('/ws', self.handle_ws)
+        self.app.on_shutdown.append(self.close_connections)
+
+    async def close_connections(self, app):
+        for ws in list(self.connections):
+            await ws.close(code=1001, message=b'Server shutdown')
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections.add(ws)
+
+        await ws.send_json({
+            'fabric_id': 1,
+            'compressed_fabric_id': 1,
+            'schema_version': 11,
+            'min_supported_schema_version': 9,
+            'sdk_version': 'fake',
+            'wifi_credentials_set': False,
+            'thread_credentials_set': False,
+        })
+
+        try:
+            async for msg in ws:
+                if msg.type == web.WSMsgType.TEXT:
+                    asyncio.create_task(self._handle_message(ws, msg.json()))
+        finally:
+            self.listeners.discard(ws)
+            self.connections.discard(ws)
+
+        return ws
+
+    async def _handle_message(self, ws: web.WebSocketResponse, msg: dict):
+        self.received.append(msg)
+        message_id = msg.get('message_id')
+        command = msg.get('command')
+        args = msg.get('args', {})
+
+        if self.latency:
+            await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+
+        if command not in ('start_listening', 'get_nodes') and random.random() < self.failure_rate:
+            await self._reply(ws, {'message_id': message_id, 'error_code': 1, 'details': 'Simulated failure'})
+            return
+
+        try:
+            result = await self._dispatch(ws, command, args)
+        except KeyError as e:
+            await self._reply(ws, {'message_id': message_id, 'error_code': 5, 'details': f'Unknown node or attribute {e}'})
+            return
+
+        await self._reply(ws, {'message_id': message_id, 'result': result})
+
+    async def _dispatch(self, ws: web.WebSocketResponse, command: str, args: dict) -> Any:
+        if command == 'start_listening':
+            self.listeners.add(ws)
+            return list(self.nodes.values())
+        if command == 'get_nodes':
+            return list(self.nodes.values())
+        if command == 'read_attribute':
+            node = self.nodes[args['node_id']]
+            path = args['attribute_path']
+            return {path: node['attributes'][path]}
+        if command == 'write_attribute':
+            await self.set_attribute(args['node_id'], args['attribute_path'], args['value'])
+            return [{'Path': args['attribute_path'], 'Status': 0}]
+        if command == 'device_command':
+            node_id = args['node_id']
+            if node_id not in self.nodes:
+                raise KeyError(node_id)
+            effect = COMMAND_EFFECTS.get((args.get('cluster_id'), args.get('command_name')))
+            if effect is not None:
+                attribute_id, value = effect
+                await self.set_attribute(node_id, f"{args.get('endpoint_id', 1)}/{args['cluster_id']}/{attribute_id}", value)
+            return None
+        raise KeyError(command)
+
+    async def _reply(self, ws: web.WebSocketResponse, payload: dict):
+        if not ws.closed:
+            await ws.send_json(payload)
+
+    async def set_attribute(self, node_id: int, path: str, value: Any):
+        self.nodes[node_id]['attributes'][path] = value
+        await self.broadcast('attribute_updated', [node_id, path, value])
+
+    async def add_node(self, node: dict):
+        self.nodes[node['node_id']] = copy.deepcopy(node)
+        await self.broadcast('node_added', node)
+
+    async def remove_node(self, node_id: int):
+        del self.nodes[node_id]
+        await self.broadcast('node_removed', node_id)
+
+    async def broadcast(self, event: str, data: Any):
+        for ws in list(self.listeners):
+            await self._reply(ws, {'event': event, 'data': data})
+
+    def run(self, host='0.0.0.0', port=5580):
+        web.run_app(self.app, host=host, port=port)
+
+if __name__ == '__main__':
+    FakeMatterServer().run()
@@ -1,22 +1,92 @@
 import asyncio
 import json
+import uuid
 from aiohttp import web
 from typing import Dict, List, Optional
 from datetime import datetime
+from config import config
+from command_executor import CommandExecutor
+from python_common.bulk_commands import parse_commands, parse_concurrency, run_bulk_commands
+from python_common.device_inventory import DeviceInventory
+from python_common.response_middleware import create_response_middleware, json_response, versioned_json_response
+from python_common.metrics import CONTENT_TYPE, REGISTRY
+from attribute_cache import AttributeCache, format_timestamp, parse_attribute_path
+from matter_client import MatterClient, MatterClientError
+from device_mapper import DeviceMapper
+from event_publisher import EventPublisher
 
 class MatterMicroservice:
-    def __init__(self):
-        self.devices: Dict[str, dict] = {}
-        self.app = web.Application()
+    def __init__(self, matter_client=None, event_publisher=None):
+        self.devices = DeviceInventory()
+        self.subscriptions: Dict[str, dict] = {}
+        self.attribute_cache = AttributeCache()
+        self.attribute_cache.add_node_listener(self.on_node_changed)
+        self.attribute_cache.add_attribute_listener(self.on_attribute_changed)
+        self.matter_client = matter_client or MatterClient(
+            config.matter_server_url,
+            self.attribute_cache,
+            config.reconnect_interval,
+            max_reconnect_interval=config.max_reconnect_interval,
+            request_timeout=config.request_timeout
+        )
+        self.event_publisher = event_publisher or EventPublisher(config.backend_ws_url, config.event_batch_window, config.reconnect_interval)
+        self.command_executor = CommandExecutor(self.matter_client)
+        self.app = web.Application(middlewares=[create_response_middleware(config.compression_min_size)])
+        self.app.on_startup.append(self.on_startup)
+        self.app.on_cleanup.append(self.on_cleanup)
         self.commissioning = False
         self.setup_routes()
 
+    async def on_startup(self, app):
+        await self.event_publisher.start()
+        await self.matter_client.start()
+
+    async def on_cleanup(self, app):
+        await self.matter_client.stop()
+        await self.event_publisher.stop()
+
+    def on_attribute_changed(self, node_id: int, endpoint_id: int, cluster_id: int, attribute_id: int, value, reported_at: float):
+        event = DeviceMapper.map_attribute_report(node_id, cluster_id, attribute_id, value)
+        if event is not None:
+            event['timestamp'] = format_timestamp(reported_at)
+            self.event_publisher.publish(event)
+
+    def on_node_changed(self, node_id: int, node_info: Optional[dict]):
+        device_id = f'matter_{node_id}'
+        if node_info is None:
+            self.devices.remove(device_id)
+            return
+
+        cache = self.attribute_cache
+        self.devices.put(device_id, {
+            'device_id': device_id,
+            'node_id': node_id,
+            'vendor_id': cache.get_attribute_value(node_id, '0/40/2'),
+            'product_id': cache.get_attribute_value(node_id, '0/40/4'),
+            'device_type': self.get_node_device_type(node_id),
+            'device_name': cache.get_attribute_value(node_id, '0/40/5') or cache.get_attribute_value(node_id, '0/40/3', f'Matter Device {node_id}'),
+            'commissioned': True,
+            'reachable': node_info.get('available', True)
+        })
+
+    def get_node_device_type(self, node_id: int) -> Optional[int]:
+        for (endpoint_id, cluster_id), attributes in sorted(self.attribute_cache.get_node(node_id).items()):
+            if endpoint_id == 0 or cluster_id != 0x001D or 0 not in attributes:
+                continue
+            device_types = attributes[0][0]
+            if device_types:
+                return device_types[0].get('0', device_types[0].get('deviceType'))
+        return None
+
     def setup_routes(self):
+        self.app.router.add_get('/metrics', self.get_metrics)
+
         # Device management
         self.app.router.add_get('/devices', self.get_devices)
         self.app.router.add_post('/devices/discover', self.discover_devices)
         self.app.router.add_get('/devices/{device_id}', self.get_device)
         self.app.router.add_post('/devices/commission', self.commission_device)
+        self.app.router.add_post('/devices/commands', self.send_bulk_commands)
         self.app.router.add_post('/devices/{device_id}/decommission', self.decommission_device)
         self.app.router.add_delete('/devices/{device_id}', self.remove_device)
 
@@ -35,8 +105,24 @@ class MatterMicroservice:
         self.app.router.add_get('/devices/{device_id}/endpoints', self.get_endpoints)
         self.app.router.add_post('/devices/{device_id}/subscribe', self.subscribe_attributes)
 
+    async def get_metrics(self, request):
+        return web.Response(body=REGISTRY.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
     async def get_devices(self, request):
-        return web.json_response(list(self.devices.values()))
+        if 'since' not in request.query:
+            return versioned_json_response(request, self.devices.etag, lambda: list(self.devices.values()))
+
+        try:
+            revision = int(request.query['since'])
+            wait = min(float(request.query.get('wait', 0)), config.long_poll_timeout)
+        except ValueError:
+            return json_response({'error': 'since must be an integer revision'}, status=400)
+
+        instance = request.query.get('instance')
+        if wait > 0:
+            await self.devices.wait_for_change(revision, wait, instance)
+
+        return json_response(self.devices.changes_since(revision, instance))
 
     async def discover_devices(self, request):
         discovered = [
@@ -58,7 +144,7 @@ class MatterMicroservice:
             }
         ]
 
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'discovered': discovered
         })
@@ -66,12 +152,12 @@ class MatterMicroservice:
     async def get_device(self, request):
         device_id = request.match_info['device_id']
         if device_id in self.devices:
-            return web.json_response(self.devices[device_id])
-        return web.json_response({'error': 'Device not found'}, status=404)
+            return json_response(self.devices[device_id])
+        return json_response({'error': 'Device not found'}, status=404)
 
     async def commission_device(self, request):
         if self.commissioning:
-            return web.json_response({'error': 'Commission already in progress'}, status=409)
+            return json_response({'error': 'Commission already in progress'}, status=409)
 
         data = await request.json()
         setup_code = data.get('setup_code')
@@ -79,7 +165,7 @@ class MatterMicroservice:
 
         self.commissioning = True
 
-        self.devices[device_id] = {
+        self.devices.put(device_id, {
             'device_id': device_id,
             'setup_code': setup_code,
             'commissioned': True,
@@ -89,11 +175,11 @@ class MatterMicroservice:
             'device_name': 'Matter Device',
             'commissioned_at': datetime.now().isoformat(),
             'reachable': True
-        }
+        })
 
         self.commissioning = False
 
-        return web.json_response({
+        return json_response({
             'status': 'commissioned',
             'device': self.devices[device_id]
         })
@@ -101,21 +187,21 @@ class MatterMicroservice:
     async def decommission_device(self, request):
         device_id = request.match_info['device_id']
         if device_id in self.devices:
-            self.devices[device_id]['commissioned'] = False
-            return web.json_response({'status': 'success', 'message': 'Device decommissioned'})
-        return web.json_response({'error': 'Device not found'}, status=404)
+            self.devices.update(device_id, commissioned=False)
+            return json_response({'status': 'success', 'message': 'Device decommissioned'})
+        return json_response({'error': 'Device not found'}, status=404)
 
     async def remove_device(self, request):
         device_id = request.match_info['device_id']
         if device_id in self.devices:
-            del self.devices[device_id]
-            return web.json_response({'status': 'success', 'message': 'Device removed'})
-        return web.json_response({'error': 'Device not found'}, status=404)
+            self.devices.remove(device_id)
+            return json_response({'status': 'success', 'message': 'Device removed'})
+        return json_response({'error': 'Device not found'}, status=404)
 
     async def get_clusters(self, request):
         device_id = request.match_info['device_id']
         if device_id not in self.devices:
-            return web.json_response({'error': 'Device not found'}, status=404)
+            return json_response({'error': 'Device not found'}, status=404)
 
         clusters = [
             {'cluster_id': 6, 'name': 'OnOff', 'server': True},
@@ -124,7 +210,7 @@ class MatterMicroservice:
             {'cluster_id': 29, 'name': 'BasicInformation', 'server': True}
         ]
 
-        return web.json_response({
+        return json_response({
             'device_id': device_id,
             'clusters': clusters
         })
@@ -132,16 +218,30 @@ class MatterMicroservice:
     async def get_attributes(self, request):
         device_id = request.match_info['device_id']
         if device_id not in self.devices:
-            return web.json_response({'error': 'Device not found'}, status=404)
-
-        attributes = {
-            'on_off': {'cluster': 6, 'attribute': 0, 'value': False},
-            'current_level': {'cluster': 8, 'attribute': 0, 'value': 128},
-            'current_hue': {'cluster': 768, 'attribute': 0, 'value': 0},
-            'current_saturation': {'cluster': 768, 'attribute': 1, 'value': 0}
-        }
-
-        return web.json_response({
+            return json_response({'error': 'Device not found'}, status=404)
+
+        node_id = self.devices[device_id].get('node_id')
+        cluster_filter = None
+        if 'cluster' in request.query:
+            try:
+                cluster_filter = int(request.query['cluster'])
+            except ValueError:
+                return json_response({'error': 'cluster must be an integer cluster id'}, status=400)
+
+        attributes = {}
+        for (endpoint_id, cluster_id), cluster in (self.attribute_cache.get_node(node_id) or {}).items():
+            if cluster_filter is not None and cluster_id != cluster_filter:
+                continue
+            for attribute_id, (value, reported_at) in cluster.items():
+                attributes[f'{endpoint_id}/{cluster_id}/{attribute_id}'] = {
+                    'endpoint': endpoint_id,
+                    'cluster': cluster_id,
+                    'attribute': attribute_id,
+                    'value': value,
+                    'timestamp': format_timestamp(reported_at)
+                }
+
+        return json_response({
             'device_id': device_id,
             'attributes': attributes
         })
@@ -151,13 +251,23 @@ class MatterMicroservice:
         attribute_id = request.match_info['attribute_id']
 
         if device_id not in self.devices:
-            return web.json_response({'error': 'Device not found'}, status=404)
+            return json_response({'error': 'Device not found'}, status=404)
+
+        try:
+            path = parse_attribute_path(attribute_id)
+        except ValueError:
+            return json_response({'error': 'Attribute id must be endpoint.cluster.attribute'}, status=400)
+
+        cached = self.attribute_cache.get(self.devices[device_id].get('node_id'), *path)
+        if cached is None:
+            return json_response({'error': 'Attribute not reported'}, status=404)
 
-        return web.json_response({
+        value, reported_at = cached
+        return json_response({
             'device_id': device_id,
             'attribute_id': attribute_id,
-            'value': 0,
-            'timestamp': datetime.now().isoformat()
+            'value': value,
+            'timestamp': format_timestamp(reported_at)
         })
 
     async def write_attribute(self, request):
@@ -167,9 +277,22 @@ class MatterMicroservice:
         value = data.get('value')
 
         if device_id not in self.devices:
-            return web.json_response({'error': 'Device not found'}, status=404)
-
-        return web.json_response({
+            return json_response({'error': 'Device not found'}, status=404)
+
+        try:
+            endpoint_id, cluster_id, attr_id = parse_attribute_path(attribute_id)
+        except ValueError:
+            return json_response({'error': 'Attribute id must be endpoint.cluster.attribute'}, status=400)
+
+        node_id = self.devices[device_id].get('node_id')
+        try:
+            await self.matter_client.write_attribute(node_id, f'{endpoint_id}/{cluster_id}/{attr_id}', value)
+        except asyncio.TimeoutError:
+            return json_response({'error': 'Matter server timeout'}, status=504)
+        except (MatterClientError, ConnectionError) as e:
+            return json_response({'error': str(e)}, status=502)
+
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'attribute_id': attribute_id,
@@ -179,46 +302,85 @@ class MatterMicroservice:
     async def send_command(self, request):
         device_id = request.match_info['device_id']
         data = await request.json()
-        cluster_id = data.get('cluster_id')
-        command_id = data.get('command_id')
-        args = data.get('args', [])
 
+        try:
+            cluster_id = int(data.get('cluster_id'))
+            command_id = int(data.get('command_id'))
+        except (TypeError, ValueError):
+            return json_response({'error': 'cluster_id and command_id must be integers'}, status=400)
+
+        return await self.invoke_cluster_command(device_id, cluster_id, command_id, data)
+
+    async def send_bulk_commands(self, request):
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return json_response({'error': 'Body must be a JSON object'}, status=400)
+
+        commands = parse_commands(data.get('commands', []), config.bulk_command_max_entries)
+        if commands is None:
+            return json_response({'error': f'commands must be a list of at most {config.bulk_command_max_entries} '
+                                           'objects with string device_id and command'}, status=400)
+        concurrency = parse_concurrency(data.get('concurrency', config.bulk_command_concurrency),
+                                        config.bulk_command_max_concurrency)
+        if concurrency is None:
+            return json_response({'error': 'concurrency must be an integer of at least 1'}, status=400)
+
+        return json_response(await run_bulk_commands(commands, concurrency, self.bulk_command_target,
+                                                     self.command_executor.execute_command))
+
+    def bulk_command_target(self, device_id: str) -> int:
         if device_id not in self.devices:
-            return web.json_response({'error': 'Device not found'}, status=404)
-
-        return web.json_response({
-            'status': 'success',
-            'device_id': device_id,
-            'cluster_id': cluster_id,
-            'command_id': command_id,
-            'args': args
-        })
+            raise LookupError('Device not found')
+        node_id = self.devices[device_id].get('node_id')
+        if node_id is None:
+            raise LookupError('Device has no Matter node_id')
+        return node_id
 
     async def send_cluster_command(self, request):
         device_id = request.match_info['device_id']
         cluster_id = int(request.match_info['cluster_id'])
         command_id = int(request.match_info['command_id'])
         data = await request.json()
-        args = data.get('args', [])
 
-        if device_id not in self.devices:
-            return web.json_response({'error': 'Device not found'}, status=404)
+        return await self.invoke_cluster_command(device_id, cluster_id, command_id, data)
 
-        return web.json_response({
+    async def invoke_cluster_command(self, device_id: str, cluster_id: int, command_id: int, data: dict):
+        if device_id not in self.devices:
+            return json_response({'error': 'Device not found'}, status=404)
+
+        # command fields by name; the empty list is the old default for no arguments
+        args = data.get('args') or {}
+        if not isinstance(args, dict):
+            return json_response({'error': 'args must be an object of command fields'}, status=400)
+
+        node_id = self.devices[device_id].get('node_id')
+        try:
+            response = await self.matter_client.send_command(node_id, cluster_id, command_id, args, endpoint_id=data.get('endpoint_id', 1))
+        except ValueError as e:
+            return json_response({'error': str(e)}, status=400)
+        except asyncio.TimeoutError:
+            return json_response({'error': 'Matter server timeout'}, status=504)
+        except (MatterClientError, ConnectionError) as e:
+            return json_response({'error': str(e)}, status=502)
+
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'cluster_id': cluster_id,
             'command_id': command_id,
             'args': args,
-            'response': {}
+            'response': response if response is not None else {}
         })
 
     async def get_device_info(self, request):
         device_id = request.match_info['device_id']
         if device_id not in self.devices:
-            return web.json_response({'error': 'Device not found'}, status=404)
+            return json_response({'error': 'Device not found'}, status=404)
 
-        return web.json_response({
+        return json_response({
             'device_id': device_id,
             'vendor_name': 'Matter Device Manufacturer',
             'product_name': 'Matter Light',
@@ -231,7 +393,7 @@ class MatterMicroservice:
     async def get_endpoints(self, request):
         device_id = request.match_info['device_id']
         if device_id not in self.devices:
-            return web.json_response({'error': 'Device not found'}, status=404)
+            return json_response({'error': 'Device not found'}, status=404)
 
         endpoints = [
             {
@@ -246,7 +408,7 @@ class MatterMicroservice:
             }
         ]
 
-        return web.json_response({
+        return json_response({
             'device_id': device_id,
             'endpoints': endpoints
         })
@@ -257,13 +419,33 @@ class MatterMicroservice:
         attributes = data.get('attributes', [])
 
         if device_id not in self.devices:
-            return web.json_response({'error': 'Device not found'}, status=404)
+            return json_response({'error': 'Device not found'}, status=404)
+
+        node_id = self.devices[device_id].get('node_id')
+        try:
+            paths = [parse_attribute_path(attribute) for attribute in attributes]
+        except ValueError:
+            return json_response({'error': 'Attribute ids must be endpoint.cluster.attribute'}, status=400)
+
+        subscription_id = f'sub_{uuid.uuid4().hex[:12]}'
+        self.subscriptions[subscription_id] = {
+            'device_id': device_id,
+            'node_id': node_id,
+            'attributes': attributes
+        }
+
+        values = {}
+        for attribute, path in zip(attributes, paths):
+            cached = self.attribute_cache.get(node_id, *path)
+            if cached is not None:
+                values[attribute] = {'value': cached[0], 'timestamp': format_timestamp(cached[1])}
 
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'subscribed_attributes': attributes,
-            'subscription_id': 'sub_12345'
+            'subscription_id': subscription_id,
+            'values': values
         })
 
     def run(self, host='0.0.0.0', port=8083):
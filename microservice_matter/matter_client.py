@@ -0,0 +1,217 @@
+import asyncio
+import json
+import random
+import time
+import aiohttp
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+import logging
+
+from attribute_cache import AttributeCache
+from python_common.metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+REQUEST_SECONDS = histogram('matter_request_seconds', 'Matter server request round trip by command', ['command'])
+REQUEST_FAILURES = counter('matter_request_failures_total', 'Failed or timed out Matter server requests by command', ['command'])
+
+# (cluster_id, command_id) -> command name expected by python-matter-server's device_command
+COMMAND_NAMES = {
+    (0x0006, 0x00): 'Off',
+    (0x0006, 0x01): 'On',
+    (0x0006, 0x02): 'Toggle',
+    (0x0008, 0x04): 'MoveToLevelWithOnOff',
+    (0x0300, 0x06): 'MoveToHueAndSaturation',
+    (0x0300, 0x0A): 'MoveToColorTemperature',
+    (0x0101, 0x00): 'LockDoor',
+    (0x0101, 0x01): 'UnlockDoor',
+    (0x0102, 0x00): 'UpOrOpen',
+    (0x0102, 0x01): 'DownOrClose',
+    (0x0102, 0x05): 'GoToLiftPercentage',
+}
+
+class MatterClientError(Exception):
+    def __init__(self, error_code: int, details: str):
+        super().__init__(f"Matter server error {error_code}: {details}")
+        self.error_code = error_code
+        self.details = details
+
+class MatterClient:
+    def __init__(self, url: str, attribute_cache: AttributeCache, reconnect_interval: float,
+                 max_reconnect_interval: float = 60.0, request_timeout: float = 10.0):
+        self.url = url
+        self.attribute_cache = attribute_cache
+        self.reconnect_interval = reconnect_interval
+        self.max_reconnect_interval = max_reconnect_interval
+        self.request_timeout = request_timeout
+        self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.server_info: Optional[dict] = None
+        self._message_id = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+        # subscription key -> (command, args, result handler), re-sent after every reconnect
+        self._subscriptions: Dict[str, Tuple[str, Dict[str, Any], Callable[[Any], None]]] = {}
+        self._connected = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._replays: Set[asyncio.Task] = set()
+
+        self.subscribe('start_listening', {}, self._load_nodes)
+
+    @property
+    def connected(self) -> bool:
+        return self.ws is not None and not self.ws.closed
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._replays):
+            task.cancel()
+        await asyncio.gather(*self._replays, return_exceptions=True)
+
+    async def send_message(self, command: str, args: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        timeout = timeout if timeout is not None else self.request_timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        start = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+            # the connection can drop between the event firing and this task resuming
+            ws = self.ws
+            if ws is None or ws.closed:
+                raise ConnectionError('Matter server connection lost')
+
+            self._message_id += 1
+            message_id = str(self._message_id)
+            future = loop.create_future()
+            self._pending[message_id] = future
+
+            try:
+                await ws.send_json({'message_id': message_id, 'command': command, 'args': args or {}})
+                return await asyncio.wait_for(future, max(0.0, deadline - loop.time()))
+            finally:
+                self._pending.pop(message_id, None)
+        except Exception:
+            REQUEST_FAILURES.labels(command).inc()
+            raise
+        finally:
+            REQUEST_SECONDS.labels(command).observe(time.perf_counter() - start)
+
+    async def send_command(self, node_id: int, cluster_id: int, command_id: int, payload: Dict[str, Any], endpoint_id: int = 1) -> Any:
+        command_name = COMMAND_NAMES.get((cluster_id, command_id))
+        if command_name is None:
+            raise ValueError(f"Unsupported command {command_id} for cluster {cluster_id}")
+
+        return await self.send_message('device_command', {
+            'node_id': node_id,
+            'endpoint_id': endpoint_id,
+            'cluster_id': cluster_id,
+            'command_name': command_name,
+            'payload': payload,
+        })
+
+    async def read_attribute(self, node_id: int, attribute_path: str) -> Any:
+        result = await self.send_message('read_attribute', {'node_id': node_id, 'attribute_path': attribute_path})
+        for path, value in result.items():
+            self.attribute_cache.update(node_id, path, value)
+        return result.get(attribute_path)
+
+    async def write_attribute(self, node_id: int, attribute_path: str, value: Any) -> Any:
+        return await self.send_message('write_attribute', {'node_id': node_id, 'attribute_path': attribute_path, 'value': value})
+
+    def subscribe(self, command: str, args: Dict[str, Any], on_result: Callable[[Any], None]) -> str:
+        key = f"{command}:{json.dumps(args, sort_keys=True)}"
+        self._subscriptions[key] = (command, args, on_result)
+        if self.connected:
+            self._start_replay(command, args, on_result)
+        return key
+
+    def unsubscribe(self, key: str):
+        self._subscriptions.pop(key, None)
+
+    async def _run(self):
+        attempt = 0
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        self.ws = ws
+                        attempt = 0
+                        logger.info(f"Connected to Matter server at {self.url}")
+                        self._connected.set()
+                        for command, args, on_result in list(self._subscriptions.values()):
+                            self._start_replay(command, args, on_result)
+                        await self._listen(ws)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Matter server connection error: {e}")
+                finally:
+                    self._connected.clear()
+                    self.ws = None
+                    self._fail_pending(ConnectionError('Matter server connection lost'))
+
+                delay = min(self.reconnect_interval * (2 ** attempt), self.max_reconnect_interval)
+                attempt += 1
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+
+    async def _listen(self, ws: aiohttp.ClientWebSocketResponse):
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                self._handle_message(json.loads(msg.data))
+            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                break
+
+    def _start_replay(self, command: str, args: Dict[str, Any], on_result: Callable[[Any], None]):
+        # the loop only keeps weak references to tasks, hold them until they finish
+        task = asyncio.create_task(self._replay_subscription(command, args, on_result))
+        self._replays.add(task)
+        task.add_done_callback(self._replays.discard)
+
+    async def _replay_subscription(self, command: str, args: Dict[str, Any], on_result: Callable[[Any], None]):
+        try:
+            on_result(await self.send_message(command, args))
+        except Exception as e:
+            logger.warning(f"Failed to subscribe with {command}: {e}")
+
+    def _fail_pending(self, error: Exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    def _load_nodes(self, nodes):
+        for node in nodes:
+            self.attribute_cache.load_node(node)
+
+    def _handle_message(self, msg: Dict[str, Any]):
+        if 'event' in msg:
+            self._handle_event(msg['event'], msg.get('data'))
+        elif 'message_id' in msg:
+            future = self._pending.get(msg['message_id'])
+            if future is None or future.done():
+                return
+            if 'error_code' in msg:
+                future.set_exception(MatterClientError(msg['error_code'], msg.get('details', '')))
+            else:
+                future.set_result(msg.get('result'))
+        elif 'schema_version' in msg:
+            self.server_info = msg
+
+    def _handle_event(self, event: str, data: Any):
+        if event == 'attribute_updated':
+            node_id, path, value = data
+            self.attribute_cache.update(node_id, path, value)
+        elif event in ('node_added', 'node_updated'):
+            self.attribute_cache.load_node(data)
+        elif event == 'node_removed':
+            self.attribute_cache.remove_node(data)
+        elif event == 'node_event':
+            logger.debug(f"Node event: {data}")
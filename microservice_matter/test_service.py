@@ -0,0 +1,312 @@
+import asyncio
+import copy
+from contextlib import asynccontextmanager
+from aiohttp.test_utils import TestClient, TestServer
+
+import config as service_config
+from fake_matter_server import SAMPLE_NODES, FakeMatterServer
+from main import MatterMicroservice
+
+# Service tests against the in-process fake Matter server: python -m pytest test_service.py
+
+THERMOSTAT_NODE = {
+    'node_id': 3,
+    'available': True,
+    'attributes': {
+        '0/40/2': 4874,
+        '0/40/3': 'Matter Thermostat',
+        '0/40/4': 4321,
+        '1/29/0': [{'0': 0x0301, '1': 1}],
+        '1/513/0': 2100,
+        '1/513/18': 2000,
+        '1/513/28': 0,
+    }
+}
+
+class RecordingEventPublisher:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, event):
+        self.events.append(event)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+async def eventually(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, 'condition not reached in time'
+        await asyncio.sleep(0.01)
+
+@asynccontextmanager
+async def running_service(nodes=None, port=None):
+    nodes = copy.deepcopy(SAMPLE_NODES if nodes is None else nodes)
+    fake_server = FakeMatterServer(nodes)
+    matter_server = TestServer(fake_server.app, port=port)
+    await matter_server.start_server()
+    service_config.config.matter_server_url = str(matter_server.make_url('/ws'))
+    service_config.config.reconnect_interval = 0.05
+    service = MatterMicroservice(event_publisher=RecordingEventPublisher())
+
+    try:
+        async with TestClient(TestServer(service.app)) as client:
+            await eventually(lambda: len(service.devices) == len(nodes))
+            yield fake_server, matter_server, service, client
+    finally:
+        await matter_server.close()
+
+def run(coroutine):
+    asyncio.run(coroutine)
+
+def test_lists_devices_from_server_nodes():
+    async def scenario():
+        async with running_service() as (_, _, _, client):
+            response = await client.get('/devices')
+            assert response.status == 200
+            devices = {device['device_id']: device for device in await response.json()}
+
+            assert set(devices) == {'matter_1', 'matter_2'}
+            assert devices['matter_1']['device_name'] == 'Matter Light Bulb'
+            assert devices['matter_1']['device_type'] == 0x010D
+            assert devices['matter_2']['product_id'] == 5678
+            assert 'revision' not in devices['matter_1']
+
+            response = await client.get('/devices/matter_3')
+            assert response.status == 404
+
+    run(scenario())
+
+def test_reads_are_answered_from_cache():
+    async def scenario():
+        async with running_service() as (fake_server, _, _, client):
+            received = len(fake_server.received)
+
+            response = await client.get('/devices/matter_2/attributes/1.1026.0')
+            assert response.status == 200
+            body = await response.json()
+            assert body['value'] == 2150
+            assert body['timestamp']
+
+            response = await client.get('/devices/matter_1/attributes', params={'cluster': '6'})
+            assert list((await response.json())['attributes']) == ['1/6/0']
+
+            response = await client.get('/devices/matter_1/attributes', params={'cluster': 'abc'})
+            assert response.status == 400
+            response = await client.get('/devices/matter_1/attributes/1.6.99')
+            assert response.status == 404
+
+            # nothing went to the Matter server
+            assert len(fake_server.received) == received
+
+    run(scenario())
+
+def test_attribute_updates_and_inventory_changes_since():
+    async def scenario():
+        async with running_service() as (fake_server, _, service, client):
+            response = await client.get('/devices', params={'since': '0'})
+            revision = (await response.json())['revision']
+
+            await fake_server.set_attribute(1, '1/6/0', True)
+            await eventually(lambda: service.attribute_cache.get_attribute_value(1, '1/6/0') is True)
+            response = await client.get('/devices/matter_1/attributes/1.6.0')
+            assert (await response.json())['value'] is True
+
+            response = await client.get('/devices', params={'since': str(revision)})
+            assert (await response.json())['changed'] == []
+
+            # a long poll is answered as soon as a node is added
+            poll = asyncio.ensure_future(client.get('/devices', params={'since': str(revision), 'wait': '5'}))
+            await asyncio.sleep(0.05)
+            await fake_server.add_node(THERMOSTAT_NODE)
+            body = await (await poll).json()
+            assert [device['device_id'] for device in body['changed']] == ['matter_3']
+            assert body['changed'][0]['revision'] == body['revision']
+            assert body['removed'] == []
+
+            await fake_server.remove_node(2)
+            await eventually(lambda: 'matter_2' not in service.devices)
+            response = await client.get('/devices', params={'since': str(body['revision'])})
+            body = await response.json()
+            assert body['changed'] == []
+            assert body['removed'] == ['matter_2']
+
+            response = await client.get('/devices', params={'since': 'abc'})
+            assert response.status == 400
+
+    run(scenario())
+
+def test_inventory_resyncs_after_service_restart():
+    async def scenario():
+        async with running_service() as (_, _, service, client):
+            response = await client.get('/devices', params={'since': '0'})
+            body = await response.json()
+            revision, instance = body['revision'], body['instance']
+            assert instance == service.devices.instance
+
+            # a revision from before a restart is ahead of the restarted counter
+            response = await client.get('/devices', params={'since': str(revision + 50), 'wait': '5'})
+            body = await response.json()
+            assert body['full'] is True
+            assert {device['device_id'] for device in body['changed']} == {'matter_1', 'matter_2'}
+
+            # a restarted service that already counted past the client's revision is caught by the instance id
+            response = await client.get('/devices', params={'since': str(revision), 'instance': 'earlier-run', 'wait': '5'})
+            body = await response.json()
+            assert body['full'] is True
+            assert len(body['changed']) == 2
+
+            response = await client.get('/devices', params={'since': str(revision), 'instance': instance})
+            body = await response.json()
+            assert body['full'] is False
+            assert body['changed'] == []
+
+    run(scenario())
+
+def test_conditional_get_and_compression():
+    async def scenario():
+        async with running_service() as (fake_server, _, service, client):
+            response = await client.get('/devices', headers={'Accept-Encoding': 'gzip'})
+            etag = response.headers['ETag']
+            assert etag == f'"{service.devices.etag}-gzip"'
+            assert response.headers['Content-Encoding'] == 'gzip'
+
+            response = await client.get('/devices', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+            assert response.status == 304
+            assert response.headers['ETag'] == etag
+            assert response.headers['Vary'] == 'Accept-Encoding'
+
+            response = await client.get('/devices', headers={'Accept-Encoding': 'identity'})
+            assert 'Content-Encoding' not in response.headers
+            assert response.headers['ETag'] == f'"{service.devices.etag}"'
+
+            await fake_server.add_node(THERMOSTAT_NODE)
+            await eventually(lambda: 'matter_3' in service.devices)
+            response = await client.get('/devices', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+            assert response.status == 200
+            assert response.headers['ETag'] != etag
+
+            # content without a version is identified by its body
+            response = await client.get('/devices/matter_2/attributes/1.1026.0')
+            response = await client.get('/devices/matter_2/attributes/1.1026.0', headers={'If-None-Match': response.headers['ETag']})
+            assert response.status == 304
+
+    compression_min_size = service_config.config.compression_min_size
+    service_config.config.compression_min_size = 0
+    try:
+        run(scenario())
+    finally:
+        service_config.config.compression_min_size = compression_min_size
+
+def test_bulk_commands_report_partial_failure():
+    async def scenario():
+        async with running_service(SAMPLE_NODES + [THERMOSTAT_NODE]) as (fake_server, _, service, client):
+            response = await client.post('/devices/commands', json={'commands': [
+                {'device_id': 'matter_1', 'command': 'turn_on'},
+                {'device_id': 'matter_3', 'command': 'set_temperature', 'params': {'temperature': 22.5}},
+                {'device_id': 'matter_2', 'command': 'fly'},
+                {'device_id': 'matter_9', 'command': 'turn_on'},
+            ]})
+            assert response.status == 200
+            body = await response.json()
+
+            assert body['status'] == 'partial'
+            assert [result['success'] for result in body['results']] == [True, True, False, False]
+            assert body['results'][3]['error'] == 'Device not found'
+            assert fake_server.nodes[1]['attributes']['1/6/0'] is True
+            assert fake_server.nodes[3]['attributes']['1/513/18'] == 2250
+
+            # a record without a node id is not sent to the Matter server under its device id
+            service.devices.put('matter_manual', {'device_id': 'matter_manual', 'device_name': 'Manual entry'})
+            received = len(fake_server.received)
+            response = await client.post('/devices/commands', json={'commands': [
+                {'device_id': 'matter_manual', 'command': 'turn_on'}
+            ]})
+            body = await response.json()
+            assert body['results'] == [{'device_id': 'matter_manual', 'command': 'turn_on', 'success': False,
+                                        'error': 'Device has no Matter node_id'}]
+            assert len(fake_server.received) == received
+
+            for concurrency in ('x', 0, -1, 2.5):
+                response = await client.post('/devices/commands', json={'commands': [], 'concurrency': concurrency})
+                assert response.status == 400
+
+            for body in ({'commands': {'device_id': 'matter_1'}}, {'commands': ['matter_1']},
+                         {'commands': [{'device_id': ['matter_1'], 'command': 'turn_on'}]},
+                         {'commands': [{'device_id': 'matter_1', 'command': 'turn_on', 'params': []}]},
+                         [{'device_id': 'matter_1', 'command': 'turn_on'}]):
+                response = await client.post('/devices/commands', json=body)
+                assert response.status == 400
+            response = await client.post('/devices/commands', data='{', headers={'Content-Type': 'application/json'})
+            assert response.status == 400
+
+            too_many = [{'device_id': 'matter_1', 'command': 'turn_on'}] * (service_config.config.bulk_command_max_entries + 1)
+            response = await client.post('/devices/commands', json={'commands': too_many})
+            assert response.status == 400
+
+    run(scenario())
+
+def test_single_commands_are_sent_to_the_server():
+    async def scenario():
+        async with running_service() as (fake_server, _, _, client):
+            response = await client.post('/devices/matter_1/command', json={'cluster_id': 6, 'command_id': 1})
+            assert response.status == 200
+            assert fake_server.nodes[1]['attributes']['1/6/0'] is True
+
+            response = await client.post('/devices/matter_1/cluster/6/command/0', json={'args': []})
+            assert response.status == 200
+            assert fake_server.nodes[1]['attributes']['1/6/0'] is False
+            assert fake_server.received[-1]['args']['command_name'] == 'Off'
+
+            response = await client.post('/devices/matter_1/cluster/6/command/99', json={})
+            assert response.status == 400
+            response = await client.post('/devices/matter_1/command', json={'cluster_id': 'on'})
+            assert response.status == 400
+            response = await client.post('/devices/matter_9/command', json={'cluster_id': 6, 'command_id': 1})
+            assert response.status == 404
+
+    run(scenario())
+
+def test_reconnect_reloads_nodes():
+    async def scenario():
+        async with running_service() as (_, matter_server, service, client):
+            port = matter_server.port
+            await matter_server.close()
+            await eventually(lambda: not service.matter_client.connected)
+
+            # the node changed while the service was disconnected
+            nodes = copy.deepcopy(SAMPLE_NODES)
+            nodes[1]['attributes']['1/1026/0'] = 1900
+            restarted = TestServer(FakeMatterServer(nodes).app, port=port)
+            await restarted.start_server()
+            try:
+                await eventually(lambda: service.attribute_cache.get_attribute_value(2, '1/1026/0') == 1900)
+                response = await client.get('/devices/matter_2/attributes/1.1026.0')
+                assert (await response.json())['value'] == 1900
+                # only the value that changed while disconnected is published, in °C
+                events = [{k: v for k, v in event.items() if k != 'timestamp'} for event in service.event_publisher.events]
+                assert events == [{'device_id': 'matter_2', 'name': 'temperature', 'value': 19.0, 'type': 'temperature'}]
+            finally:
+                await restarted.close()
+
+    run(scenario())
+
+def test_send_after_the_connection_dropped_raises_connection_error():
+    async def scenario():
+        from attribute_cache import AttributeCache
+        from matter_client import MatterClient
+
+        # connected was signalled, but the socket is gone by the time the request runs
+        client = MatterClient('ws://127.0.0.1:1/ws', AttributeCache(), 0.05)
+        client._connected.set()
+        try:
+            await client.send_message('get_nodes')
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError('send_message did not raise ConnectionError')
+
+    run(scenario())
@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import random
+from typing import List
+from aiohttp.test_utils import TestClient, TestServer
+
+from main import RoborockMicroservice
+from python_common.bench import Workload, add_load_arguments, report, setup
+
+# Offline load test: python bench_load.py --concurrency 1,8,32,128 --latency 0.2 --failure-rate 0.01
+
+class SimulatedRoborockClient:
+    def __init__(self, latency: float, failure_rate: float):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    async def send_command(self, device_id: str, command: str, params=None):
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        if random.random() < self.failure_rate:
+            raise ConnectionError('Simulated device failure')
+        return ['ok']
+
+def make_workload(client: TestClient, device_ids: List[str], read_ratio: float, rng: random.Random) -> Workload:
+    async def status():
+        return await client.get(f'/devices/{rng.choice(device_ids)}/status')
+
+    async def get_map():
+        return await client.get(f'/devices/{rng.choice(device_ids)}/map')
+
+    async def list_devices():
+        return await client.get('/devices')
+
+    async def command():
+        return await client.post('/devices/commands', json={'commands': [
+            {'device_id': rng.choice(device_ids), 'command': rng.choice(['start', 'pause', 'return_to_dock'])}
+        ]})
+
+    async def dock_all():
+        return await client.post('/devices/commands', json={'commands': [
+            {'device_id': device_id, 'command': 'return_to_dock'} for device_id in device_ids
+        ]})
+
+    reads = [status, status, get_map, list_devices]
+    commands = [command, command, command, dock_all]
+
+    def next_request():
+        return rng.choice(reads if rng.random() < read_ratio else commands)()
+
+    return next_request
+
+async def main():
+    parser = argparse.ArgumentParser(description='Load test the Roborock microservice against simulated vacuums')
+    add_load_arguments(parser, latency=0.2)
+    parser.add_argument('--devices', type=int, default=4)
+    args = parser.parse_args()
+
+    setup(args)
+    service = RoborockMicroservice(SimulatedRoborockClient(args.latency, args.failure_rate))
+
+    async with TestClient(TestServer(service.app)) as client:
+        for index in range(args.devices):
+            await client.post(f'/devices/roborock_{index}/bind', json={'ip': f'192.168.1.{100 + index}', 'token': 'simulated'})
+        device_ids = list(service.devices)
+
+        await report(args, lambda rng: make_workload(client, device_ids, args.read_ratio, rng), f"{args.devices} devices")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import time
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from map_processor import MapProcessor
+from python_common.response_middleware import create_response_middleware, json_response
+
+# Bytes and CPU per request for a large map payload: python bench_responses.py --requests 200
+
+def make_map(size: int):
+    pixels = []
+    for y in range(size):
+        row_room = y // 64
+        for x in range(size):
+            on_wall = x % 64 == 0 or y % 64 == 0
+            pixels.append(255 if on_wall else 16 + row_room * 8 + x // 64)
+
+    return MapProcessor.convert_to_common_format({
+        "image": {"top": 393, "left": 333, "height": size, "width": size, "pixels": pixels},
+        "robot_position": (25.451, 25.566, 1.78),
+        "charger_position": (25.26, 25.574, 0.0),
+    })
+
+def make_app(payload, with_middleware: bool) -> web.Application:
+    if with_middleware:
+        app = web.Application(middlewares=[create_response_middleware()])
+
+        async def handler(request):
+            return json_response(payload)
+    else:
+        app = web.Application()
+
+        async def handler(request):
+            return web.json_response(payload)
+
+    app.router.add_get('/map', handler)
+    return app
+
+async def run_scenario(name: str, app: web.Application, requests: int, headers: dict, conditional: bool):
+    async with TestClient(TestServer(app), auto_decompress=False) as client:
+        etag = None
+        if conditional:
+            response = await client.get('/map', headers=headers)
+            await response.read()
+            etag = response.headers['ETag']
+
+        total_bytes = 0
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        for _ in range(requests):
+            request_headers = dict(headers, **({'If-None-Match': etag} if etag else {}))
+            response = await client.get('/map', headers=request_headers)
+            total_bytes += len(await response.read())
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+
+    print(f"  {name:<28} {total_bytes / requests / 1024:10.1f} KiB/req  {cpu / requests * 1000:8.2f} ms CPU/req  {requests / wall:8.1f} req/s")
+
+async def main():
+    parser = argparse.ArgumentParser(description='Benchmark response middleware on a large map payload')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--map-size', type=int, default=512)
+    args = parser.parse_args()
+
+    payload = make_map(args.map_size)
+    print(f"Map {args.map_size}x{args.map_size}, {args.requests} requests per scenario")
+
+    await run_scenario('json_response, identity', make_app(payload, False), args.requests, {'Accept-Encoding': 'identity'}, False)
+    await run_scenario('middleware, identity', make_app(payload, True), args.requests, {'Accept-Encoding': 'identity'}, False)
+    await run_scenario('middleware, gzip', make_app(payload, True), args.requests, {'Accept-Encoding': 'gzip'}, False)
+    await run_scenario('middleware, If-None-Match', make_app(payload, True), args.requests, {'Accept-Encoding': 'gzip'}, True)
+
+if __name__ == '__main__':
+    asyncio.run(main())
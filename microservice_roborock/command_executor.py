@@ -1,13 +1,42 @@
+import time
 from typing import Dict, Any, Optional
 import logging
 
+from python_common.metrics import counter, histogram
+
 logger = logging.getLogger(__name__)
 
+SUPPORTED_COMMANDS = {
+    "start",
+    "pause",
+    "stop",
+    "return_to_dock",
+    "locate",
+    "clean_zone",
+    "clean_segment",
+    "goto",
+    "set_fan_speed",
+    "set_water_flow",
+}
+
+COMMAND_SECONDS = histogram('command_execution_seconds', 'Command execution time by command type', ['command'])
+COMMAND_FAILURES = counter('command_failures_total', 'Failed command executions by command type', ['command'])
+
 class CommandExecutor:
     def __init__(self, roborock_client):
         self.roborock_client = roborock_client
 
     async def execute_command(self, device_id: str, command: str, params: Dict[str, Any]) -> bool:
+        start = time.perf_counter()
+        success = await self._execute(device_id, command, params)
+
+        label = command if command in SUPPORTED_COMMANDS else "unknown"
+        COMMAND_SECONDS.labels(label).observe(time.perf_counter() - start)
+        if not success:
+            COMMAND_FAILURES.labels(label).inc()
+        return success
+
+    async def _execute(self, device_id: str, command: str, params: Dict[str, Any]) -> bool:
         try:
             if command == "start":
                 return await self._start_cleaning(device_id)
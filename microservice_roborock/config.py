@@ -7,6 +7,7 @@ class Config:
         self.listen_host: str = os.getenv('LISTEN_HOST', '0.0.0.0')
         self.listen_port: int = int(os.getenv('LISTEN_PORT', '5584'))
         self.log_level: str = os.getenv('LOG_LEVEL', 'INFO')
+        self.compression_min_size: int = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
 
         self.roborock_username: str = os.getenv('ROBOROCK_USERNAME', '')
         self.roborock_password: str = os.getenv('ROBOROCK_PASSWORD', '')
@@ -14,5 +15,9 @@ class Config:
         self.polling_interval: int = int(os.getenv('POLLING_INTERVAL', '5'))
         self.map_refresh_interval: int = int(os.getenv('MAP_REFRESH_INTERVAL', '30'))
         self.reconnect_interval: int = int(os.getenv('RECONNECT_INTERVAL', '5'))
+        self.long_poll_timeout: float = float(os.getenv('LONG_POLL_TIMEOUT', '30'))
+        self.bulk_command_concurrency: int = int(os.getenv('BULK_COMMAND_CONCURRENCY', '4'))
+        self.bulk_command_max_concurrency: int = int(os.getenv('BULK_COMMAND_MAX_CONCURRENCY', '64'))
+        self.bulk_command_max_entries: int = int(os.getenv('BULK_COMMAND_MAX_ENTRIES', '1000'))
 
 config = Config()
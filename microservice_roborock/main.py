@@ -4,18 +4,30 @@ import base64
 from datetime import datetime
 from aiohttp import web
 from typing import Dict, List, Optional
+from config import config
+from command_executor import CommandExecutor
+from python_common.bulk_commands import parse_commands, parse_concurrency, run_bulk_commands
+from python_common.device_inventory import DeviceInventory
+from python_common.response_middleware import create_response_middleware, json_response, versioned_json_response
+from python_common.metrics import CONTENT_TYPE, REGISTRY
 
 class RoborockMicroservice:
-    def __init__(self):
-        self.devices: Dict[str, dict] = {}
-        self.app = web.Application()
+    def __init__(self, roborock_client=None):
+        self.devices = DeviceInventory()
+        self.command_executor = CommandExecutor(roborock_client)
+        self.app = web.Application(middlewares=[create_response_middleware(config.compression_min_size)])
         self.discovering = False
+        # device_id -> when its map was last imported, so unchanged maps keep their ETag
+        self.map_timestamps: Dict[str, str] = {}
         self.setup_routes()
 
     def setup_routes(self):
+        self.app.router.add_get('/metrics', self.get_metrics)
+
         # Device management
         self.app.router.add_get('/devices', self.get_devices)
         self.app.router.add_post('/devices/discover', self.discover_devices)
+        self.app.router.add_post('/devices/commands', self.send_bulk_commands)
         self.app.router.add_get('/devices/{device_id}', self.get_device)
         self.app.router.add_post('/devices/{device_id}/bind', self.bind_device)
         self.app.router.add_delete('/devices/{device_id}', self.remove_device)
@@ -41,12 +53,28 @@ class RoborockMicroservice:
         self.app.router.add_post('/devices/{device_id}/stop', self.stop_cleaning)
         self.app.router.add_post('/devices/{device_id}/dock', self.return_to_dock)
 
+    async def get_metrics(self, request):
+        return web.Response(body=REGISTRY.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
     async def get_devices(self, request):
-        return web.json_response(list(self.devices.values()))
+        if 'since' not in request.query:
+            return versioned_json_response(request, self.devices.etag, lambda: list(self.devices.values()))
+
+        try:
+            revision = int(request.query['since'])
+            wait = min(float(request.query.get('wait', 0)), config.long_poll_timeout)
+        except ValueError:
+            return json_response({'error': 'since must be an integer revision'}, status=400)
+
+        instance = request.query.get('instance')
+        if wait > 0:
+            await self.devices.wait_for_change(revision, wait, instance)
+
+        return json_response(self.devices.changes_since(revision, instance))
 
     async def discover_devices(self, request):
         if self.discovering:
-            return web.json_response({'status': 'already_discovering'}, status=409)
+            return json_response({'status': 'already_discovering'}, status=409)
 
         self.discovering = True
         discovered = [
@@ -60,7 +88,7 @@ class RoborockMicroservice:
         ]
         self.discovering = False
 
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'discovered': discovered
         })
@@ -68,8 +96,8 @@ class RoborockMicroservice:
     async def get_device(self, request):
         device_id = request.match_info['device_id']
         if device_id in self.devices:
-            return web.json_response(self.devices[device_id])
-        return web.json_response({'error': 'Device not found'}, status=404)
+            return json_response(self.devices[device_id])
+        return json_response({'error': 'Device not found'}, status=404)
 
     async def bind_device(self, request):
         device_id = request.match_info['device_id']
@@ -77,7 +105,7 @@ class RoborockMicroservice:
         ip = data.get('ip')
         token = data.get('token')
 
-        self.devices[device_id] = {
+        self.devices.put(device_id, {
             'device_id': device_id,
             'ip': ip,
             'token': token,
@@ -86,9 +114,9 @@ class RoborockMicroservice:
             'name': data.get('name', 'Roborock Vacuum'),
             'firmware_version': '1.5.2',
             'last_seen': datetime.now().isoformat()
-        }
+        })
 
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'device': self.devices[device_id]
         })
@@ -96,9 +124,9 @@ class RoborockMicroservice:
     async def remove_device(self, request):
         device_id = request.match_info['device_id']
         if device_id in self.devices:
-            del self.devices[device_id]
-            return web.json_response({'status': 'success', 'message': 'Device removed'})
-        return web.json_response({'error': 'Device not found'}, status=404)
+            self.devices.remove(device_id)
+            return json_response({'status': 'success', 'message': 'Device removed'})
+        return json_response({'error': 'Device not found'}, status=404)
 
     async def send_command(self, request):
         device_id = request.match_info['device_id']
@@ -106,7 +134,7 @@ class RoborockMicroservice:
         command = data.get('command')
         params = data.get('params', {})
 
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'command': command,
@@ -114,9 +142,36 @@ class RoborockMicroservice:
             'result': 'ok'
         })
 
+    async def send_bulk_commands(self, request):
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return json_response({'error': 'Body must be a JSON object'}, status=400)
+
+        commands = parse_commands(data.get('commands', []), config.bulk_command_max_entries)
+        if commands is None:
+            return json_response({'error': f'commands must be a list of at most {config.bulk_command_max_entries} '
+                                           'objects with string device_id and command'}, status=400)
+        concurrency = parse_concurrency(data.get('concurrency', config.bulk_command_concurrency),
+                                        config.bulk_command_max_concurrency)
+        if concurrency is None:
+            return json_response({'error': 'concurrency must be an integer of at least 1'}, status=400)
+
+        return json_response(await run_bulk_commands(commands, concurrency, self.bulk_command_target,
+                                                     self.command_executor.execute_command))
+
+    def bulk_command_target(self, device_id: str) -> str:
+        if device_id not in self.devices:
+            raise LookupError('Device not found')
+        if self.command_executor.roborock_client is None:
+            raise LookupError('No Roborock client is configured')
+        return device_id
+
     async def get_status(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'device_id': device_id,
             'state': 'charging',
             'battery': 95,
@@ -129,7 +184,7 @@ class RoborockMicroservice:
 
     async def get_consumables(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'device_id': device_id,
             'main_brush': 75,
             'side_brush': 60,
@@ -139,7 +194,7 @@ class RoborockMicroservice:
 
     async def get_clean_summary(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'device_id': device_id,
             'total_duration': 36000,
             'total_area': 450000,
@@ -149,7 +204,7 @@ class RoborockMicroservice:
 
     async def get_map(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'device_id': device_id,
             'map_data': 'base64_encoded_map_data',
             'resolution': 50,
@@ -157,15 +212,16 @@ class RoborockMicroservice:
             'height': 1024,
             'offset_x': 0,
             'offset_y': 0,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self.map_timestamps.setdefault(device_id, datetime.now().isoformat())
         })
 
     async def import_map(self, request):
         device_id = request.match_info['device_id']
 
         map_data = await self.get_raw_map_from_device(device_id)
+        self.map_timestamps[device_id] = datetime.now().isoformat()
 
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'map': {
@@ -177,7 +233,7 @@ class RoborockMicroservice:
                 'offset_y': map_data['offset_y'],
                 'rooms': map_data['rooms']
             },
-            'imported_at': datetime.now().isoformat()
+            'imported_at': self.map_timestamps[device_id]
         })
 
     async def get_raw_map_from_device(self, device_id: str) -> dict:
@@ -196,7 +252,7 @@ class RoborockMicroservice:
 
     async def get_rooms(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'device_id': device_id,
             'rooms': [
                 {'id': 1, 'name': 'Living Room'},
@@ -207,7 +263,7 @@ class RoborockMicroservice:
 
     async def get_position(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'device_id': device_id,
             'x': 512,
             'y': 512,
@@ -216,7 +272,7 @@ class RoborockMicroservice:
 
     async def start_cleaning(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'action': 'start_cleaning'
@@ -227,7 +283,7 @@ class RoborockMicroservice:
         data = await request.json()
         room_ids = data.get('room_ids', [])
 
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'action': 'clean_room',
@@ -236,7 +292,7 @@ class RoborockMicroservice:
 
     async def pause_cleaning(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'action': 'pause'
@@ -244,7 +300,7 @@ class RoborockMicroservice:
 
     async def stop_cleaning(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'action': 'stop'
@@ -252,7 +308,7 @@ class RoborockMicroservice:
 
     async def return_to_dock(self, request):
         device_id = request.match_info['device_id']
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'device_id': device_id,
             'action': 'return_to_dock'
@@ -1,10 +1,16 @@
 import struct
+import time
 import zlib
 from typing import Dict, List, Any, Optional, Tuple
 import logging
 
+from python_common.metrics import counter, histogram
+
 logger = logging.getLogger(__name__)
 
+MAP_PARSE_SECONDS = histogram('map_parse_seconds', 'Roborock map parse duration')
+MAP_PARSE_FAILURES = counter('map_parse_failures_total', 'Roborock maps that failed to parse')
+
 class MapProcessor:
     CHARGER = 1
     IMAGE = 2
@@ -25,6 +31,16 @@ class MapProcessor:
 
     @staticmethod
     def parse_map(raw_data: bytes) -> Optional[Dict[str, Any]]:
+        start = time.perf_counter()
+        map_data = MapProcessor._parse_map(raw_data)
+
+        MAP_PARSE_SECONDS.observe(time.perf_counter() - start)
+        if map_data is None:
+            MAP_PARSE_FAILURES.inc()
+        return map_data
+
+    @staticmethod
+    def _parse_map(raw_data: bytes) -> Optional[Dict[str, Any]]:
         try:
             if raw_data[:2] == b'\x1f\x8b':
                 raw_data = zlib.decompress(raw_data)
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, List, Tuple
+
+# Offline load-test harness shared by the services' bench_load.py scripts: each service provides
+# a simulator and a workload (a callable that sends one request and returns the aiohttp response),
+# this module runs it at every concurrency level and prints throughput, latency and event-loop lag.
+
+Workload = Callable[[], Awaitable[Any]]
+
+def add_load_arguments(parser: argparse.ArgumentParser, latency: float):
+    parser.add_argument('--concurrency', default='1,8,32,128')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--latency', type=float, default=latency, help='simulated device round trip in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--read-ratio', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=1)
+
+def setup(args: argparse.Namespace):
+    # simulated failures are expected, keep executor/client logging out of the report
+    logging.basicConfig(level=logging.CRITICAL)
+    random.seed(args.seed)
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def measure_loop_lag(samples: List[float], interval: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+async def run_level(workload: Workload, concurrency: int, duration: float) -> Tuple[List[float], int, float, List[float]]:
+    latencies: List[float] = []
+    errors = 0
+    lag_samples: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await workload()
+            body = await response.json()
+            latencies.append(time.perf_counter() - start)
+            if response.status >= 400 or (isinstance(body, dict) and body.get('status') == 'partial'):
+                errors += 1
+
+    lag_task = asyncio.create_task(measure_loop_lag(lag_samples))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    lag_task.cancel()
+
+    return latencies, errors, elapsed, lag_samples
+
+async def report(args: argparse.Namespace, make_workload: Callable[[random.Random], Workload], description: str):
+    # one row per --concurrency level; make_workload gets a per-level seeded random generator
+    print(f"{description}, device latency {args.latency * 1000:.0f} ms, failure rate {args.failure_rate:.1%}, "
+          f"read ratio {args.read_ratio:.0%}, {args.duration:.0f} s per level")
+    print(f"{'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'lag p99 ms':>11} {'lag max ms':>11}")
+
+    for concurrency in [int(level) for level in args.concurrency.split(',')]:
+        workload = make_workload(random.Random(args.seed + concurrency))
+        latencies, errors, elapsed, lag = await run_level(workload, concurrency, args.duration)
+        latencies.sort()
+        lag.sort()
+        print(f"{concurrency:>5} {len(latencies) / elapsed:>9.1f} "
+              f"{percentile(latencies, 0.50) * 1000:>8.2f} {percentile(latencies, 0.95) * 1000:>8.2f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.2f} {errors:>7} "
+              f"{percentile(lag, 0.99) * 1000:>11.2f} {(lag[-1] if lag else 0) * 1000:>11.2f}")
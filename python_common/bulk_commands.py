@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Bulk command fan-out for POST /devices/commands: each entry is resolved to a service-specific
+# target (a Matter node id, a Roborock device id) and at most `concurrency` commands run at once.
+
+# target, command, params -> success
+Execute = Callable[[Any, str, Dict[str, Any]], Awaitable[bool]]
+
+def parse_concurrency(value, maximum: int) -> Optional[int]:
+    # bulk concurrency from a request body, capped at maximum; None when invalid
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        return None
+    return min(value, maximum)
+
+def parse_commands(value, limit: int) -> Optional[List[dict]]:
+    # the commands list of a request body; None unless it is a list of at most limit entries, each an
+    # object with a string device_id and command and an object as params
+    if not isinstance(value, list) or len(value) > limit:
+        return None
+    for entry in value:
+        if (not isinstance(entry, dict) or not isinstance(entry.get('device_id'), str)
+                or not isinstance(entry.get('command'), str) or not isinstance(entry.get('params', {}), dict)):
+            return None
+    return value
+
+async def run_bulk_commands(commands: List[dict], concurrency: int, resolve: Callable[[str], Any],
+                            execute: Execute) -> Dict[str, Any]:
+    # resolve returns the command target of a device id and raises LookupError with the reason when there
+    # is none (unknown device, no client); that entry fails with the reason and the others still run
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(result: dict, target: Any, entry: dict):
+        async with semaphore:
+            result['success'] = await execute(target, entry.get('command'), entry.get('params', {}))
+
+    results = []
+    calls = []
+    for entry in commands:
+        device_id = entry.get('device_id')
+        result = {'device_id': device_id, 'command': entry.get('command')}
+        results.append(result)
+        try:
+            target = resolve(device_id)
+        except LookupError as e:
+            result['success'] = False
+            result['error'] = e.args[0]
+            continue
+        calls.append(run(result, target, entry))
+
+    await asyncio.gather(*calls)
+    return {
+        'status': 'success' if all(r['success'] for r in results) else 'partial',
+        'results': results
+    }
@@ -0,0 +1,113 @@
+import asyncio
+import uuid
+from typing import Any, Dict, Iterator, Optional
+
+class DeviceInventory:
+    def __init__(self, tombstone_limit: int = 1000):
+        self.devices: Dict[str, dict] = {}
+        self.revision = 0
+        # device_id -> revision of its last change, kept out of the records so plain listings are unchanged
+        self.revisions: Dict[str, int] = {}
+        # device_id -> revision at which it was removed
+        self.removed: Dict[str, int] = {}
+        # clients that last synced before this revision may have missed pruned removals
+        self.compacted_revision = 0
+        self.tombstone_limit = tombstone_limit
+        self._changed: Optional[asyncio.Event] = None
+        # revisions restart with the process, the instance id keeps ETags and sync positions from an earlier run from matching
+        self.instance = uuid.uuid4().hex[:12]
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self.devices
+
+    def __getitem__(self, device_id: str) -> dict:
+        return self.devices[device_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.devices)
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    @property
+    def etag(self) -> str:
+        # version of the full listing, changes exactly when the revision does
+        return f'{self.instance}.{self.revision}'
+
+    def get(self, device_id: str, default: Any = None) -> Any:
+        return self.devices.get(device_id, default)
+
+    def values(self):
+        return self.devices.values()
+
+    def put(self, device_id: str, record: dict) -> dict:
+        current = self.devices.get(device_id)
+        if current is not None and current == record:
+            return current
+
+        self.removed.pop(device_id, None)
+        self.devices[device_id] = dict(record)
+        self.revisions[device_id] = self._bump()
+        self._notify()
+        return self.devices[device_id]
+
+    def update(self, device_id: str, **fields) -> dict:
+        return self.put(device_id, dict(self.devices[device_id], **fields))
+
+    def remove(self, device_id: str) -> Optional[dict]:
+        record = self.devices.pop(device_id, None)
+        if record is None:
+            return None
+        self.revisions.pop(device_id, None)
+
+        self.removed[device_id] = self._bump()
+        if len(self.removed) > self.tombstone_limit:
+            oldest = min(self.removed, key=self.removed.get)
+            self.compacted_revision = self.removed.pop(oldest)
+        self._notify()
+        return record
+
+    def needs_full_sync(self, revision: int, instance: Optional[str] = None) -> bool:
+        # a revision ahead of ours or from another instance was handed out before a restart
+        if instance is not None and instance != self.instance:
+            return True
+        return revision < self.compacted_revision or revision > self.revision
+
+    def changes_since(self, revision: int, instance: Optional[str] = None) -> Dict[str, Any]:
+        if self.needs_full_sync(revision, instance):
+            return {
+                'instance': self.instance,
+                'revision': self.revision,
+                'full': True,
+                'changed': [dict(record, revision=self.revisions[device_id]) for device_id, record in self.devices.items()],
+                'removed': []
+            }
+
+        return {
+            'instance': self.instance,
+            'revision': self.revision,
+            'full': False,
+            'changed': [dict(self.devices[device_id], revision=changed_at)
+                        for device_id, changed_at in self.revisions.items() if changed_at > revision],
+            'removed': [device_id for device_id, removed_at in self.removed.items() if removed_at > revision]
+        }
+
+    async def wait_for_change(self, revision: int, timeout: float, instance: Optional[str] = None) -> bool:
+        if self.revision != revision or (instance is not None and instance != self.instance):
+            return True
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _bump(self) -> int:
+        self.revision += 1
+        return self.revision
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import json
+import zlib
+from collections import OrderedDict
+from aiohttp import web
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPRESSED_CACHE_SIZE = 64
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def json_response(data: Any, status: int = 200, headers: Optional[dict] = None) -> web.Response:
+    return web.Response(body=dumps(data), status=status, headers=headers, content_type='application/json')
+
+def _pick_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    if 'gzip' in accepted:
+        return 'gzip'
+    if 'deflate' in accepted:
+        return 'deflate'
+    return None
+
+def _representation_etag(etag: str, encoding: Optional[str]) -> str:
+    # each content encoding is its own representation and gets its own strong ETag
+    return f'{etag}-{encoding}' if encoding is not None else etag
+
+def _matching_etag(if_none_match: Iterable, etag: str) -> Optional[str]:
+    # a cached copy of any representation of this content is still valid, whichever encoding it was sent in
+    representations = {etag, _representation_etag(etag, 'gzip'), _representation_etag(etag, 'deflate')}
+    for tag in if_none_match or ():
+        if tag.value == '*' or tag.value in representations:
+            return etag if tag.value == '*' else tag.value
+    return None
+
+def _not_modified(etag: str) -> web.Response:
+    response = web.Response(status=304, headers={'Vary': 'Accept-Encoding'})
+    response.etag = etag
+    return response
+
+def versioned_json_response(request: web.Request, version: str, build: Callable[[], Any]) -> web.Response:
+    # for content with a known version (e.g. an inventory revision): a matching If-None-Match is answered
+    # from the version alone, without building or serializing the body
+    matched = _matching_etag(request.if_none_match, version)
+    if matched is not None:
+        return _not_modified(matched)
+
+    response = json_response(build())
+    response.etag = version
+    return response
+
+def create_response_middleware(min_compress_size: int = 1024):
+    # (etag, encoding) -> compressed body, so unchanged large payloads are compressed once
+    compressed_cache: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+
+    def compress(etag: str, encoding: str, body: bytes) -> bytes:
+        key = (etag, encoding)
+        cached = compressed_cache.get(key)
+        if cached is not None:
+            compressed_cache.move_to_end(key)
+            return cached
+
+        if encoding == 'gzip':
+            cached = gzip.compress(body, compresslevel=6, mtime=0)
+        else:
+            cached = zlib.compress(body, 6)
+
+        compressed_cache[key] = cached
+        if len(compressed_cache) > COMPRESSED_CACHE_SIZE:
+            compressed_cache.popitem(last=False)
+        return cached
+
+    @web.middleware
+    async def response_middleware(request: web.Request, handler):
+        response = await handler(request)
+
+        if (request.method not in ('GET', 'HEAD') or response.status != 200
+                or not isinstance(response, web.Response) or not isinstance(response.body, bytes)):
+            return response
+
+        body = response.body
+        # handlers of versioned content set the ETag themselves, everything else is identified by its body
+        etag = response.etag.value if response.etag is not None else hashlib.blake2b(body, digest_size=16).hexdigest()
+
+        matched = _matching_etag(request.if_none_match, etag)
+        if matched is not None:
+            return _not_modified(matched)
+
+        encoding = None
+        if len(body) >= min_compress_size:
+            encoding = _pick_encoding(request.headers.get('Accept-Encoding', ''))
+            response.headers['Vary'] = 'Accept-Encoding'
+            if encoding is not None:
+                response.body = compress(etag, encoding, body)
+                response.headers['Content-Encoding'] = encoding
+        response.etag = _representation_etag(etag, encoding)
+
+        return response
+
+    return response_middleware
@@ -1,17 +1,100 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import asyncio
 import websockets
 import json
-from typing import Dict, List, Tuple
+import os
+import time
+import requests
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from python_common.metrics import counter, gauge, histogram, start_http_server
+from tracking_python.detection_log import DetectionRecorder
+from tracking_python.detectors import create_detector
+from tracking_python.frame_bus import FrameBus
+from tracking_python.fusion import CameraDetections, MotionEstimator, align
+from tracking_python.heatmap import OccupancyHeatmap
+from tracking_python.position_protocol import PROTOCOLS, PositionDeltaEncoder
+from tracking_python.profiling import FrameProfiler
+from tracking_python.resolution_tuner import ResolutionTuner
+from tracking_python.room_index import RoomIndex
+
+FRAME_STAGE_SECONDS = histogram('frame_stage_seconds', 'Per-frame processing time by stage', ['stage'])
+DECODE_SECONDS = FRAME_STAGE_SECONDS.labels('decode')
+INFERENCE_SECONDS = FRAME_STAGE_SECONDS.labels('inference')
+PROJECTION_SECONDS = FRAME_STAGE_SECONDS.labels('projection')
+BACKEND_REQUEST_SECONDS = histogram('backend_request_seconds', 'Backend request latency by operation', ['operation'])
+SEND_POSITIONS_SECONDS = BACKEND_REQUEST_SECONDS.labels('people_positions')
+BACKEND_FAILURES = counter('backend_request_failures_total', 'Failed backend requests by operation', ['operation'])
+FRAMES_PROCESSED = counter('frames_processed_total', 'Frames run through detection', ['camera'])
+FRAMES_DROPPED = counter('frames_dropped_total', 'Frames that could not be read from the camera', ['camera'])
+POSITIONS_BYTES = counter('people_positions_bytes_total', 'Bytes sent on the people_positions feed', ['protocol'])
+DETECTOR_INPUT_SIZE = gauge('detector_imgsz', 'Inference input size chosen per camera', ['camera'])
+POSITIONS_SKIPPED = counter('people_positions_skipped_total', 'Position frames skipped while the socket was backed up')
 
 class RealtimePeoplePositioning:
-    def __init__(self, camera_configs: Dict):
-        self.model = YOLO('yolov8n.pt')
+    def __init__(self, camera_configs: Dict, detector_backend: str = 'torch', int8: bool = False,
+                 fusion_window: float = 0.3, imgsz: int = 640, auto_imgsz: bool = False):
+        # detector_backend=None: без моделі, детекції подаються через ingest_detections (відтворення запису)
+        self.detector = create_detector(detector_backend, 'yolov8n.pt', imgsz, int8=int8) if detector_backend else None
+        self.imgsz = imgsz
+        # auto_imgsz: для кожної камери найменший розмір входу, за якого люди ще достатньо великі
+        self.auto_imgsz = auto_imgsz
+        self.resolution_tuners: Dict[str, ResolutionTuner] = {}
         self.camera_configs = camera_configs
         self.homography_matrices = {}
-        self.active_detections = {}
+        self.active_detections: Dict[str, CameraDetections] = {}
+        self.motion: Dict[str, MotionEstimator] = {}
+        self.fusion_window = fusion_window
+        self.detections_updated = asyncio.Event()
+        self.frame_buses: Dict[str, FrameBus] = {}
+        self.room_index: Optional[RoomIndex] = None
+        self.heatmap: Optional[OccupancyHeatmap] = None
+        # час кадру останнього внеску в теплову карту
+        self.heatmap_time: Optional[float] = None
+        self.map_data: Optional[Dict] = None
+        self.recorder: Optional[DetectionRecorder] = None
+        self.profiler = FrameProfiler.from_env('realtime')
+        self.profiler.begin_run()
+
+    def start_profiling(self, mode: str = 'sampling', frames: int = None) -> Dict:
+        """Профілювання наступного вікна кадрів (усі камери разом)"""
+        self.profiler.request(mode, frames)
+        return self.profiler.status()
+
+    def load_map(self, backend_url: str, **heatmap_options):
+        """Індекс кімнат і теплова карта присутності на сітці карти з /api/map бекенду"""
+        response = requests.get(f'{backend_url}/api/map', timeout=5)
+        response.raise_for_status()
+        self.map_data = response.json()
+        self.room_index = RoomIndex.from_map(self.map_data)
+        self.heatmap = OccupancyHeatmap.from_map(self.map_data, **heatmap_options)
+
+    def start_recording(self):
+        """Запис сирих детекцій усіх камер для replay_detections.py"""
+        self.recorder = DetectionRecorder()
+
+    def save_recording(self, path: str):
+        """Збереження запису разом з калібруванням камер і картою"""
+        self.recorder.save(path, {
+            'source': 'realtime',
+            'homographies': {camera_id: H.tolist() for camera_id, H in self.homography_matrices.items()},
+            'map': self.map_data,
+        })
+        self.recorder = None
+
+    def heatmap_snapshot(self, query: str) -> Tuple[str, bytes]:
+        """Знімок теплової карти: /heatmap (PNG) або /heatmap?format=npz"""
+        if self.heatmap is None:
+            raise LookupError('Map not loaded')
+        if parse_qs(query).get('format') == ['npz']:
+            return 'application/octet-stream', self.heatmap.to_npz()
+        return 'image/png', self.heatmap.to_png()
+
+    def resolution_status(self, query: str = '') -> Tuple[str, bytes]:
+        """Обраний розмір входу детектора по камерах: /imgsz"""
+        status = {camera_id: tuner.status() for camera_id, tuner in self.resolution_tuners.items()}
+        return 'application/json', json.dumps({'imgsz': self.imgsz, 'cameras': status}).encode('utf-8')
 
     def calibrate_camera(self, camera_id: str, image_points: List[Tuple], map_points: List[Tuple]):
         """Калібрування камери через відповідність точок"""
@@ -25,16 +108,7 @@ class RealtimePeoplePositioning:
 
     def detect_people(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """Детекція людей через YOLOv8"""
-        results = self.model(frame, classes=[0], conf=0.5)
-
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                detections.append((int(x1), int(y1), int(x2), int(y2)))
-
-        return detections
+        return [(int(x1), int(y1), int(x2), int(y2)) for x1, y1, x2, y2, _ in self.detector.detect(frame, 0.5)]
 
     def get_foot_position(self, bbox: Tuple[int, int, int, int]) -> Tuple[float, float]:
         """Визначення позиції стоп людини (нижня середня точка bbox)"""
@@ -58,41 +132,122 @@ class RealtimePeoplePositioning:
 
     async def process_camera_stream(self, camera_id: str, video_source: str):
         """Обробка відео потоку з камери"""
-        cap = cv2.VideoCapture(video_source)
+        frames_processed = FRAMES_PROCESSED.labels(camera_id)
+        frames_dropped = FRAMES_DROPPED.labels(camera_id)
+        input_size = DETECTOR_INPUT_SIZE.labels(camera_id)
+        input_size.set(self.imgsz)
+        tuner = self.resolution_tuners.setdefault(camera_id, ResolutionTuner.up_to(self.imgsz)) if self.auto_imgsz else None
+
+        # декодування у окремому потоці; інші споживачі можуть під'єднатися через bus.name
+        try:
+            bus = FrameBus(video_source, slots=4, lossless=False, on_decoded=self._observe_decode)
+        except IOError:
+            frames_dropped.inc()
+            return
+        self.frame_buses[camera_id] = bus
+        reader = bus.reader()
+        bus.start()
+        reported_dropped = 0
 
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+            frame_data = reader.read(timeout=0)
+            if frame_data is None:
+                if reader.closed:
+                    break
+                await asyncio.sleep(0.005)
+                continue
+            self.profiler.frame_started()
+            frame = frame_data.image
+
+            stage_start = time.perf_counter()
+            if tuner is None:
+                detections = self.detector.detect(frame, 0.5)
+            else:
+                imgsz = tuner.next_size()
+                detections = self.detector.detect(frame, 0.5, imgsz)
+                tuner.observe(detections, frame.shape, imgsz)
+                input_size.set(tuner.imgsz)
+            elapsed = time.perf_counter() - stage_start
+            INFERENCE_SECONDS.observe(elapsed)
+            self.profiler.record('inference', elapsed)
+            if self.recorder is not None:
+                self.recorder.add(camera_id, frame_data.index, frame_data.timestamp, detections)
+
+            self.ingest_detections(camera_id, detections, frame_data.timestamp)
+            frames_processed.inc()
+            self.profiler.frame_finished()
+            dropped = bus.dropped + reader.skipped
+            frames_dropped.inc(dropped - reported_dropped)
+            reported_dropped = dropped
 
-            detections = self.detect_people(frame)
-            positions = []
+            await asyncio.sleep(0.033)
 
-            for detection in detections:
-                foot_pos = self.get_foot_position(detection)
+        reader.close()
+        bus.close()
+        del self.frame_buses[camera_id]
 
-                try:
-                    map_x, map_y = self.project_to_map(camera_id, foot_pos)
-                    positions.append({
-                        'camera_id': camera_id,
-                        'x': map_x,
-                        'y': map_y,
-                        'confidence': 0.85
-                    })
-                except ValueError:
-                    continue
+    def ingest_detections(self, camera_id: str, detections: np.ndarray, timestamp: float):
+        """Проєкція детекцій кадру (x1, y1, x2, y2, conf) на карту і оновлення стану камери"""
+        positions = []
 
-            self.active_detections[camera_id] = positions
+        stage_start = time.perf_counter()
+        for x1, y1, x2, y2, _ in detections:
+            foot_pos = self.get_foot_position((int(x1), int(y1), int(x2), int(y2)))
 
-            await asyncio.sleep(0.033)
+            try:
+                positions.append(self.project_to_map(camera_id, foot_pos))
+            except ValueError:
+                continue
+        elapsed = time.perf_counter() - stage_start
+        PROJECTION_SECONDS.observe(elapsed)
+        self.profiler.record('projection', elapsed)
+
+        # позиції з часом кадру і швидкістю для злиття камер в один момент часу
+        motion = self.motion.setdefault(camera_id, MotionEstimator())
+        self.active_detections[camera_id] = motion.update(positions, timestamp)
+        self.detections_updated.set()
+        if self.heatmap is not None:
+            self.accumulate_heatmap(timestamp)
+
+    def accumulate_heatmap(self, timestamp: float):
+        """Внесок злитих позицій у теплову карту з вагою за час між кадрами (людино-секунди)"""
+        if self.heatmap_time is not None and timestamp <= self.heatmap_time:
+            return
+        # перерва між кадрами довша за вікно злиття (камери не працювали) не зараховується
+        elapsed = 0.0 if self.heatmap_time is None else min(timestamp - self.heatmap_time, self.fusion_window)
+        self.heatmap_time = timestamp
+        if elapsed <= 0:
+            return
+
+        points = [(p['x'], p['y']) for p in self.cluster_positions(timestamp)]
+        if points:
+            self.heatmap.add(points, weight=elapsed)
+
+    def _observe_decode(self, seconds: float):
+        DECODE_SECONDS.observe(seconds)
+        self.profiler.record('decode', seconds)
+
+    def merge_detections(self, threshold: int = 500, at: Optional[float] = None) -> List[Dict]:
+        """Об'єднання детекцій з різних камер, приведених до одного моменту часу, з кімнатами"""
+        if at is None:
+            at = max((camera.timestamp for camera in self.active_detections.values()), default=0.0)
+        merged = self.cluster_positions(at, threshold)
+
+        # кімнати для всіх позицій одним зверненням до растру; поза кімнатами - найближча, як getRoomIdByCoordinates бекенду
+        if merged and self.room_index is not None:
+            points = [(p['x'], p['y']) for p in merged]
+            for position, room_id in zip(merged, self.room_index.room_ids(self.room_index.lookup(points, nearest=True))):
+                position['room_id'] = room_id
 
-        cap.release()
+        return merged
 
-    def merge_detections(self, threshold: int = 500) -> List[Dict]:
-        """Об'єднання детекцій з різних камер"""
-        all_positions = []
-        for camera_detections in self.active_detections.values():
-            all_positions.extend(camera_detections)
+    def cluster_positions(self, at: float, threshold: int = 500) -> List[Dict]:
+        """Позиції всіх камер на момент at; ближчі за threshold вважаються однією людиною"""
+        all_positions = [
+            {'x': x, 'y': y}
+            for points in align(self.active_detections, at, self.fusion_window)
+            for x, y in points.tolist()
+        ]
 
         merged = []
         used = set()
@@ -124,22 +279,70 @@ class RealtimePeoplePositioning:
 
         return merged
 
-    async def send_positions_to_backend(self, backend_url: str):
-        """Відправка позицій на backend через WebSocket"""
+    async def wait_for_detections(self, timeout: float) -> Optional[float]:
+        """Очікування нового кадру з будь-якої камери; None, якщо за timeout кадрів не було"""
+        try:
+            await asyncio.wait_for(self.detections_updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.detections_updated.clear()
+        return max(camera.timestamp for camera in self.active_detections.values())
+
+    def positions_message(self, encoder: Optional[PositionDeltaEncoder], fusion_time: float, now: float):
+        """Повідомлення people_positions на момент fusion_time; None, якщо для дельта-протоколу змін немає"""
+        stage_start = time.perf_counter()
+        merged_positions = self.merge_detections(at=fusion_time)
+        self.profiler.record('merge', time.perf_counter() - stage_start)
+
+        if encoder is None:
+            return json.dumps({
+                'type': 'people_positions',
+                'data': merged_positions
+            })
+        return encoder.encode(merged_positions, now)
+
+    async def send_positions_to_backend(self, backend_url: str, protocol: str = 'json', max_buffered: int = 64 * 1024,
+                                        min_interval: float = 0.033, idle_interval: float = 1.0):
+        """Відправка позицій на backend через WebSocket: json - повний список, msgpack/binary - лише зміни"""
+        encoder = None if protocol == 'json' else PositionDeltaEncoder(protocol)
+        sent_bytes = POSITIONS_BYTES.labels(protocol)
         async with websockets.connect(backend_url) as websocket:
             while True:
-                merged_positions = self.merge_detections()
+                # злиття запускає новий кадр; без кадрів камери зі застарілими даними відпадають за часом
+                fusion_time = await self.wait_for_detections(idle_interval)
+                if fusion_time is None:
+                    fusion_time = time.time()
+
+                # сокет не встигає: пропускаємо застарілий кадр замість черги
+                if encoder is not None and websocket.transport.get_write_buffer_size() > max_buffered:
+                    POSITIONS_SKIPPED.inc()
+                    continue
 
-                message = {
-                    'type': 'people_positions',
-                    'data': merged_positions
-                }
+                message = self.positions_message(encoder, fusion_time, time.time())
+                if message is None:
+                    continue
+
+                stage_start = time.perf_counter()
+                try:
+                    await websocket.send(message)
+                    sent_bytes.inc(len(message))
+                except Exception:
+                    BACKEND_FAILURES.labels('people_positions').inc()
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - stage_start
+                    SEND_POSITIONS_SECONDS.observe(elapsed)
+                    self.profiler.record('send', elapsed)
 
-                await websocket.send(json.dumps(message))
-                await asyncio.sleep(0.1)
+                # обмеження частоти: кадри, що прийшли за цей час, зливаються в наступне повідомлення
+                await asyncio.sleep(min_interval)
 
 
 async def main():
+    # json - для backend_dart; msgpack/binary поки що не має декодера на стороні backend_dart
+    positions_protocol = os.getenv('POSITIONS_PROTOCOL', 'json')
+    if positions_protocol not in PROTOCOLS:
+        raise ValueError(f"Unknown POSITIONS_PROTOCOL {positions_protocol}, expected one of {', '.join(PROTOCOLS)}")
     camera_configs = {
         'living_room_cam': {
             'source': 'rtsp://192.168.1.100/stream',
@@ -154,6 +357,11 @@ async def main():
     }
 
     positioning = RealtimePeoplePositioning(camera_configs)
+    start_http_server(int(os.getenv('METRICS_PORT', '9102')), routes={'/heatmap': positioning.heatmap_snapshot, '/imgsz': positioning.resolution_status})
+    try:
+        positioning.load_map('http://localhost:5000')
+    except Exception as e:
+        print(f"Error loading map: {e}")
 
     positioning.calibrate_camera(
         'living_room_cam',
@@ -164,7 +372,7 @@ async def main():
     tasks = [
         positioning.process_camera_stream('living_room_cam', camera_configs['living_room_cam']['source']),
         positioning.process_camera_stream('kitchen_cam', camera_configs['kitchen_cam']['source']),
-        positioning.send_positions_to_backend('ws://localhost:5000/ws')
+        positioning.send_positions_to_backend('ws://localhost:5000/ws', positions_protocol)
     ]
 
     await asyncio.gather(*tasks)
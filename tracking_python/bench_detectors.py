@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+from trackers import greedy_match, iou_matrix
+
+# Startup time, per-frame latency, peak RSS and agreement (recall/precision at IoU 0.5)
+# with the first backend listed, torch by default:
+# python bench_detectors.py --backends torch,onnx,onnx-int8,openvino --frames 200
+# Each backend runs in its own process so startup and RSS are measured from a cold import.
+
+def run_child(backend: str, video: str, frames: int, imgsz: int, conf: float, output_path: str):
+    start = time.perf_counter()
+    from detectors import create_detector
+    detector = create_detector(backend.replace('-int8', ''), 'yolov8n.pt', imgsz, int8=backend.endswith('-int8'))
+    startup = time.perf_counter() - start
+
+    cap = cv2.VideoCapture(video)
+    latencies, frame_indices, detections = [], [], []
+    first_frame = None
+    while len(latencies) < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if first_frame is None:
+            first_frame = time.perf_counter()
+            detector.detect(frame, conf)
+            first_frame = time.perf_counter() - first_frame
+        frame_start = time.perf_counter()
+        boxes = detector.detect(frame, conf)
+        latencies.append(time.perf_counter() - frame_start)
+        frame_indices.extend([len(latencies) - 1] * len(boxes))
+        detections.append(boxes)
+    cap.release()
+
+    np.savez(output_path, frame_index=np.array(frame_indices, dtype=np.int32),
+             boxes=np.vstack(detections) if detections else np.zeros((0, 5), dtype=np.float32))
+    latencies.sort()
+    print(json.dumps({
+        'startup': startup,
+        'first_frame': first_frame,
+        'frames': len(latencies),
+        'p50': latencies[len(latencies) // 2],
+        'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+def agreement(reference: np.lib.npyio.NpzFile, candidate: np.lib.npyio.NpzFile, frames: int):
+    matched = reference_total = candidate_total = 0
+    for frame in range(frames):
+        ref_boxes = reference['boxes'][reference['frame_index'] == frame, :4]
+        cand_boxes = candidate['boxes'][candidate['frame_index'] == frame, :4]
+        matches, _, _ = greedy_match(iou_matrix(ref_boxes, cand_boxes), 0.5)
+        matched += len(matches)
+        reference_total += len(ref_boxes)
+        candidate_total += len(cand_boxes)
+    recall = matched / reference_total if reference_total else 1.0
+    precision = matched / candidate_total if candidate_total else 1.0
+    return recall, precision
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare person detector backends')
+    parser.add_argument('--video', default='../demo/input2.mp4')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--backends', default='torch,onnx,onnx-int8')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=0.5)
+    parser.add_argument('--child')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.video, args.frames, args.imgsz, args.conf, args.output)
+        return
+
+    print(f"{'backend':<10} {'startup s':>10} {'1st frame ms':>13} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'recall':>7} {'precision':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        reference = None
+        for backend in args.backends.split(','):
+            output_path = os.path.join(tmp, f'{backend}.npz')
+            child = subprocess.run(
+                [sys.executable, __file__, '--child', backend, '--output', output_path, '--video', args.video,
+                 '--frames', str(args.frames), '--imgsz', str(args.imgsz), '--conf', str(args.conf)],
+                capture_output=True, text=True)
+            if child.returncode != 0:
+                print(f"{backend:<10} failed: {child.stderr.strip().splitlines()[-1] if child.stderr.strip() else child.returncode}")
+                continue
+
+            stats = json.loads(child.stdout.strip().splitlines()[-1])
+            result = np.load(output_path)
+            if reference is None:
+                reference = result
+            recall, precision = agreement(reference, result, stats['frames'])
+            print(f"{backend:<10} {stats['startup']:>10.2f} {stats['first_frame'] * 1000:>13.1f} {stats['p50'] * 1000:>8.1f} "
+                  f"{stats['p95'] * 1000:>8.1f} {stats['rss_mb']:>8.0f} {recall:>7.1%} {precision:>10.1%}")
+
+if __name__ == '__main__':
+    main()
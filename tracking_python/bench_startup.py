@@ -0,0 +1,68 @@
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import requests
+
+# Time from process start until /api/calibration answers, with lazy models plus background
+# warmup versus loading the detector and tracker before serving (the previous behaviour):
+# python bench_startup.py --runs 3
+
+RUNNERS = {
+    'lazy': 'import tracking_service as t; t.load_calibration(); t.start_warmup(); t.app.run(port={port})',
+    'eager': 'import tracking_service as t; t.load_calibration(); t.get_detector(); t.get_tracker(t.TRACKER); t.app.run(port={port})',
+}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def rss_mb(pid: int) -> float:
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def measure(mode: str, timeout: float):
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', RUNNERS[mode].format(port=port)],
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                return None
+            try:
+                requests.get(f'http://127.0.0.1:{port}/api/calibration', timeout=1)
+                return time.perf_counter() - start, rss_mb(process.pid)
+            except requests.ConnectionError:
+                time.sleep(0.01)
+        return None
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure tracking_service startup until calibration endpoints answer')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--modes', default='lazy,eager')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'ready s (best)':>15} {'ready s (mean)':>15} {'RSS MB':>8}")
+    for mode in args.modes.split(','):
+        results = [measure(mode, args.timeout) for _ in range(args.runs)]
+        results = [result for result in results if result is not None]
+        if not results:
+            print(f"{mode:<6} failed to start")
+            continue
+        times = [elapsed for elapsed, _ in results]
+        print(f"{mode:<6} {min(times):>15.2f} {sum(times) / len(times):>15.2f} {max(rss for _, rss in results):>8.0f}")
+
+if __name__ == '__main__':
+    main()
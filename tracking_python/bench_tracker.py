@@ -0,0 +1,112 @@
+import argparse
+import time
+from typing import Dict, List
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from ultralytics import YOLO
+
+from trackers import ByteTracker, DeepSortTracker, SelectiveDeepSortTracker, iou_matrix
+
+# Tracker cost and stability on the demo video: python bench_tracker.py --intervals 5,10,30
+# YOLO runs once per frame up front (at the lowest confidence any tracker uses, filtered
+# per tracker afterwards), so fps below is for the tracking stage alone.
+# ID switches are counted against full DeepSort as the reference: a reference track
+# whose matched track id changes between frames counts as one switch.
+
+def detect_all(video_path: str, max_frames: int, conf: float) -> List[List]:
+    model = YOLO('yolov8n.pt', verbose=False)
+    cap = cv2.VideoCapture(video_path)
+    all_detections = []
+    while len(all_detections) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        detections = []
+        for result in model(frame, classes=[0], conf=conf, verbose=False):
+            for box in result.boxes:
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                confidence = box.conf[0].cpu().numpy()
+                detections.append(([int(x1), int(y1), int(x2 - x1), int(y2 - y1)], confidence, 'person'))
+        all_detections.append(detections)
+    cap.release()
+    return all_detections
+
+def run_tracker(tracker, video_path: str, all_detections: List[List], conf: float):
+    cap = cv2.VideoCapture(video_path)
+    per_frame: List[Dict[str, np.ndarray]] = []
+    elapsed = 0.0
+    for detections in all_detections:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        detections = [d for d in detections if d[1] >= conf]
+        start = time.perf_counter()
+        tracks = tracker.update(detections, frame)
+        elapsed += time.perf_counter() - start
+        per_frame.append({track.track_id: np.asarray(track.to_ltrb(), dtype=np.float32) for track in tracks if track.is_confirmed()})
+    cap.release()
+    return per_frame, elapsed
+
+def count_id_switches(reference: List[Dict], candidate: List[Dict], min_iou: float = 0.5) -> int:
+    switches = 0
+    last_match: Dict[str, str] = {}
+    for ref_tracks, cand_tracks in zip(reference, candidate):
+        if not ref_tracks or not cand_tracks:
+            continue
+        ref_ids, ref_boxes = list(ref_tracks), np.stack(list(ref_tracks.values()))
+        cand_ids, cand_boxes = list(cand_tracks), np.stack(list(cand_tracks.values()))
+        ious = iou_matrix(ref_boxes, cand_boxes)
+
+        # as in CLEAR MOT, correspondences from the previous frame are kept while they still overlap
+        cand_index = {cand_id: j for j, cand_id in enumerate(cand_ids)}
+        for i, ref_id in enumerate(ref_ids):
+            j = cand_index.get(last_match.get(ref_id))
+            if j is not None and ious[i, j] >= min_iou:
+                ious[i, :] = -1.0
+                ious[:, j] = -1.0
+
+        for i, j in zip(*linear_sum_assignment(-ious)):
+            if ious[i, j] < min_iou:
+                continue
+            ref_id = ref_ids[i]
+            if ref_id in last_match and last_match[ref_id] != cand_ids[j]:
+                switches += 1
+            last_match[ref_id] = cand_ids[j]
+    return switches
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare tracker backends on a video')
+    parser.add_argument('--video', default='../demo/input2.mp4')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--intervals', default='5,10,30')
+    args = parser.parse_args()
+
+    all_detections = detect_all(args.video, args.frames, ByteTracker.detection_conf)
+    print(f"{len(all_detections)} frames, {sum(len(d) for d in all_detections)} detections")
+
+    reference, reference_time = run_tracker(DeepSortTracker(max_age=30, n_init=3, max_iou_distance=0.7), args.video,
+                                            all_detections, DeepSortTracker.detection_conf)
+    frames = len(reference)
+
+    print(f"{'tracker':<18} {'fps':>8} {'ms/frame':>9} {'tracks':>7} {'id switches':>12} {'embeds':>8}")
+    total_detections = sum(1 for d in all_detections[:frames] for det in d if det[1] >= DeepSortTracker.detection_conf)
+    reference_ids = len({track_id for tracks in reference for track_id in tracks})
+    print(f"{'deepsort':<18} {frames / reference_time:>8.1f} {reference_time / frames * 1000:>9.2f} "
+          f"{reference_ids:>7} {'ref':>12} {total_detections:>8}")
+
+    for interval in [int(value) for value in args.intervals.split(',')]:
+        tracker = SelectiveDeepSortTracker(embed_interval=interval, max_age=30, n_init=3, max_iou_distance=0.7)
+        per_frame, elapsed = run_tracker(tracker, args.video, all_detections, tracker.detection_conf)
+        track_ids = len({track_id for tracks in per_frame for track_id in tracks})
+        print(f"{f'selective k={interval}':<18} {frames / elapsed:>8.1f} {elapsed / frames * 1000:>9.2f} "
+              f"{track_ids:>7} {count_id_switches(reference, per_frame):>12} {tracker.deepsort.embeds_computed:>8}")
+
+    tracker = ByteTracker(max_age=30, n_init=3)
+    per_frame, elapsed = run_tracker(tracker, args.video, all_detections, tracker.detection_conf)
+    track_ids = len({track_id for tracks in per_frame for track_id in tracks})
+    print(f"{'bytetrack':<18} {frames / elapsed:>8.1f} {elapsed / frames * 1000:>9.2f} "
+          f"{track_ids:>7} {count_id_switches(reference, per_frame):>12} {0:>8}")
+
+if __name__ == '__main__':
+    main()
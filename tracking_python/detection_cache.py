@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Confirmed tracks per frame of an offline video, stored column-wise as .npy files so a
+# cache hit is memory-mapped instead of read: cache/detections/<key>/{frame_index,
+# track_id, bbox, conf}.npy plus meta.json. The key covers the video content hash,
+# detector model, confidence threshold and tracker, so recalibration reuses the entry.
+
+COLUMNS = ('frame_index', 'track_id', 'bbox', 'conf')
+
+def video_hash(path: str, index_path: Optional[str] = None) -> str:
+    # full-content hash, memoized by size and mtime so unchanged files are hashed once
+    stat = os.stat(path)
+    fingerprint = [stat.st_size, stat.st_mtime_ns]
+    index = {}
+    if index_path and os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        entry = index.get(os.path.abspath(path))
+        if entry and entry[:2] == fingerprint:
+            return entry[2]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 22), b''):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+
+    if index_path:
+        index[os.path.abspath(path)] = fingerprint + [content_hash]
+        os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+        with open(index_path, 'w') as f:
+            json.dump(index, f)
+    return content_hash
+
+class TrackTable(NamedTuple):
+    frame_index: np.ndarray
+    track_id: np.ndarray
+    bbox: np.ndarray
+    conf: np.ndarray
+    total_frames: int
+
+    def frames(self) -> Iterator[Tuple[int, slice]]:
+        # rows are sorted by frame, so every frame is a contiguous slice
+        bounds = np.searchsorted(self.frame_index, np.arange(self.total_frames + 1))
+        for frame in range(self.total_frames):
+            yield frame, slice(bounds[frame], bounds[frame + 1])
+
+class TrackRecorder:
+    def __init__(self):
+        self._frames: List[np.ndarray] = []
+        self._track_ids: List[np.ndarray] = []
+        self._boxes: List[np.ndarray] = []
+        self._confs: List[np.ndarray] = []
+        self.total_frames = 0
+
+    def add_frame(self, frame_index: int, track_ids: List, boxes: np.ndarray, confs: List[Optional[float]]):
+        self.total_frames = frame_index + 1
+        if not track_ids:
+            return
+        self._frames.append(np.full(len(track_ids), frame_index, dtype=np.int32))
+        self._track_ids.append(np.array([int(track_id) for track_id in track_ids], dtype=np.int32))
+        self._boxes.append(np.asarray(boxes, dtype=np.float64).reshape(-1, 4))
+        self._confs.append(np.array([np.nan if conf is None else conf for conf in confs], dtype=np.float32))
+
+    def table(self) -> TrackTable:
+        if not self._frames:
+            return TrackTable(np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros((0, 4), np.float64),
+                              np.zeros(0, np.float32), self.total_frames)
+        return TrackTable(np.concatenate(self._frames), np.concatenate(self._track_ids),
+                          np.vstack(self._boxes), np.concatenate(self._confs), self.total_frames)
+
+class DetectionCache:
+    def __init__(self, cache_dir: str = 'cache/detections'):
+        self.cache_dir = cache_dir
+
+    def key(self, video_path: str, model: str, conf: float, tracker: str) -> str:
+        content_hash = video_hash(video_path, os.path.join(self.cache_dir, 'video_hashes.json'))
+        settings = hashlib.blake2b(f'{model}|{conf}|{tracker}'.encode(), digest_size=6).hexdigest()
+        return f'{content_hash}-{settings}'
+
+    def load(self, key: str) -> Optional[TrackTable]:
+        path = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in COLUMNS}
+        return TrackTable(total_frames=meta['total_frames'], **columns)
+
+    def store(self, key: str, table: TrackTable, meta: Dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.cache_dir)
+        for name in COLUMNS:
+            np.save(os.path.join(staging, f'{name}.npy'), getattr(table, name))
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(dict(meta, total_frames=table.total_frames, rows=len(table.frame_index)), f, indent=2)
+
+        # readers only ever see complete entries
+        path = os.path.join(self.cache_dir, key)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(staging, path)
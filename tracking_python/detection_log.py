@@ -0,0 +1,71 @@
+import json
+import os
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+import numpy as np
+
+# Raw detector output of a live run, for replaying everything after inference without
+# video, weights or backend. One compressed .npz per run, column-wise:
+#   cameras      camera names
+#   frame_*      camera number, frame index, timestamp (seconds) per frame
+#   offsets      detections of frame i are rows offsets[i]:offsets[i + 1]
+#   boxes, conf  float32 x1, y1, x2, y2 and confidence exactly as the detector returned them
+#   meta         JSON: source, tracker, homographies per camera, /api/map response
+
+class DetectionLog(NamedTuple):
+    cameras: List[str]
+    frame_camera: np.ndarray
+    frame_index: np.ndarray
+    timestamp: np.ndarray
+    offsets: np.ndarray
+    boxes: np.ndarray
+    conf: np.ndarray
+    meta: Dict
+
+    @classmethod
+    def load(cls, path: str) -> 'DetectionLog':
+        with np.load(path) as data:
+            return cls(data['cameras'].tolist(), data['frame_camera'], data['frame_index'], data['timestamp'],
+                       data['offsets'], data['boxes'], data['conf'], json.loads(str(data['meta'])))
+
+    def __len__(self) -> int:
+        return len(self.frame_index)
+
+    def frames(self) -> Iterator[Tuple[str, int, float, np.ndarray]]:
+        # camera, frame index, timestamp, (N, 5) detections in detector output format
+        detections = np.hstack([self.boxes, self.conf[:, None]])
+        for frame in range(len(self)):
+            yield (self.cameras[self.frame_camera[frame]], int(self.frame_index[frame]), float(self.timestamp[frame]),
+                   detections[self.offsets[frame]:self.offsets[frame + 1]])
+
+class DetectionRecorder:
+    def __init__(self):
+        self._cameras: Dict[str, int] = {}
+        self._frames: List[Tuple[int, int, float]] = []
+        self._counts: List[int] = []
+        self._detections: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def add(self, camera: str, frame_index: int, timestamp: float, detections: np.ndarray):
+        detections = np.asarray(detections, dtype=np.float32).reshape(-1, 5)
+        camera_number = self._cameras.setdefault(camera, len(self._cameras))
+        self._frames.append((camera_number, frame_index, timestamp))
+        self._counts.append(len(detections))
+        self._detections.append(detections)
+
+    def save(self, path: str, meta: Dict):
+        frames = np.array(self._frames, dtype=np.float64).reshape(-1, 3)
+        detections = np.vstack(self._detections) if self._detections else np.zeros((0, 5), np.float32)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez_compressed(
+            path,
+            cameras=np.array(list(self._cameras), dtype=str),
+            frame_camera=frames[:, 0].astype(np.uint16),
+            frame_index=frames[:, 1].astype(np.int32),
+            timestamp=frames[:, 2],
+            offsets=np.concatenate([[0], np.cumsum(self._counts, dtype=np.int64)]),
+            boxes=np.ascontiguousarray(detections[:, :4]),
+            conf=np.ascontiguousarray(detections[:, 4]),
+            meta=np.array(json.dumps(meta)),
+        )
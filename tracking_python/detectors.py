@@ -0,0 +1,155 @@
+import os
+import shutil
+from typing import Dict, Optional
+import cv2
+import numpy as np
+
+# Person detectors. detect(frame, conf, imgsz=None) returns an (N, 5) float32 array of
+# x1, y1, x2, y2, confidence in frame pixels; imgsz overrides the input size per call. torch runs ultralytics YOLO directly;
+# onnx and openvino export the model once to models/<name>-<imgsz>[-int8].onnx and run
+# it through onnxruntime, so ultralytics/torch are only imported while exporting.
+
+PERSON_CLASS = 0
+EMPTY_DETECTIONS = np.zeros((0, 5), dtype=np.float32)
+
+def export_onnx(model_path: str = 'yolov8n.pt', imgsz: int = 640, int8: bool = False, cache_dir: str = 'models') -> str:
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    fp32_path = os.path.join(cache_dir, f'{name}-{imgsz}.onnx')
+    int8_path = os.path.join(cache_dir, f'{name}-{imgsz}-int8.onnx')
+
+    if not os.path.exists(fp32_path):
+        from ultralytics import YOLO
+        os.makedirs(cache_dir, exist_ok=True)
+        exported = YOLO(model_path).export(format='onnx', imgsz=imgsz, dynamic=False, verbose=False)
+        shutil.move(exported, fp32_path)
+        print(f"Exported {model_path} to {fp32_path}")
+
+    if not int8:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+        print(f"Quantized {fp32_path} to {int8_path}")
+    return int8_path
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size > 0:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        x1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+        intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = intersection / np.maximum(areas[best] + areas[rest] - intersection, 1e-6)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+class TorchDetector:
+    def __init__(self, model_path: str = 'yolov8n.pt', imgsz: int = 640, threads: Optional[int] = None):
+        from ultralytics import YOLO
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = YOLO(model_path, verbose=False)
+        self.imgsz = imgsz
+
+    def detect(self, frame: np.ndarray, conf: float = 0.5, imgsz: Optional[int] = None) -> np.ndarray:
+        results = self.model(frame, classes=[PERSON_CLASS], conf=conf, imgsz=imgsz or self.imgsz, verbose=False)
+        detections = [
+            np.hstack([result.boxes.xyxy.cpu().numpy(), result.boxes.conf.cpu().numpy()[:, None]])
+            for result in results if len(result.boxes)
+        ]
+        return np.vstack(detections).astype(np.float32) if detections else EMPTY_DETECTIONS
+
+class OnnxDetector:
+    def __init__(self, model_path: str = 'yolov8n.pt', imgsz: int = 640, int8: bool = False,
+                 provider: str = 'cpu', iou_threshold: float = 0.7, threads: Optional[int] = None):
+        import onnxruntime as ort
+
+        onnx_path = model_path if model_path.endswith('.onnx') else export_onnx(model_path, imgsz, int8)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        providers = ['CPUExecutionProvider']
+        if provider == 'openvino' and 'OpenVINOExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'OpenVINOExecutionProvider')
+        self.session = ort.InferenceSession(onnx_path, options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+
+        self.model_path = model_path
+        self.imgsz = imgsz
+        self.int8 = int8
+        self.provider = provider
+        self.threads = threads
+        self.iou_threshold = iou_threshold
+        # exported models have a fixed input size, other sizes get their own session
+        self._resized: Dict[int, 'OnnxDetector'] = {imgsz: self}
+        # letterbox canvas and network input are reused for every frame
+        self.canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+        self.input = np.empty((1, 3, imgsz, imgsz), dtype=np.float32)
+        self._layout = None
+
+    def detect(self, frame: np.ndarray, conf: float = 0.5, imgsz: Optional[int] = None) -> np.ndarray:
+        if imgsz and imgsz != self.imgsz:
+            return self.at_size(imgsz).detect(frame, conf)
+        scale, pad_x, pad_y = self._preprocess(frame)
+        output = self.session.run(None, {self.input_name: self.input})[0][0]
+
+        # output rows: cx, cy, w, h, then one score per class over all anchors
+        scores = output[4 + PERSON_CLASS]
+        candidates = np.flatnonzero(scores >= conf)
+        if candidates.size == 0:
+            return EMPTY_DETECTIONS
+
+        cx, cy, w, h = output[:4, candidates]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        scores = scores[candidates]
+        keep = nms(boxes, scores, self.iou_threshold)
+        boxes, scores = boxes[keep], scores[keep]
+
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / scale, 0, frame.shape[1])
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / scale, 0, frame.shape[0])
+        return np.hstack([boxes, scores[:, None]]).astype(np.float32)
+
+    def at_size(self, imgsz: int) -> 'OnnxDetector':
+        if self.model_path.endswith('.onnx'):
+            return self
+        if imgsz not in self._resized:
+            self._resized[imgsz] = OnnxDetector(self.model_path, imgsz, self.int8, self.provider, self.iou_threshold,
+                                                self.threads)
+        return self._resized[imgsz]
+
+    def _preprocess(self, frame: np.ndarray):
+        height, width = frame.shape[:2]
+        if self._layout is None or self._layout[0] != (height, width):
+            scale = min(self.imgsz / height, self.imgsz / width)
+            new_width, new_height = int(round(width * scale)), int(round(height * scale))
+            pad_x, pad_y = (self.imgsz - new_width) // 2, (self.imgsz - new_height) // 2
+            self.canvas[:] = 114
+            self._layout = ((height, width), scale, new_width, new_height, pad_x, pad_y)
+
+        _, scale, new_width, new_height, pad_x, pad_y = self._layout
+        self.canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = cv2.resize(
+            frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+        # BGR HWC uint8 -> RGB CHW float32 in [0, 1], written straight into the input buffer
+        np.multiply(self.canvas[:, :, ::-1].transpose(2, 0, 1), 1 / 255.0, out=self.input[0], casting='unsafe')
+        return scale, pad_x, pad_y
+
+DETECTORS = ('torch', 'onnx', 'openvino')
+
+def create_detector(backend: str = 'torch', model_path: str = 'yolov8n.pt', imgsz: int = 640, int8: bool = False,
+                    threads: Optional[int] = None):
+    if backend == 'torch':
+        return TorchDetector(model_path, imgsz, threads=threads)
+    if backend in ('onnx', 'openvino'):
+        return OnnxDetector(model_path, imgsz, int8=int8, provider='openvino' if backend == 'openvino' else 'cpu',
+                            threads=threads)
+    raise ValueError(f"Unknown detector backend {backend}, expected one of {DETECTORS}")
@@ -0,0 +1,243 @@
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, NamedTuple, Optional
+import cv2
+import numpy as np
+
+# Decode a video source once into a ring of shared-memory frames that any number of
+# threads or processes read without copying. Layout of the shared block:
+#   header  int64[8]                 published, closed, slots, max_consumers, height, width, channels, dropped
+#   cursors int64[max_consumers]     lowest sequence each consumer may still read, -1 if unused
+#   meta    float64[slots, 2]        frame index and timestamp per slot
+#   frames  uint8[slots, h, w, c]
+# The decoder never overwrites a slot a consumer may still read: in lossless mode (files)
+# it waits for the slowest consumer, in lossy mode (cameras) it drops the decoded frame.
+
+HEADER_FIELDS = 8
+PUBLISHED, CLOSED, SLOTS, MAX_CONSUMERS, HEIGHT, WIDTH, CHANNELS, DROPPED = range(HEADER_FIELDS)
+
+class Frame(NamedTuple):
+    image: np.ndarray
+    index: int
+    timestamp: float
+    sequence: int
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # before Python 3.13 attaching registers the block with the resource tracker, which
+    # would unlink it when a reader process exits; only the creating bus owns cleanup
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+class _RingView:
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        slots, max_consumers = int(self.header[SLOTS]), int(self.header[MAX_CONSUMERS])
+        shape = (int(self.header[HEIGHT]), int(self.header[WIDTH]), int(self.header[CHANNELS]))
+        offset = self.header.nbytes
+        self.cursors = np.ndarray((max_consumers,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += self.cursors.nbytes
+        self.meta = np.ndarray((slots, 2), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset += self.meta.nbytes
+        self.frames = np.ndarray((slots,) + shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+        self.slots = slots
+
+    @staticmethod
+    def size(slots: int, max_consumers: int, shape) -> int:
+        return 8 * (HEADER_FIELDS + max_consumers + slots * 2) + slots * int(np.prod(shape))
+
+    def release(self):
+        # numpy views must go before the buffer can be closed
+        self.header = self.cursors = self.meta = self.frames = None
+        self.shm.close()
+
+class FrameReader:
+    def __init__(self, name: str, consumer_id: int, lossless: bool = True, poll_interval: float = 0.001):
+        self._ring = _RingView(_attach(name))
+        self.consumer_id = consumer_id
+        self.lossless = lossless
+        self.poll_interval = poll_interval
+        self.skipped = 0
+        self._next = int(self._ring.cursors[consumer_id]) if self._ring.cursors[consumer_id] >= 0 else 0
+        self._ring.cursors[consumer_id] = self._next
+
+    @property
+    def closed(self) -> bool:
+        header = self._ring.header
+        return bool(header[CLOSED]) and self._next >= header[PUBLISHED]
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        # the returned image is a view into shared memory, valid until the next read()
+        ring = self._ring
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while ring.header[PUBLISHED] <= self._next:
+            if ring.header[CLOSED] or (deadline is not None and time.monotonic() >= deadline):
+                return None
+            time.sleep(self.poll_interval)
+
+        if self.lossless:
+            sequence = self._next
+        else:
+            sequence = int(ring.header[PUBLISHED]) - 1
+            self.skipped += sequence - self._next
+        ring.cursors[self.consumer_id] = sequence
+        self._next = sequence + 1
+
+        slot = sequence % ring.slots
+        index, timestamp = ring.meta[slot]
+        return Frame(ring.frames[slot], int(index), float(timestamp), sequence)
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self):
+        if self._ring.shm is not None:
+            self._ring.cursors[self.consumer_id] = -1
+            self._ring.release()
+            self._ring.shm = None
+
+class FrameBus:
+    def __init__(self, source, slots: int = 8, lossless: bool = False, max_consumers: int = 8,
+                 on_decoded: Optional[Callable[[float], None]] = None):
+        self.source = source
+        self.lossless = lossless
+        self.on_decoded = on_decoded
+        self._cap = cv2.VideoCapture(source)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        start = time.perf_counter()
+        ret, first_frame = self._cap.read()
+        if not ret:
+            self._cap.release()
+            raise IOError(f"Cannot read from video source {source}")
+        decode_seconds = time.perf_counter() - start
+
+        shape = first_frame.shape if first_frame.ndim == 3 else first_frame.shape + (1,)
+        self._shm = shared_memory.SharedMemory(create=True, size=_RingView.size(slots, max_consumers, shape))
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self._shm.buf)
+        header[:] = 0
+        header[SLOTS], header[MAX_CONSUMERS] = slots, max_consumers
+        header[HEIGHT], header[WIDTH], header[CHANNELS] = shape
+        del header
+        self._ring = _RingView(self._shm)
+        self._ring.cursors[:] = -1
+        self.name = self._shm.name
+        self._consumers_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # set when the decoder reached the end of the source, as opposed to being stopped
+        self.ended = False
+
+        self._publish(0, first_frame.reshape(shape), 0, decode_seconds)
+        # kept for the lifetime of the bus: calibration asks for frame 0 long after its slot was reused
+        self.first_frame = Frame(first_frame, 0, float(self._ring.meta[0, 1]), 0)
+
+    @property
+    def published(self) -> int:
+        return int(self._ring.header[PUBLISHED])
+
+    @property
+    def dropped(self) -> int:
+        return int(self._ring.header[DROPPED])
+
+    def allocate_consumer(self, latest: bool = False) -> int:
+        # register before start() so a lossless decoder cannot run ahead of the consumer; a consumer
+        # joining a running bus starts at the newest frame with latest=True. Closed readers free their slot.
+        with self._consumers_lock:
+            free = np.flatnonzero(self._ring.cursors < 0)
+            if free.size == 0:
+                raise RuntimeError('No free consumer slots on the frame bus')
+            consumer_id = int(free[0])
+            self._ring.cursors[consumer_id] = self.published - 1 if latest else 0
+        return consumer_id
+
+    def reader(self) -> FrameReader:
+        return FrameReader(self.name, self.allocate_consumer(), lossless=self.lossless)
+
+    def snapshot(self, timeout: float = 1.0) -> Optional[Frame]:
+        # copy of the newest frame through a short-lived extra consumer, without a second decoder
+        reader = FrameReader(self.name, self.allocate_consumer(latest=True), lossless=False)
+        try:
+            frame = reader.read(timeout)
+            return None if frame is None else frame._replace(image=frame.image.copy())
+        finally:
+            reader.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self._ring.header[CLOSED] = 1
+        self._ring.release()
+        self._shm.unlink()
+
+    def _run(self):
+        sequence = 1
+        index = 1
+        frames = self._ring.frames
+        try:
+            while not self._stop.is_set():
+                slot_free = self._slot_free(sequence) or (self.lossless and self._wait_for_slot(sequence))
+                if self._stop.is_set():
+                    break
+
+                # decode straight into the ring slot when it is free
+                target = frames[sequence % self._ring.slots] if slot_free else None
+                start = time.perf_counter()
+                ret, image = self._cap.read(target) if target is not None and target.shape[2] == 3 else self._cap.read()
+                if not ret:
+                    self.ended = True
+                    break
+                decode_seconds = time.perf_counter() - start
+                index += 1
+
+                if target is None or image.size != target.size:
+                    self._ring.header[DROPPED] += 1
+                    continue
+                self._publish(sequence, image.reshape(target.shape), index - 1, decode_seconds)
+                sequence += 1
+        finally:
+            self._cap.release()
+            self._ring.header[CLOSED] = 1
+
+    def _slot_free(self, sequence: int) -> bool:
+        active = self._ring.cursors[self._ring.cursors >= 0]
+        return active.size == 0 or sequence - self._ring.slots < active.min()
+
+    def _wait_for_slot(self, sequence: int) -> bool:
+        while not self._stop.is_set():
+            if self._slot_free(sequence):
+                return True
+            time.sleep(0.001)
+        return False
+
+    def _publish(self, sequence: int, image: np.ndarray, index: int, decode_seconds: float):
+        slot = sequence % self._ring.slots
+        if not np.shares_memory(image, self._ring.frames[slot]):
+            self._ring.frames[slot] = image
+        self._ring.meta[slot] = (index, time.time())
+        self._ring.header[PUBLISHED] = sequence + 1
+        if self.on_decoded is not None:
+            self.on_decoded(decode_seconds)
@@ -0,0 +1,56 @@
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+
+# Multi-camera fusion at a common time. Every camera's detections carry the timestamp of
+# the frame they came from and a velocity estimated by matching them to the camera's
+# previous frame; fusing at time t moves each detection to where it should be at t and
+# leaves out cameras whose latest frame is older than the fusion window.
+
+class CameraDetections(NamedTuple):
+    timestamp: float
+    points: np.ndarray
+    velocities: np.ndarray
+
+class MotionEstimator:
+    # per camera: nearest-neighbour matching between consecutive frames, smoothed velocity
+    def __init__(self, match_distance: float = 1000.0, smoothing: float = 0.5, max_speed: float = 3000.0):
+        self.match_distance = match_distance
+        self.smoothing = smoothing
+        self.max_speed = max_speed
+        self._points = np.zeros((0, 2))
+        self._velocities = np.zeros((0, 2))
+        self._timestamp: Optional[float] = None
+
+    def update(self, points: np.ndarray, timestamp: float) -> CameraDetections:
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        velocities = np.zeros_like(points)
+        dt = None if self._timestamp is None else timestamp - self._timestamp
+
+        if dt and dt > 0 and len(points) and len(self._points):
+            distances = np.linalg.norm(points[:, None, :] - self._points[None, :, :], axis=2)
+            used_new, used_old = set(), set()
+            for flat_index in np.argsort(distances, axis=None):
+                new, old = divmod(int(flat_index), distances.shape[1])
+                if distances[new, old] > self.match_distance:
+                    break
+                if new in used_new or old in used_old:
+                    continue
+                used_new.add(new)
+                used_old.add(old)
+                measured = (points[new] - self._points[old]) / dt
+                velocity = self.smoothing * self._velocities[old] + (1 - self.smoothing) * measured
+                speed = np.linalg.norm(velocity)
+                velocities[new] = velocity if speed <= self.max_speed else velocity * (self.max_speed / speed)
+
+        self._points, self._velocities, self._timestamp = points, velocities, timestamp
+        return CameraDetections(timestamp, points, velocities)
+
+def align(detections: Dict[str, CameraDetections], at: float, window: float) -> List[np.ndarray]:
+    # detections of every camera no older than `window`, predicted forward to `at`
+    aligned = []
+    for camera in detections.values():
+        age = at - camera.timestamp
+        if age > window or len(camera.points) == 0:
+            continue
+        aligned.append(camera.points + camera.velocities * max(age, 0.0))
+    return aligned
@@ -0,0 +1,104 @@
+import io
+import time
+from typing import Dict, Optional
+import cv2
+import numpy as np
+
+try:
+    from room_index import world_to_blocks
+except ImportError:
+    # imported as tracking_python.heatmap by realtime_people_positioning.py
+    from tracking_python.room_index import world_to_blocks
+
+# Long-running occupancy heatmap on the map's block grid. Memory is fixed at construction:
+# either one float32 grid with exponential time decay (half_life seconds), applied lazily
+# through a shared scale factor instead of touching every cell per frame, or a ring of
+# `windows` fixed windows of `window` seconds each whose sum covers the recent period.
+# World coordinates map to blocks with room_index.world_to_blocks.
+
+class OccupancyHeatmap:
+    def __init__(self, width: int, height: int, left: int = 0, top: int = 0, half_life: float = 600.0,
+                 window: Optional[float] = None, windows: int = 6):
+        self.width, self.height = width, height
+        self.left, self.top = left, top
+        self.half_life = half_life
+        self.window = window
+        self.samples = 0
+
+        if window is None:
+            self._grid = np.zeros((height, width), dtype=np.float32)
+            # stored values are true values scaled by 2 ** ((t - epoch) / half_life) at the time they were added
+            self._epoch: Optional[float] = None
+        else:
+            self._windows = np.zeros((windows, height, width), dtype=np.float32)
+            self._window_ids = np.full(windows, -1, dtype=np.int64)
+
+    @classmethod
+    def from_map(cls, map_data: Dict, **kwargs) -> Optional['OccupancyHeatmap']:
+        dimensions = map_data.get('image_dimensions')
+        if not dimensions:
+            return None
+        return cls(dimensions['width'], dimensions['height'], dimensions.get('left', 0), dimensions.get('top', 0), **kwargs)
+
+    def add(self, points: np.ndarray, now: Optional[float] = None, weight: float = 1.0):
+        # (N, 2) world x, y
+        self.add_blocks(world_to_blocks(points, self.left, self.top), now, weight)
+
+    def add_blocks(self, blocks: np.ndarray, now: Optional[float] = None, weight: float = 1.0):
+        blocks = np.asarray(blocks).reshape(-1, 2).astype(np.int64)
+        inside = (blocks[:, 0] >= 0) & (blocks[:, 0] < self.width) & (blocks[:, 1] >= 0) & (blocks[:, 1] < self.height)
+        blocks = blocks[inside]
+        if len(blocks) == 0:
+            return
+        now = time.time() if now is None else now
+        self.samples += len(blocks)
+
+        if self.window is None:
+            grid, weight = self._grid, weight * self._decay_scale(now)
+        else:
+            grid = self._current_window(now)
+        np.add.at(grid, (blocks[:, 1], blocks[:, 0]), weight)
+
+    def snapshot(self, now: Optional[float] = None) -> np.ndarray:
+        now = time.time() if now is None else now
+        if self.window is None:
+            if self._epoch is None:
+                return np.zeros_like(self._grid)
+            return self._grid * np.float32(2.0 ** (-(now - self._epoch) / self.half_life))
+
+        current = int(now // self.window)
+        recent = (self._window_ids > current - len(self._window_ids)) & (self._window_ids <= current)
+        return self._windows[recent].sum(axis=0)
+
+    def to_npz(self, now: Optional[float] = None) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, heatmap=self.snapshot(now), origin=np.array([self.left, self.top]),
+                            samples=np.array(self.samples))
+        return buffer.getvalue()
+
+    def to_png(self, now: Optional[float] = None, colormap: bool = True) -> bytes:
+        snapshot = self.snapshot(now)
+        peak = float(snapshot.max())
+        image = (snapshot * (255.0 / peak)).astype(np.uint8) if peak > 0 else np.zeros(snapshot.shape, np.uint8)
+        if colormap:
+            image = cv2.applyColorMap(image, cv2.COLORMAP_JET)
+            image[snapshot == 0] = 0
+        return cv2.imencode('.png', image)[1].tobytes()
+
+    def _decay_scale(self, now: float) -> float:
+        if self._epoch is None:
+            self._epoch = now
+        exponent = (now - self._epoch) / self.half_life
+        if exponent > 20:
+            # fold the decay into the grid before the scale factor loses float32 precision
+            self._grid *= np.float32(2.0 ** -exponent)
+            self._epoch, exponent = now, 0.0
+        return 2.0 ** exponent
+
+    def _current_window(self, now: float) -> np.ndarray:
+        window_id = int(now // self.window)
+        slot = window_id % len(self._window_ids)
+        if self._window_ids[slot] != window_id:
+            self._windows[slot] = 0
+            self._window_ids[slot] = window_id
+        return self._windows[slot]
@@ -0,0 +1,163 @@
+import struct
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Compact people_positions feed. Instead of the full list every tick, each person gets a
+# stable id and a frame carries only what changed since the last frame that was sent:
+#   add   [id, x, y]    people new to the receiver (and everyone in a keyframe)
+#   move  [id, dx, dy]  people that moved more than `deadband` world units since last sent
+#   del   [id]          people that are gone
+# A keyframe (full state, receiver clears its own) goes out every `keyframe_interval`
+# seconds, so a receiver that joined late or missed a frame resynchronizes.
+# Encodings: 'msgpack' (a map with the keys above) or 'binary':
+#   header <BBIdHHH  version, flags (1 = keyframe), sequence, timestamp, n_add, n_move, n_del
+#   then n_add * <Iii, n_move * <Ihh, n_del * <I
+
+VERSION = 1
+KEYFRAME = 1
+HEADER = struct.Struct('<BBIdHHH')
+ADD_RECORD = np.dtype([('id', '<u4'), ('x', '<i4'), ('y', '<i4')])
+MOVE_RECORD = np.dtype([('id', '<u4'), ('dx', '<i2'), ('dy', '<i2')])
+DELETE_RECORD = np.dtype('<u4')
+PROTOCOLS = ('json', 'msgpack', 'binary')
+MAX_DELTA = np.iinfo(np.int16).max
+
+def _check_protocol(protocol: str):
+    if protocol not in ('msgpack', 'binary'):
+        raise ValueError(f"Unknown position protocol {protocol}, expected msgpack or binary")
+    if protocol == 'msgpack' and msgpack is None:
+        raise ValueError("msgpack is not installed, use the binary protocol")
+
+class PositionDeltaEncoder:
+    def __init__(self, protocol: str = 'binary', deadband: float = 50.0, keyframe_interval: float = 2.0,
+                 match_distance: float = 1000.0):
+        _check_protocol(protocol)
+        self.protocol = protocol
+        self.deadband = deadband
+        self.keyframe_interval = keyframe_interval
+        self.match_distance = match_distance
+        self.sequence = 0
+        self._next_id = 1
+        # people seen in the last encoded tick, and what the receiver last got for each
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._points = np.zeros((0, 2))
+        self._sent: Dict[int, Tuple[int, int]] = {}
+        self._last_keyframe: Optional[float] = None
+
+    def reset(self):
+        # new connection: the next frame is a keyframe
+        self._sent = {}
+        self._last_keyframe = None
+
+    def encode(self, positions: List[Dict], now: float) -> Optional[bytes]:
+        # None when nothing moved past the deadband and no keyframe is due
+        points = np.array([(p['x'], p['y']) for p in positions], dtype=np.float64).reshape(-1, 2)
+        ids = self._assign_ids(points)
+        keyframe = self._last_keyframe is None or now - self._last_keyframe >= self.keyframe_interval
+
+        add, move = [], []
+        current = {}
+        for person_id, (x, y) in zip(ids.tolist(), np.rint(points).astype(np.int64).tolist()):
+            current[person_id] = (x, y)
+            sent = self._sent.get(person_id)
+            if keyframe or sent is None:
+                add.append((person_id, x, y))
+                continue
+            dx, dy = x - sent[0], y - sent[1]
+            if max(abs(dx), abs(dy)) <= self.deadband:
+                current[person_id] = sent
+            elif max(abs(dx), abs(dy)) > MAX_DELTA:
+                add.append((person_id, x, y))
+            else:
+                move.append((person_id, dx, dy))
+        delete = [] if keyframe else [person_id for person_id in self._sent if person_id not in current]
+
+        if not (keyframe or add or move or delete):
+            return None
+        if keyframe:
+            self._last_keyframe = now
+        self._sent = current
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        return self._pack(keyframe, now, add, move, delete)
+
+    def _assign_ids(self, points: np.ndarray) -> np.ndarray:
+        # nearest previous person within match_distance keeps its id, closest pairs first
+        ids = np.zeros(len(points), dtype=np.int64)
+        if len(points) and len(self._points):
+            distances = np.linalg.norm(points[:, None, :] - self._points[None, :, :], axis=2)
+            used_new, used_old = set(), set()
+            for flat_index in np.argsort(distances, axis=None):
+                new, old = divmod(int(flat_index), distances.shape[1])
+                if distances[new, old] > self.match_distance:
+                    break
+                if new in used_new or old in used_old:
+                    continue
+                ids[new] = self._ids[old]
+                used_new.add(new)
+                used_old.add(old)
+        for index in np.flatnonzero(ids == 0):
+            ids[index] = self._next_id
+            self._next_id += 1
+        self._ids, self._points = ids, points
+        return ids
+
+    def _pack(self, keyframe: bool, now: float, add: List, move: List, delete: List) -> bytes:
+        if self.protocol == 'msgpack':
+            return msgpack.packb({'type': 'people_positions_delta', 'k': keyframe, 'seq': self.sequence, 'ts': now,
+                                  'add': add, 'move': move, 'del': delete})
+        return b''.join((
+            HEADER.pack(VERSION, KEYFRAME if keyframe else 0, self.sequence, now, len(add), len(move), len(delete)),
+            np.array(add, dtype=ADD_RECORD).tobytes(),
+            np.array(move, dtype=MOVE_RECORD).tobytes(),
+            np.array(delete, dtype=DELETE_RECORD).tobytes(),
+        ))
+
+class PositionDeltaDecoder:
+    # receiver side: rebuilds id -> (x, y); after a sequence gap deltas are ignored until the next keyframe
+    def __init__(self, protocol: str = 'binary'):
+        _check_protocol(protocol)
+        self.protocol = protocol
+        self.people: Dict[int, Tuple[int, int]] = {}
+        self.synced = False
+        self.sequence: Optional[int] = None
+
+    def decode(self, payload: bytes) -> Dict:
+        if self.protocol == 'msgpack':
+            return msgpack.unpackb(payload)
+        version, flags, sequence, timestamp, n_add, n_move, n_delete = HEADER.unpack_from(payload)
+        if version != VERSION:
+            raise ValueError(f"Unsupported position protocol version {version}")
+        offset = HEADER.size
+        add = np.frombuffer(payload, ADD_RECORD, n_add, offset)
+        offset += add.nbytes
+        move = np.frombuffer(payload, MOVE_RECORD, n_move, offset)
+        offset += move.nbytes
+        delete = np.frombuffer(payload, DELETE_RECORD, n_delete, offset)
+        return {'type': 'people_positions_delta', 'k': bool(flags & KEYFRAME), 'seq': sequence, 'ts': timestamp,
+                'add': add.tolist(), 'move': move.tolist(), 'del': delete.tolist()}
+
+    def apply(self, payload: bytes) -> Dict[int, Tuple[int, int]]:
+        message = self.decode(payload)
+        in_order = self.sequence is not None and message['seq'] == (self.sequence + 1) & 0xFFFFFFFF
+        self.sequence = message['seq']
+        if message['k']:
+            self.people = {}
+            self.synced = True
+        elif not in_order:
+            self.synced = False
+        if not self.synced:
+            return self.people
+
+        for person_id, x, y in message['add']:
+            self.people[person_id] = (x, y)
+        for person_id, dx, dy in message['move']:
+            x, y = self.people[person_id]
+            self.people[person_id] = (x + dx, y + dy)
+        for person_id in message['del']:
+            self.people.pop(person_id, None)
+        return self.people
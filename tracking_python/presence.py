@@ -0,0 +1,160 @@
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+import numpy as np
+
+from room_index import RoomIndex
+
+# Room-level presence instead of per-frame positions: a person's room only changes after
+# the new room has been seen for `min_frames` consecutive frames, so someone standing in a
+# doorway does not flap between rooms. Every transition becomes a room_left / room_entered
+# event carrying the room's new occupancy, in the backend's EventData format.
+
+class PresenceTracker:
+    def __init__(self, room_index: RoomIndex, min_frames: int = 10):
+        self.room_index = room_index
+        self.min_frames = min_frames
+        # human id -> confirmed room number, and the room it is currently switching to
+        self.rooms: Dict[str, int] = {}
+        self.candidates: Dict[str, List[int]] = {}
+        self.occupancy = np.zeros(len(room_index.guids) + 1, dtype=np.int64)
+        self.events: List[Dict] = []
+        self._event_ids = itertools.count()
+
+    def update(self, human_ids: List[Optional[str]], rooms: np.ndarray):
+        for human_id, room in zip(human_ids, rooms.tolist()):
+            if human_id is None:
+                continue
+            if self.rooms.get(human_id) == room:
+                self.candidates.pop(human_id, None)
+                continue
+
+            candidate = self.candidates.setdefault(human_id, [room, 0])
+            if candidate[0] != room:
+                candidate[:] = [room, 0]
+            candidate[1] += 1
+            if candidate[1] >= self.min_frames:
+                del self.candidates[human_id]
+                self._move(human_id, room)
+
+    def leave(self, human_id: str):
+        self.candidates.pop(human_id, None)
+        if human_id in self.rooms:
+            self._move(human_id, None)
+
+    def drain(self) -> List[Dict]:
+        events, self.events = self.events, []
+        return events
+
+    def occupancy_by_room(self) -> Dict[str, int]:
+        return dict(zip(self.room_index.guids, self.occupancy[1:].tolist()))
+
+    def _move(self, human_id: str, room: Optional[int]):
+        previous = self.rooms.pop(human_id, None)
+        if previous:
+            self.occupancy[previous] -= 1
+            self._event('room_left', previous, human_id)
+        if room is not None:
+            self.rooms[human_id] = room
+            if room:
+                self.occupancy[room] += 1
+                self._event('room_entered', room, human_id)
+
+    def _event(self, event_type: str, room: int, human_id: str):
+        now = datetime.now()
+        self.events.append({
+            'id': f'evt_{int(now.timestamp() * 1000)}_{next(self._event_ids)}',
+            'type': event_type,
+            'timestamp': now.isoformat(),
+            'room_id': self.room_index.guids[room - 1],
+            'data': {'human_id': human_id, 'occupancy': int(self.occupancy[room])},
+        })
+
+class EventBatcher:
+    # collects events and hands them to `send` from a background thread, in batches of up to
+    # `max_batch`, every `interval` seconds or as soon as `max_batch` are waiting. A failed send
+    # keeps its batch and backs off, doubling up to `max_backoff` seconds; while the backend is
+    # away at most `max_pending` events are kept and the oldest are dropped.
+    def __init__(self, send: Callable[[List[Dict]], bool], interval: float = 1.0, max_batch: int = 200,
+                 max_pending: int = 10000, max_backoff: float = 30.0):
+        self.send = send
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self.pending: Deque[Dict] = deque()
+        self.events_sent = 0
+        self.batches_sent = 0
+        self.events_dropped = 0
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        # one send at a time, so a batch put back after a failure keeps its place
+        self._send_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, events: List[Dict]):
+        if not events:
+            return
+        with self._lock:
+            self.pending.extend(events)
+            self._trim()
+            full = len(self.pending) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def flush(self) -> bool:
+        # sends everything pending on the calling thread, regardless of the back-off
+        return self._send_pending()
+
+    def close(self) -> bool:
+        # stops the background thread and makes a last synchronous attempt
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if time.monotonic() >= self._retry_at:
+                self._send_pending()
+
+    def _send_pending(self) -> bool:
+        with self._send_lock:
+            while True:
+                with self._lock:
+                    batch = [self.pending.popleft() for _ in range(min(self.max_batch, len(self.pending)))]
+                if not batch:
+                    return True
+                if not self.send(batch):
+                    with self._lock:
+                        self.pending.extendleft(reversed(batch))
+                        self._trim()
+                    self._backoff = min(self.max_backoff, self._backoff * 2 if self._backoff else self.interval)
+                    self._retry_at = time.monotonic() + self._backoff
+                    return False
+                self.events_sent += len(batch)
+                self.batches_sent += 1
+                self._backoff = 0.0
+
+    def _trim(self):
+        overflow = len(self.pending) - self.max_pending
+        if overflow > 0:
+            for _ in range(overflow):
+                self.pending.popleft()
+            self.events_dropped += overflow
@@ -0,0 +1,189 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+# Opt-in profiling of a window of frames. Enable with TRACKING_PROFILE=sampling|cprofile
+# (profiles the first window of each run) or arm it at runtime with FrameProfiler.request().
+# sampling mode writes <run>.folded (flamegraph.pl / speedscope), cprofile mode writes
+# <run>.prof (snakeviz / flameprof); both write <run>-summary.json with per-stage timings.
+
+MODES = ('sampling', 'cprofile')
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write_folded(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+class FrameProfiler:
+    def __init__(self, name: str, output_dir: str = 'profiles', window_frames: int = 300,
+                 mode: Optional[str] = None, interval: float = 0.005):
+        self.name = name
+        self.output_dir = output_dir
+        self.window_frames = window_frames
+        self.interval = interval
+        self.auto_mode = mode
+        self.armed_mode: Optional[str] = None
+        self.armed_frames = window_frames
+        self.last_summary: Optional[dict] = None
+        self.runs = 0
+
+        self._active = False
+        self._mode: Optional[str] = None
+        self._target_frames = 0
+        self._frames = 0
+        self._stage_times: Dict[str, List[float]] = defaultdict(list)
+        self._started_at = 0.0
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+
+    @classmethod
+    def from_env(cls, name: str) -> 'FrameProfiler':
+        mode = os.getenv('TRACKING_PROFILE') or None
+        if mode is not None and mode not in MODES:
+            mode = 'sampling'
+        return cls(
+            name,
+            output_dir=os.getenv('TRACKING_PROFILE_DIR', 'profiles'),
+            window_frames=int(os.getenv('TRACKING_PROFILE_FRAMES', '300')),
+            mode=mode,
+            interval=int(os.getenv('TRACKING_PROFILE_INTERVAL_MS', '5')) / 1000,
+        )
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def request(self, mode: str = 'sampling', frames: Optional[int] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode}, expected one of {MODES}")
+        self.armed_mode = mode
+        self.armed_frames = frames or self.window_frames
+
+    def begin_run(self):
+        if self.auto_mode is not None and self.armed_mode is None:
+            self.request(self.auto_mode)
+
+    def frame_started(self):
+        if self._active or self.armed_mode is None:
+            return
+
+        self._mode = self.armed_mode
+        self._target_frames = self.armed_frames
+        self.armed_mode = None
+        self._frames = 0
+        self._stage_times = defaultdict(list)
+        self._started_at = time.perf_counter()
+        self._active = True
+
+        if self._mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+
+    def record(self, stage: str, seconds: float):
+        if self._active:
+            self._stage_times[stage].append(seconds)
+
+    def frame_finished(self):
+        if not self._active:
+            return
+        self._frames += 1
+        if self._frames >= self._target_frames:
+            self.finish()
+
+    def finish(self) -> Optional[dict]:
+        if not self._active:
+            return None
+        self._active = False
+        elapsed = time.perf_counter() - self._started_at
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.runs += 1
+        run_name = f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}-{self.runs}"
+        base_path = os.path.join(self.output_dir, run_name)
+
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(f'{base_path}.prof')
+            profile_path = f'{base_path}.prof'
+            self._profile = None
+        else:
+            self._sampler.stop()
+            self._sampler.write_folded(f'{base_path}.folded')
+            profile_path = f'{base_path}.folded'
+            self._sampler = None
+
+        summary = {
+            'run': run_name,
+            'mode': self._mode,
+            'frames': self._frames,
+            'wall_seconds': round(elapsed, 4),
+            'fps': round(self._frames / elapsed, 2) if elapsed > 0 else None,
+            'profile': profile_path,
+            'stages': {stage: self._summarize(times, self._frames) for stage, times in self._stage_times.items()},
+        }
+        with open(f'{base_path}-summary.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        self.last_summary = summary
+        print(f"Profile {run_name}: {self._frames} frames in {elapsed:.2f}s, written to {profile_path}")
+        for stage, stats in summary['stages'].items():
+            print(f"  {stage:<12} {stats['ms_per_frame']:8.2f} ms/frame  p95 {stats['p95_ms']:8.2f} ms  {stats['share']:6.1%}")
+        return summary
+
+    def status(self) -> dict:
+        return {
+            'active': self._active,
+            'mode': self._mode if self._active else self.armed_mode,
+            'frames': self._frames if self._active else 0,
+            'target_frames': self._target_frames if self._active else self.armed_frames,
+            'armed': self.armed_mode is not None,
+            'last_summary': self.last_summary,
+        }
+
+    def _summarize(self, times: List[float], frames: int) -> dict:
+        ordered = sorted(times)
+        total = sum(ordered)
+        all_stages = sum(sum(values) for values in self._stage_times.values())
+        return {
+            'calls': len(ordered),
+            'total_ms': round(total * 1000, 3),
+            'ms_per_frame': round(total * 1000 / max(frames, 1), 3),
+            'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+            'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3),
+            'share': round(total / all_stages, 4) if all_stages > 0 else 0.0,
+        }
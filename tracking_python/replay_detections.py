@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+import cv2
+import numpy as np
+
+from detection_log import DetectionLog
+
+# Deterministic benchmark of everything after inference, from a detection log recorded live
+# (DETECTION_LOG=... for tracking_service, start_recording()/save_recording() for
+# realtime_people_positioning.py):
+#   python replay_detections.py recordings/input2.npz [--pace realtime] [--tracker bytetrack] [--output presence]
+# tracking_service logs go through tracking, projection and sync_frame of tracking_service
+# itself; realtime logs through projection, fusion/merge and the people_positions feed. The
+# backend is FakeBackend, served in-process from memory, so runs need no weights, video or
+# Dart backend. --pace max feeds frames back to back (throughput), --pace realtime at the
+# recorded timestamps (latency under load). Latency is from a frame's arrival to the end of
+# its backend sync; the backend digest is equal across replays of the same log.
+
+WS_PATH = '/ws'
+
+class FakeBackend:
+    # the Dart backend endpoints the tracking code calls, answered from memory
+    def __init__(self, map_data: Optional[Dict] = None):
+        self.map_data = map_data
+        self.requests: Counter = Counter()
+        self.humans: Dict[str, Dict] = {}
+        self.events = 0
+        self.messages = 0
+        self.message_bytes = 0
+        self._next_human = 1
+        self._digest = hashlib.blake2b(digest_size=8)
+        self._lock = threading.Lock()
+
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                status, payload = backend.handle(self.command, self.path, body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self._ws_server = None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, method: str, path: str, body) -> tuple:
+        with self._lock:
+            self.requests[f'{method} {re.sub(r"/humans/[^/]+", "/humans/<id>", path)}'] += 1
+            if method == 'GET' and path == '/api/map':
+                return (200, self.map_data) if self.map_data else (404, {'error': 'No map'})
+            if method == 'POST' and path == '/api/humans':
+                human_id = f'human_{self._next_human}'
+                self._next_human += 1
+                self.humans[human_id] = {'id': human_id, 'x': 0, 'y': 0}
+                self._record(f'create {human_id}')
+                return 200, self.humans[human_id]
+            match = re.fullmatch(r'/api/humans/([^/]+)(/move)?', path)
+            if match and match.group(1) in self.humans:
+                human_id = match.group(1)
+                if method == 'PUT' and match.group(2):
+                    self.humans[human_id].update(x=body['x'], y=body['y'])
+                    self._record(f"move {human_id} {body['x']!r} {body['y']!r}")
+                    return 200, self.humans[human_id]
+                if method == 'DELETE' and not match.group(2):
+                    self._record(f'delete {human_id}')
+                    return 200, self.humans.pop(human_id)
+            if method == 'POST' and path == '/api/events/batch':
+                self.events += len(body)
+                for event in body:
+                    # ids and timestamps are wall-clock, the rest is determined by the log
+                    self._record(f"{event['type']} {event['room_id']} {json.dumps(event['data'], sort_keys=True)}")
+                return 200, {'count': len(body)}
+            return 404, {'error': f'No route for {method} {path}'}
+
+    async def serve_websocket(self) -> str:
+        import websockets
+
+        async def handler(connection):
+            async for message in connection:
+                self.messages += 1
+                self.message_bytes += len(message)
+                self._record(message)
+
+        self._ws_server = await websockets.serve(handler, '127.0.0.1', 0)
+        port = self._ws_server.sockets[0].getsockname()[1]
+        return f'ws://127.0.0.1:{port}{WS_PATH}'
+
+    async def stop_websocket(self):
+        self._ws_server.close()
+        await self._ws_server.wait_closed()
+        self._ws_server = None
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def digest(self) -> str:
+        return self._digest.hexdigest()
+
+    def summary(self) -> Dict:
+        return {
+            'requests': dict(self.requests),
+            'humans_left': len(self.humans),
+            'events': self.events,
+            'messages': self.messages,
+            'message_bytes': self.message_bytes,
+            'digest': self.digest(),
+        }
+
+    def _record(self, entry):
+        self._digest.update(entry if isinstance(entry, bytes) else entry.encode('utf-8'))
+        self._digest.update(b'\n')
+
+class ReplayClock:
+    # arrival time of each frame, per-stage time and per-frame latency
+    def __init__(self, pace: str = 'max', speed: float = 1.0):
+        if pace not in ('max', 'realtime'):
+            raise ValueError(f"Unknown pace {pace}, expected max or realtime")
+        self.pace = pace
+        self.speed = speed
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.latencies: List[float] = []
+        self._start: Optional[float] = None
+        self._first_timestamp = 0.0
+        self._end = 0.0
+
+    def due(self, timestamp: float) -> float:
+        now = time.perf_counter()
+        if self._start is None:
+            self._start, self._first_timestamp = now, timestamp
+        if self.pace == 'max':
+            return now
+        return self._start + (timestamp - self._first_timestamp) / self.speed
+
+    def wait(self, timestamp: float) -> float:
+        due = self.due(timestamp)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return due
+
+    async def wait_async(self, timestamp: float) -> float:
+        due = self.due(timestamp)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return due
+
+    def stage(self, name: str, started: float) -> float:
+        now = time.perf_counter()
+        self.stages[name] += now - started
+        return now
+
+    def frame_done(self, arrival: float):
+        self._end = time.perf_counter()
+        self.latencies.append(self._end - arrival)
+
+    def summary(self) -> Dict:
+        frames = len(self.latencies)
+        if frames == 0:
+            return {'frames': 0}
+        seconds = self._end - self._start
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'frames': frames,
+            'seconds': round(seconds, 3),
+            'fps': round(frames / seconds, 1) if seconds > 0 else None,
+            'latency_ms': {name: round(float(value), 3) for name, value in zip(
+                ('p50', 'p95', 'p99', 'max'), (*np.percentile(latencies, [50, 95, 99]), latencies.max()))},
+            'stage_ms_per_frame': {name: round(total / frames * 1000, 3) for name, total in self.stages.items()},
+        }
+
+def replay_service(log: DetectionLog, backend: FakeBackend, clock: ReplayClock, tracker_name: Optional[str] = None,
+                   output: str = 'positions', video: Optional[str] = None) -> Dict:
+    # drives tracking_service's own tracker, projection and sync_frame against the fake backend
+    import tracking_service as service
+    from trackers import create_tracker, detections_from_boxes, tracker_kwargs
+
+    tracker_name = tracker_name or log.meta.get('tracker', 'bytetrack')
+    if tracker_name != 'bytetrack' and video is None:
+        raise ValueError(f"{tracker_name} computes appearance embeddings, replay it with --video")
+
+    service.BACKEND_URL = backend.url
+    homography = log.meta.get('homographies', {}).get('video')
+    service.homography_matrix = None if homography is None else np.array(homography)
+    service.load_map_data()
+    if output == 'presence' and service.room_index is None:
+        raise ValueError('Presence output needs a log with map data')
+    service.start_run(output, service.TRACK_GRACE_FRAMES)
+    tracker = create_tracker(tracker_name, **tracker_kwargs(tracker_name, log.meta.get('embed_interval', 10)))
+
+    cap = cv2.VideoCapture(video) if video else None
+    frame = None
+    # tracking_service logs hold video time (frame index / fps), so the heatmap gets the clock of the live run
+    frame_step = float(np.median(np.diff(log.timestamp))) if len(log) > 1 else 0.0
+    epoch, frame_seconds = service.video_clock(1.0 / frame_step if frame_step > 0 else 0.0,
+                                               int(log.frame_index.max()) + 1 if len(log) else 0)
+    for _, frame_index, timestamp, detections in log.frames():
+        if cap is not None:
+            # decoded before the frame's arrival, so decoding is not part of the timings
+            ret, frame = cap.read()
+            if not ret:
+                break
+        arrival = clock.wait(timestamp)
+
+        started = time.perf_counter()
+        tracks = tracker.update(detections_from_boxes(detections), frame)
+        confirmed = [track for track in tracks if track.is_confirmed()]
+        track_ids = [track.track_id for track in confirmed]
+        boxes = np.array([track.to_ltrb() for track in confirmed], dtype=np.float64).reshape(-1, 4)
+        started = clock.stage('tracking', started)
+
+        world_points = service.project_to_world(boxes)
+        started = clock.stage('projection', started)
+
+        service.sync_frame(track_ids, world_points, epoch + frame_index * frame_seconds, frame_seconds)
+        clock.stage('sync', started)
+        clock.frame_done(arrival)
+    if cap is not None:
+        cap.release()
+
+    return dict(service.finish_run(), tracker=tracker_name, output=output)
+
+async def replay_realtime(log: DetectionLog, backend: FakeBackend, clock: ReplayClock, protocol: str = 'json') -> Dict:
+    # drives RealtimePeoplePositioning's projection, fusion and message encoding; one message per frame
+    import websockets
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from realtime_people_positioning import RealtimePeoplePositioning
+    from tracking_python.position_protocol import PositionDeltaEncoder
+
+    positioning = RealtimePeoplePositioning({}, detector_backend=None)
+    positioning.homography_matrices = {camera: np.array(matrix) for camera, matrix in log.meta['homographies'].items()
+                                       if matrix is not None}
+    if log.meta.get('map'):
+        positioning.load_map(backend.url)
+    encoder = None if protocol == 'json' else PositionDeltaEncoder(protocol)
+
+    sent = 0
+    async with websockets.connect(await backend.serve_websocket()) as websocket:
+        for camera, _, timestamp, detections in log.frames():
+            arrival = await clock.wait_async(timestamp)
+
+            started = time.perf_counter()
+            positioning.ingest_detections(camera, detections, timestamp)
+            started = clock.stage('projection', started)
+
+            # encoder time is the frame time, so keyframes fall on the same frames every replay
+            message = positioning.positions_message(encoder, timestamp, timestamp)
+            started = clock.stage('merge', started)
+
+            if message is not None:
+                await websocket.send(message)
+                sent += 1
+            clock.stage('send', started)
+            clock.frame_done(arrival)
+        # let the fake backend take in what is still buffered before it is summarized
+        while backend.messages < sent:
+            await asyncio.sleep(0.001)
+    await backend.stop_websocket()
+    return {'protocol': protocol, 'messages_sent': sent}
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded detections through tracking and backend sync')
+    parser.add_argument('log', help='.npz written by DetectionRecorder')
+    parser.add_argument('--pace', choices=('max', 'realtime'), default='max')
+    parser.add_argument('--speed', type=float, default=1.0, help='realtime pace multiplier')
+    parser.add_argument('--tracker', help='tracking_service logs: tracker to replay (default: the recorded one)')
+    parser.add_argument('--output', choices=('positions', 'presence'), default='positions')
+    parser.add_argument('--video', help='source video, needed by trackers with appearance embeddings')
+    parser.add_argument('--protocol', choices=('json', 'msgpack', 'binary'), default='json',
+                        help='realtime logs: people_positions encoding')
+    args = parser.parse_args()
+
+    log = DetectionLog.load(args.log)
+    backend = FakeBackend(log.meta.get('map'))
+    clock = ReplayClock(args.pace, args.speed)
+    print(f"{len(log)} frames from {', '.join(log.cameras)} ({log.meta.get('source')}), "
+          f"{len(log.conf)} detections, pace {args.pace}")
+
+    try:
+        if log.meta.get('source') == 'realtime':
+            result = asyncio.run(replay_realtime(log, backend, clock, args.protocol))
+        else:
+            result = replay_service(log, backend, clock, args.tracker, args.output, args.video)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        backend.close()
+
+    print(json.dumps({'replay': clock.summary(), 'run': result, 'backend': backend.summary()}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+from collections import deque
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+# Per-camera inference size. YOLO letterboxes the frame to imgsz, so a person h pixels tall
+# in a frame whose longer side is L is h * imgsz / L pixels tall at the network input. The
+# tuner keeps the pixel heights of recent detections and picks the smallest size at which the
+# `percentile`-th smallest person is still `min_height` pixels at the input. Heights are only
+# taken from frames run at the largest size: every `probe_interval`-th frame is one. A probe
+# that finds someone too small for the current size drops the collected heights and goes back
+# to the largest size at once; going down waits for `min_samples` new heights.
+
+SIZES = (320, 416, 512, 640, 800, 960, 1280)
+
+class ResolutionTuner:
+    def __init__(self, sizes: Sequence[int] = (320, 416, 512, 640), min_height: float = 40.0,
+                 percentile: float = 10.0, window: int = 200, probe_interval: int = 30, min_samples: int = 20):
+        self.sizes = sorted(sizes)
+        self.min_height = min_height
+        self.percentile = percentile
+        self.probe_interval = probe_interval
+        self.min_samples = min_samples
+        self.heights = deque(maxlen=window)
+        # the largest size until enough people have been measured
+        self.imgsz = self.sizes[-1]
+        self.frame_size: Optional[int] = None
+        self.frames = 0
+        self.switches = 0
+        self._last_full = 0
+        self._last_evaluated = 0
+
+    @classmethod
+    def up_to(cls, imgsz: int, **kwargs) -> 'ResolutionTuner':
+        # standard sizes below the configured one, which stays the largest
+        return cls(sorted({size for size in SIZES if size < imgsz} | {imgsz}), **kwargs)
+
+    def next_size(self) -> int:
+        if self.frames - self._last_full >= self.probe_interval:
+            return self.sizes[-1]
+        return self.imgsz
+
+    def observe(self, detections: np.ndarray, frame_shape, imgsz: int):
+        # detections: (N, 5) x1, y1, x2, y2, conf of a frame detected at imgsz
+        self.frames += 1
+        self.frame_size = max(frame_shape[:2])
+        if imgsz < self.sizes[-1]:
+            return
+        self._last_full = self.frames
+        heights = detections[:, 3] - detections[:, 1]
+        if self.imgsz < self.sizes[-1] and len(heights) and heights.min() * self.imgsz / self.frame_size < self.min_height:
+            self.heights.clear()
+            self.imgsz = self.sizes[-1]
+            self.switches += 1
+        self.heights.extend(heights.tolist())
+        if self.frames - self._last_evaluated >= self.probe_interval:
+            self._last_evaluated = self.frames
+            self.evaluate()
+
+    def evaluate(self) -> int:
+        chosen = self.sizes[-1]
+        if len(self.heights) >= self.min_samples:
+            height = float(np.percentile(self.heights, self.percentile))
+            chosen = next((size for size in self.sizes if height * size / self.frame_size >= self.min_height), chosen)
+        if chosen != self.imgsz:
+            self.imgsz = chosen
+            self.switches += 1
+        return chosen
+
+    def status(self) -> Dict:
+        return {
+            'imgsz': self.imgsz,
+            'sizes': self.sizes,
+            'frames': self.frames,
+            'samples': len(self.heights),
+            'height_percentile': float(np.percentile(self.heights, self.percentile)) if self.heights else None,
+            'switches': self.switches,
+        }
@@ -0,0 +1,76 @@
+from typing import Dict, List, Optional
+import numpy as np
+
+# Rooms from the backend's /api/map rasterized once into a block grid holding 1 + room index
+# per cell (0 = outside every room), so finding the room of a point is one array read and a
+# whole frame of tracks is one fancy-indexing call. World coordinates are converted to blocks
+# the way the backend's RoomManager.getRoomIdByCoordinates does (x / 50 - left, y / 50 - top),
+# so rooms agree with what the backend assigns to moved humans.
+
+BLOCK_SIZE = 50.0
+
+def world_to_blocks(points: np.ndarray, left: int = 0, top: int = 0) -> np.ndarray:
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return np.floor(points / BLOCK_SIZE - (left, top)).astype(np.int64)
+
+class RoomIndex:
+    def __init__(self, rooms: List[Dict], width: int, height: int, left: int = 0, top: int = 0):
+        self.width, self.height = width, height
+        self.left, self.top = left, top
+        self.guids = [room['guid'] for room in rooms]
+        self.names = {room['guid']: room.get('name', room['guid']) for room in rooms}
+        self._guid_lookup = np.array([None] + self.guids, dtype=object)
+
+        dtype = np.uint8 if len(rooms) < np.iinfo(np.uint8).max else np.uint16
+        self.grid = np.zeros((height, width), dtype=dtype)
+        for number, room in enumerate(rooms, start=1):
+            for rect in room.get('rectangles', []):
+                x, y = max(0, int(rect['x'])), max(0, int(rect['y']))
+                self.grid[y:int(rect['y']) + int(rect['height']), x:int(rect['x']) + int(rect['width'])] = number
+
+        # the backend falls back to the room with the nearest bounding-box centre outside every room
+        bounds = [room.get('bounds', room) for room in rooms]
+        centres = np.array([((b['x0'] + b['x1']) / 2, (b['y0'] + b['y1']) / 2) for b in bounds])
+        self.nearest_grid = self.grid.copy()
+        outside = self.grid == 0
+        if len(rooms) and outside.any():
+            # one room at a time with a running minimum, so memory stays at two grids whatever the room count;
+            # strict < keeps the first of equally near rooms, like argmin
+            cell_x = np.arange(width) + 0.5
+            cell_y = (np.arange(height) + 0.5)[:, None]
+            best = np.full((height, width), np.inf)
+            nearest = np.zeros((height, width), dtype=self.grid.dtype)
+            for number, (centre_x, centre_y) in enumerate(centres, start=1):
+                distance = np.hypot(cell_x - centre_x, cell_y - centre_y)
+                closer = distance < best
+                best[closer] = distance[closer]
+                nearest[closer] = number
+            self.nearest_grid[outside] = nearest[outside]
+
+    @classmethod
+    def from_map(cls, map_data: Dict) -> Optional['RoomIndex']:
+        dimensions = map_data.get('image_dimensions')
+        if not dimensions:
+            return None
+        rooms = map_data.get('rooms') or {}
+        rooms = list(rooms.values()) if isinstance(rooms, dict) else rooms
+        return cls(rooms, dimensions['width'], dimensions['height'], dimensions.get('left', 0), dimensions.get('top', 0))
+
+    def lookup_blocks(self, blocks: np.ndarray, nearest: bool = False) -> np.ndarray:
+        # (N, 2) block x, y -> (N,) 1 + room index, 0 outside the map or every room
+        blocks = np.asarray(blocks).reshape(-1, 2).astype(np.int64)
+        grid = self.nearest_grid if nearest else self.grid
+        inside = (blocks[:, 0] >= 0) & (blocks[:, 0] < self.width) & (blocks[:, 1] >= 0) & (blocks[:, 1] < self.height)
+        rooms = np.zeros(len(blocks), dtype=grid.dtype)
+        rooms[inside] = grid[blocks[inside, 1], blocks[inside, 0]]
+        return rooms
+
+    def lookup(self, points: np.ndarray, nearest: bool = False) -> np.ndarray:
+        # (N, 2) world x, y -> (N,) 1 + room index
+        return self.lookup_blocks(world_to_blocks(points, self.left, self.top), nearest)
+
+    def room_ids(self, rooms: np.ndarray) -> List[Optional[str]]:
+        return self._guid_lookup[rooms].tolist()
+
+    def room_at(self, x: float, y: float, nearest: bool = False) -> Optional[str]:
+        return self.room_ids(self.lookup([(x, y)], nearest))[0]
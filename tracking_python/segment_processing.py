@@ -0,0 +1,197 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import cv2
+import numpy as np
+
+from detection_cache import DetectionCache, TrackRecorder, TrackTable
+from trackers import TRACKERS, create_tracker, detections_from_boxes, greedy_match, iou_matrix, tracker_kwargs
+
+# Batch mode for long offline videos: the file is split into time segments that run in
+# separate worker processes, each with its own detector and tracker. Every segment after the
+# first starts `overlap` frames early; those frames warm up its tracker and are matched
+# against the tail of the previous segment to carry track ids across the boundary.
+# python segment_processing.py --video recording.mp4 --workers 8 --tracker bytetrack
+# The stitched tracks go into the detection cache, so /api/process replays them directly.
+
+class SegmentJob(NamedTuple):
+    video: str
+    start: int
+    stop: int
+    overlap: int
+    tracker: str
+    tracker_kwargs: Dict
+    backend: str
+    model_path: str
+    imgsz: int
+    int8: bool
+    threads: int
+
+def plan_segments(total_frames: int, segments: int, overlap: int) -> List[Tuple[int, int]]:
+    # segments shorter than the overlap would be mostly warmup
+    segments = max(1, min(segments, total_frames // max(1, 2 * overlap)))
+    bounds = np.linspace(0, total_frames, segments + 1).astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+def seek(cap: cv2.VideoCapture, frame_index: int, video: str):
+    # CAP_PROP_POS_FRAMES seeks may land on a nearby keyframe: read forward when short of the frame,
+    # and fail rather than attach the wrong frame indices to a segment's tracks
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    while 0 <= position < frame_index and cap.grab():
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if position != frame_index:
+        raise RuntimeError(f"Seek to frame {frame_index} of {video} landed on frame {position}")
+
+def track_segment(job: SegmentJob) -> TrackTable:
+    from detectors import create_detector
+
+    cv2.setNumThreads(job.threads)
+    detector = create_detector(job.backend, job.model_path, job.imgsz, job.int8, threads=job.threads)
+    tracker = create_tracker(job.tracker, **job.tracker_kwargs)
+
+    first = max(0, job.start - job.overlap)
+    cap = cv2.VideoCapture(job.video)
+    if first > 0:
+        seek(cap, first, job.video)
+
+    recorder = TrackRecorder()
+    try:
+        for frame_index in range(first, job.stop):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            tracks = tracker.update(detections_from_boxes(detector.detect(frame, tracker.detection_conf)), frame)
+            confirmed = [track for track in tracks if track.is_confirmed()]
+            boxes = np.array([track.to_ltrb() for track in confirmed], dtype=np.float64).reshape(-1, 4)
+            recorder.add_frame(frame_index, [track.track_id for track in confirmed], boxes,
+                               [track.det_conf for track in confirmed])
+    finally:
+        cap.release()
+    return recorder.table()
+
+def _rows(table: TrackTable, start: int, stop: int) -> slice:
+    return slice(*np.searchsorted(table.frame_index, [start, stop]))
+
+def match_tracks(previous: TrackTable, following: TrackTable, start: int, stop: int,
+                 min_iou: float = 0.5, min_frames: int = 3) -> Dict[int, int]:
+    # mean IoU of every track pair over the overlap frames both of them are confirmed in
+    prev_rows, next_rows = _rows(previous, start, stop), _rows(following, start, stop)
+    prev_ids, prev_index = np.unique(previous.track_id[prev_rows], return_inverse=True)
+    next_ids, next_index = np.unique(following.track_id[next_rows], return_inverse=True)
+    if prev_ids.size == 0 or next_ids.size == 0:
+        return {}
+
+    iou_sum = np.zeros((prev_ids.size, next_ids.size))
+    together = np.zeros((prev_ids.size, next_ids.size))
+    prev_frames, next_frames = previous.frame_index[prev_rows], following.frame_index[next_rows]
+    prev_boxes, next_boxes = previous.bbox[prev_rows], following.bbox[next_rows]
+    for frame in range(start, stop):
+        a, b = prev_frames == frame, next_frames == frame
+        if not a.any() or not b.any():
+            continue
+        cell = np.ix_(prev_index[a], next_index[b])
+        iou_sum[cell] += iou_matrix(prev_boxes[a], next_boxes[b])
+        together[cell] += 1
+
+    mean_iou = np.where(together >= min_frames, iou_sum / np.maximum(together, 1), 0.0)
+    matches, _, _ = greedy_match(mean_iou, min_iou)
+    return {int(next_ids[j]): int(prev_ids[i]) for i, j in matches}
+
+def stitch(tables: List[TrackTable], segments: List[Tuple[int, int]], overlap: int) -> Tuple[TrackTable, int]:
+    # returns the merged table with video-wide track ids and the number of ids carried across boundaries
+    frame_index, track_id, bbox, conf = [], [], [], []
+    next_global_id = 1
+    previous, previous_ids = None, {}
+    carried = 0
+
+    for table, (start, stop) in zip(tables, segments):
+        matched = match_tracks(previous, table, max(0, start - overlap), start) if previous is not None else {}
+        carried += len(matched)
+
+        # warmup frames belong to the previous segment, whose tracker was already running
+        rows = _rows(table, start, stop)
+        segment_ids = {}
+        for local_id in np.unique(table.track_id[rows]).tolist():
+            if local_id in matched:
+                segment_ids[local_id] = previous_ids[matched[local_id]]
+            else:
+                segment_ids[local_id] = next_global_id
+                next_global_id += 1
+
+        local_ids = table.track_id[rows]
+        frame_index.append(table.frame_index[rows])
+        track_id.append(np.array([segment_ids[local_id] for local_id in local_ids.tolist()], dtype=np.int32))
+        bbox.append(table.bbox[rows])
+        conf.append(table.conf[rows])
+        previous, previous_ids = table, segment_ids
+
+    total_frames = tables[-1].total_frames if tables else 0
+    stitched = TrackTable(np.concatenate(frame_index), np.concatenate(track_id), np.vstack(bbox),
+                          np.concatenate(conf), total_frames)
+    return stitched, carried
+
+def process_segments(video: str, tracker: str = 'bytetrack', workers: Optional[int] = None, overlap: int = 30,
+                     backend: str = 'torch', model_path: str = 'yolov8n.pt', imgsz: int = 640, int8: bool = False,
+                     embed_interval: int = 10) -> Tuple[TrackTable, Dict]:
+    cap = cv2.VideoCapture(video)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total_frames <= 0:
+        raise IOError(f"Cannot read frame count of {video}")
+
+    workers = workers or os.cpu_count() or 1
+    segments = plan_segments(total_frames, workers, overlap)
+    # split the cores between workers instead of letting every process claim all of them
+    threads = max(1, (os.cpu_count() or 1) // len(segments))
+    jobs = [SegmentJob(video, start, stop, overlap, tracker, tracker_kwargs(tracker, embed_interval),
+                       backend, model_path, imgsz, int8, threads) for start, stop in segments]
+
+    start_time = time.perf_counter()
+    # spawn keeps torch and the Flask server's threads out of the workers
+    with ProcessPoolExecutor(len(jobs), mp_context=multiprocessing.get_context('spawn')) as pool:
+        tables = list(pool.map(track_segment, jobs))
+    table, carried = stitch(tables, segments, overlap)
+
+    return table, {
+        'segments': len(segments),
+        'workers': len(jobs),
+        'carried_tracks': carried,
+        'tracks': int(np.unique(table.track_id).size),
+        'seconds': time.perf_counter() - start_time,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Track a long video in parallel segments and store it in the detection cache')
+    parser.add_argument('--video', default='../demo/input2.mp4')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--overlap', type=int, default=30)
+    parser.add_argument('--tracker', default='bytetrack', choices=sorted(TRACKERS))
+    parser.add_argument('--embed-interval', type=int, default=10)
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--int8', action='store_true')
+    parser.add_argument('--cache-dir', default='cache/detections')
+    args = parser.parse_args()
+
+    table, stats = process_segments(args.video, args.tracker, args.workers, args.overlap, args.backend,
+                                    'yolov8n.pt', args.imgsz, args.int8, args.embed_interval)
+    print(f"{table.total_frames} frames in {stats['segments']} segments: {stats['seconds']:.1f}s "
+          f"({table.total_frames / stats['seconds']:.1f} fps), {stats['tracks']} tracks, "
+          f"{stats['carried_tracks']} carried across boundaries")
+
+    # same key tracking_service uses, so /api/process replays this run
+    model = f"{args.backend}:yolov8n.pt:{args.imgsz}:{'int8' if args.int8 else 'fp32'}"
+    tracker_key = f'{args.tracker}:{args.embed_interval}' if args.tracker == 'selective' else args.tracker
+    conf = TRACKERS[args.tracker].detection_conf
+    cache = DetectionCache(args.cache_dir)
+    key = cache.key(args.video, model, conf, tracker_key)
+    cache.store(key, table, {'video': os.path.abspath(args.video), 'model': model, 'conf': conf,
+                             'tracker': tracker_key, 'segments': stats['segments']})
+    print(f"Stored tracks in {os.path.join(args.cache_dir, key)}")
+
+if __name__ == '__main__':
+    main()
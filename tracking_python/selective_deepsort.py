@@ -0,0 +1,81 @@
+from typing import Dict, List, Tuple
+import numpy as np
+from deep_sort_realtime.deepsort_tracker import DeepSort
+
+from trackers import iou_matrix
+
+# DeepSort that only runs the appearance embedder when it matters. A detection that
+# overlaps exactly one track (and that track overlaps no other detection) reuses the
+# track's cached embedding, so association for it is effectively motion-only. Fresh
+# embeddings are computed for ambiguous overlaps, unmatched detections (new or
+# re-appearing people) and tracks whose cached embedding is older than embed_interval frames.
+
+class SelectiveDeepSort:
+    def __init__(self, embed_interval: int = 10, overlap_iou: float = 0.2, **deepsort_kwargs):
+        self.deepsort = DeepSort(**deepsort_kwargs)
+        self.embed_interval = embed_interval
+        self.overlap_iou = overlap_iou
+        self.frame_index = 0
+        # track_id -> (embedding, frame index it was computed on)
+        self.embedding_cache: Dict[str, Tuple[np.ndarray, int]] = {}
+        self.embeds_computed = 0
+        self.embeds_reused = 0
+
+    @property
+    def tracker(self):
+        return self.deepsort.tracker
+
+    def update_tracks(self, raw_detections: List, frame: np.ndarray = None):
+        self.frame_index += 1
+        detections = [d for d in raw_detections if d[0][2] > 0 and d[0][3] > 0]
+        embeds = self._cached_embeds(detections)
+
+        missing = [i for i, embed in enumerate(embeds) if embed is None]
+        if missing:
+            for i, embed in zip(missing, self.deepsort.generate_embeds(frame, [detections[i] for i in missing])):
+                embeds[i] = embed
+        self.embeds_computed += len(missing)
+        self.embeds_reused += len(detections) - len(missing)
+
+        # others travels with the detection into the matched track, marking fresh embeddings
+        fresh = [False] * len(detections)
+        for i in missing:
+            fresh[i] = True
+        tracks = self.deepsort.update_tracks(detections, embeds=embeds, others=fresh)
+
+        live_ids = set()
+        for track in tracks:
+            live_ids.add(track.track_id)
+            if track.time_since_update == 0 and track.get_det_supplementary():
+                self.embedding_cache[track.track_id] = (track.get_feature(), self.frame_index)
+        for track_id in list(self.embedding_cache):
+            if track_id not in live_ids:
+                del self.embedding_cache[track_id]
+
+        return tracks
+
+    def _cached_embeds(self, detections: List) -> List:
+        embeds = [None] * len(detections)
+        tracks = [track for track in self.deepsort.tracker.tracks if track.track_id in self.embedding_cache]
+        if not detections or not tracks:
+            return embeds
+
+        det_boxes = np.array([[l, t, l + w, t + h] for (l, t, w, h), *_ in detections], dtype=np.float32)
+        track_boxes = np.array([track.to_ltrb() for track in tracks], dtype=np.float32)
+        overlaps = iou_matrix(det_boxes, track_boxes) > self.overlap_iou
+        # all tracks (cached or not) count towards ambiguity
+        all_boxes = np.array([track.to_ltrb() for track in self.deepsort.tracker.tracks], dtype=np.float32)
+        det_overlap_counts = (iou_matrix(det_boxes, all_boxes) > self.overlap_iou).sum(axis=1)
+        track_overlap_counts = overlaps.sum(axis=0)
+
+        for i in range(len(detections)):
+            if det_overlap_counts[i] != 1:
+                continue
+            candidates = np.flatnonzero(overlaps[i])
+            if len(candidates) != 1 or track_overlap_counts[candidates[0]] != 1:
+                continue
+            embedding, computed_at = self.embedding_cache[tracks[candidates[0]].track_id]
+            if self.frame_index - computed_at < self.embed_interval:
+                embeds[i] = embedding
+
+        return embeds
@@ -0,0 +1,87 @@
+import pytest
+
+from position_protocol import MAX_DELTA, PositionDeltaDecoder, PositionDeltaEncoder
+
+# Encoder -> decoder round trips of the people_positions delta feed: python -m pytest test_position_protocol.py
+
+PROTOCOLS = ['binary', 'msgpack']
+
+def positions(*points):
+    return [{'x': x, 'y': y} for x, y in points]
+
+@pytest.mark.parametrize('protocol', PROTOCOLS)
+def test_round_trip_adds_moves_and_deletes(protocol):
+    encoder = PositionDeltaEncoder(protocol, deadband=50, keyframe_interval=10)
+    decoder = PositionDeltaDecoder(protocol)
+
+    people = decoder.apply(encoder.encode(positions((1000, 2000), (5000, 5000)), 0.0))
+    assert sorted(people.values()) == [(1000, 2000), (5000, 5000)]
+
+    payload = encoder.encode(positions((1200, 2000), (5000, 5000)), 0.1)
+    message = decoder.decode(payload)
+    assert not message['k']
+    assert message['add'] == [] and message['del'] == []
+    assert [list(move[1:]) for move in message['move']] == [[200, 0]]
+    people = decoder.apply(payload)
+    assert sorted(people.values()) == [(1200, 2000), (5000, 5000)]
+
+    people = decoder.apply(encoder.encode(positions((1200, 2000)), 0.2))
+    assert list(people.values()) == [(1200, 2000)]
+
+@pytest.mark.parametrize('protocol', PROTOCOLS)
+def test_moves_within_the_deadband_send_nothing(protocol):
+    encoder = PositionDeltaEncoder(protocol, deadband=50, keyframe_interval=10)
+    decoder = PositionDeltaDecoder(protocol)
+    decoder.apply(encoder.encode(positions((1000, 1000)), 0.0))
+
+    assert encoder.encode(positions((1030, 1040)), 0.1) is None
+    # small moves add up against what the receiver last got
+    people = decoder.apply(encoder.encode(positions((1060, 1000)), 0.2))
+    assert list(people.values()) == [(1060, 1000)]
+
+@pytest.mark.parametrize('protocol', PROTOCOLS)
+def test_decoder_resyncs_on_keyframe_after_a_gap(protocol):
+    encoder = PositionDeltaEncoder(protocol, deadband=0, keyframe_interval=1.0)
+    decoder = PositionDeltaDecoder(protocol)
+    decoder.apply(encoder.encode(positions((1000, 1000)), 0.0))
+
+    encoder.encode(positions((1100, 1000)), 0.1)  # lost on the way
+    people = decoder.apply(encoder.encode(positions((1200, 1000)), 0.2))
+    assert not decoder.synced
+    assert list(people.values()) == [(1000, 1000)]
+
+    # deltas stay ignored until the next keyframe replaces the state
+    decoder.apply(encoder.encode(positions((1300, 1000)), 0.3))
+    assert not decoder.synced
+    payload = encoder.encode(positions((1400, 1000)), 1.0)
+    assert decoder.decode(payload)['k']
+    people = decoder.apply(payload)
+    assert decoder.synced
+    assert list(people.values()) == [(1400, 1000)]
+
+@pytest.mark.parametrize('protocol', PROTOCOLS)
+def test_jumps_beyond_int16_are_sent_as_adds(protocol):
+    encoder = PositionDeltaEncoder(protocol, deadband=50, keyframe_interval=10, match_distance=10 ** 6)
+    decoder = PositionDeltaDecoder(protocol)
+    decoder.apply(encoder.encode(positions((0, 0)), 0.0))
+
+    payload = encoder.encode(positions((MAX_DELTA + 1000, 0)), 0.1)
+    message = decoder.decode(payload)
+    assert message['move'] == []
+    assert [list(add[1:]) for add in message['add']] == [[MAX_DELTA + 1000, 0]]
+    people = decoder.apply(payload)
+    assert list(people.values()) == [(MAX_DELTA + 1000, 0)]
+
+def test_reset_starts_with_a_keyframe():
+    encoder = PositionDeltaEncoder('binary', keyframe_interval=10)
+    encoder.encode(positions((1000, 1000)), 0.0)
+    encoder.reset()
+
+    decoder = PositionDeltaDecoder('binary')
+    payload = encoder.encode(positions((1000, 1000)), 0.1)
+    assert decoder.decode(payload)['k']
+    assert list(decoder.apply(payload).values()) == [(1000, 1000)]
+
+def test_unknown_protocol_is_rejected():
+    with pytest.raises(ValueError):
+        PositionDeltaEncoder('json')
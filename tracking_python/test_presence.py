@@ -0,0 +1,114 @@
+import numpy as np
+
+from presence import EventBatcher, PresenceTracker
+from room_index import RoomIndex
+
+# Room presence hysteresis and event batching: python -m pytest test_presence.py
+
+def make_index():
+    rooms = [
+        {'guid': 'room-a', 'rectangles': [{'x': 0, 'y': 0, 'width': 5, 'height': 4}], 'x0': 0, 'y0': 0, 'x1': 5, 'y1': 4},
+        {'guid': 'room-b', 'rectangles': [{'x': 5, 'y': 0, 'width': 5, 'height': 4}], 'x0': 5, 'y0': 0, 'x1': 10, 'y1': 4},
+    ]
+    return RoomIndex(rooms, 10, 4)
+
+def summarize(events):
+    return [(event['type'], event['room_id'], event['data']['human_id'], event['data']['occupancy']) for event in events]
+
+def test_room_changes_after_min_frames():
+    presence = PresenceTracker(make_index(), min_frames=3)
+    for _ in range(2):
+        presence.update(['h1'], np.array([1]))
+    assert presence.drain() == []
+
+    presence.update(['h1'], np.array([1]))
+    assert summarize(presence.drain()) == [('room_entered', 'room-a', 'h1', 1)]
+    assert presence.occupancy_by_room() == {'room-a': 1, 'room-b': 0}
+
+def test_doorway_flapping_does_not_switch_rooms():
+    presence = PresenceTracker(make_index(), min_frames=3)
+    for _ in range(3):
+        presence.update(['h1'], np.array([1]))
+    presence.drain()
+
+    for room in (2, 1, 2, 2, 1, 2, 2):
+        presence.update(['h1'], np.array([room]))
+    assert presence.drain() == []
+
+    presence.update(['h1'], np.array([2]))
+    assert summarize(presence.drain()) == [('room_left', 'room-a', 'h1', 0), ('room_entered', 'room-b', 'h1', 1)]
+
+def test_leave_and_unknown_humans():
+    presence = PresenceTracker(make_index(), min_frames=1)
+    presence.update(['h1', None, 'h2'], np.array([2, 1, 2]))
+    assert presence.occupancy_by_room() == {'room-a': 0, 'room-b': 2}
+
+    presence.leave('h1')
+    presence.leave('h3')
+    assert summarize(presence.drain())[-1] == ('room_left', 'room-b', 'h1', 1)
+    assert presence.rooms == {'h2': 2}
+
+class FlakySend:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.batches = []
+
+    def __call__(self, batch):
+        if self.fail:
+            self.fail -= 1
+            return False
+        self.batches.append([event['n'] for event in batch])
+        return True
+
+def events(*numbers):
+    return [{'n': n} for n in numbers]
+
+def test_failed_send_keeps_the_batch_and_backs_off():
+    send = FlakySend(fail=2)
+    batcher = EventBatcher(send, interval=1.0, max_batch=2)
+    batcher.add(events(1, 2, 3))
+
+    assert not batcher.flush()
+    assert batcher._backoff == 1.0
+    assert not batcher.flush()
+    assert batcher._backoff == 2.0
+    assert list(event['n'] for event in batcher.pending) == [1, 2, 3]
+
+    assert batcher.flush()
+    assert send.batches == [[1, 2], [3]]
+    assert (batcher.events_sent, batcher.batches_sent, batcher._backoff) == (3, 2, 0.0)
+
+def test_backoff_is_capped():
+    batcher = EventBatcher(FlakySend(fail=10), interval=1.0, max_backoff=4.0)
+    batcher.add(events(1))
+    for _ in range(5):
+        batcher.flush()
+    assert batcher._backoff == 4.0
+
+def test_oldest_events_are_dropped_past_max_pending():
+    send = FlakySend(fail=1)
+    batcher = EventBatcher(send, max_batch=10, max_pending=3)
+    batcher.add(events(1, 2))
+    batcher.flush()
+    batcher.add(events(3, 4, 5))
+
+    assert batcher.events_dropped == 2
+    assert batcher.flush()
+    assert send.batches == [[3, 4, 5]]
+
+def test_background_thread_sends_full_batches_and_close_flushes():
+    send = FlakySend()
+    batcher = EventBatcher(send, interval=60.0, max_batch=2)
+    batcher.start()
+    try:
+        batcher.add(events(1, 2))
+        for _ in range(200):
+            if send.batches:
+                break
+            batcher._stop.wait(0.01)
+        assert send.batches == [[1, 2]]
+
+        batcher.add(events(3))
+    finally:
+        assert batcher.close()
+    assert send.batches == [[1, 2], [3]]
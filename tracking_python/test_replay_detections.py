@@ -0,0 +1,86 @@
+import asyncio
+import numpy as np
+import pytest
+
+from detection_log import DetectionLog, DetectionRecorder
+from replay_detections import FakeBackend, ReplayClock, replay_realtime
+
+# Replay harness against the in-process fake backend: python -m pytest test_replay_detections.py
+
+MAP = {
+    'image_dimensions': {'width': 200, 'height': 100, 'left': 0, 'top': 0},
+    'rooms': [
+        {'guid': 'room-a', 'name': 'A', 'rectangles': [{'x': 0, 'y': 0, 'width': 100, 'height': 100}],
+         'x0': 0, 'y0': 0, 'x1': 100, 'y1': 100},
+        {'guid': 'room-b', 'name': 'B', 'rectangles': [{'x': 100, 'y': 0, 'width': 100, 'height': 100}],
+         'x0': 100, 'y0': 0, 'x1': 200, 'y1': 100},
+    ],
+}
+
+@pytest.fixture
+def backend():
+    backend = FakeBackend(MAP)
+    yield backend
+    backend.close()
+
+def record_realtime_log(path) -> DetectionLog:
+    # two cameras seeing one person walk from room A into room B, identity homographies
+    recorder = DetectionRecorder()
+    for frame in range(40):
+        x = 1000 + frame * 200
+        for camera, offset in (('cam_a', 0.0), ('cam_b', 0.01)):
+            recorder.add(camera, frame, 100.0 + frame / 10 + offset, np.array([[x - 50, 500, x + 50, 1500, 0.9]]))
+    recorder.save(str(path), {
+        'source': 'realtime',
+        'homographies': {'cam_a': np.eye(3).tolist(), 'cam_b': np.eye(3).tolist()},
+        'map': MAP,
+    })
+    return DetectionLog.load(str(path))
+
+def test_detection_log_round_trip(tmp_path):
+    log = record_realtime_log(tmp_path / 'log.npz')
+    assert len(log) == 80
+    assert log.cameras == ['cam_a', 'cam_b']
+    camera, frame_index, timestamp, detections = next(log.frames())
+    assert (camera, frame_index, timestamp) == ('cam_a', 0, 100.0)
+    assert detections.tolist() == [[950, 500, 1050, 1500, pytest.approx(0.9)]]
+
+def test_fake_backend_humans_and_events(backend):
+    status, human = backend.handle('POST', '/api/humans', None)
+    assert status == 200
+    assert backend.handle('PUT', f"/api/humans/{human['id']}/move", {'x': 1, 'y': 2})[1] == {'id': human['id'], 'x': 1, 'y': 2}
+    assert backend.handle('DELETE', f"/api/humans/{human['id']}", None)[0] == 200
+    assert backend.handle('DELETE', f"/api/humans/{human['id']}", None)[0] == 404
+
+    events = [{'type': 'room_entered', 'room_id': 'room-a', 'data': {'human_id': 'h', 'occupancy': 1}}]
+    assert backend.handle('POST', '/api/events/batch', events) == (200, {'count': 1})
+    assert backend.handle('GET', '/api/map', None) == (200, MAP)
+
+    summary = backend.summary()
+    assert summary['requests']['DELETE /api/humans/<id>'] == 2
+    assert summary['humans_left'] == 0
+    assert summary['events'] == 1
+
+def test_clock_paces_at_recorded_timestamps():
+    clock = ReplayClock('realtime', speed=2.0)
+    first = clock.due(10.0)
+    assert clock.due(11.0) - first == pytest.approx(0.5)
+    assert ReplayClock('max').due(11.0) == pytest.approx(ReplayClock('max').due(0.0), abs=0.1)
+    with pytest.raises(ValueError):
+        ReplayClock('fast')
+
+@pytest.mark.parametrize('protocol', ['json', 'binary'])
+def test_realtime_replay_is_deterministic(tmp_path, protocol):
+    log = record_realtime_log(tmp_path / 'log.npz')
+
+    digests = []
+    for _ in range(2):
+        backend = FakeBackend(MAP)
+        try:
+            result = asyncio.run(replay_realtime(log, backend, ReplayClock('max'), protocol))
+        finally:
+            backend.close()
+        assert result['messages_sent'] == backend.messages > 0
+        digests.append(backend.digest())
+
+    assert digests[0] == digests[1]
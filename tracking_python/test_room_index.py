@@ -0,0 +1,39 @@
+import numpy as np
+
+from room_index import RoomIndex
+
+# Rasterized room lookups and the nearest-room fallback: python -m pytest test_room_index.py
+
+def make_rooms(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    rooms = []
+    for number in range(count):
+        x, y = rng.integers(0, 150, 2).tolist()
+        width, height = rng.integers(3, 30, 2).tolist()
+        rooms.append({'guid': f'room-{number}', 'rectangles': [{'x': x, 'y': y, 'width': width, 'height': height}],
+                      'x0': x, 'y0': y, 'x1': x + width, 'y1': y + height})
+    return rooms
+
+def test_exact_and_nearest_lookup():
+    rooms = [
+        {'guid': 'a', 'rectangles': [{'x': 0, 'y': 0, 'width': 4, 'height': 4}], 'x0': 0, 'y0': 0, 'x1': 4, 'y1': 4},
+        {'guid': 'b', 'rectangles': [{'x': 16, 'y': 0, 'width': 4, 'height': 4}], 'x0': 16, 'y0': 0, 'x1': 20, 'y1': 4},
+    ]
+    index = RoomIndex(rooms, 20, 10)
+    # world units, 50 per block
+    assert index.room_at(100, 100) == 'a'
+    assert index.room_at(900, 100) == 'b'
+    assert index.room_at(300, 400) is None
+    assert index.room_at(300, 400, nearest=True) == 'a'
+    assert index.room_at(700, 400, nearest=True) == 'b'
+    assert index.room_ids(index.lookup([(-100, 0), (100, 100)], nearest=True)) == [None, 'a']
+
+def test_nearest_grid_matches_brute_force():
+    rooms = make_rooms(12)
+    index = RoomIndex(rooms, 200, 170)
+
+    centres = np.array([((room['x0'] + room['x1']) / 2, (room['y0'] + room['y1']) / 2) for room in rooms])
+    cell_y, cell_x = np.nonzero(index.grid == 0)
+    distances = np.hypot(cell_x[:, None] + 0.5 - centres[None, :, 0], cell_y[:, None] + 0.5 - centres[None, :, 1])
+    assert (index.nearest_grid[cell_y, cell_x] == np.argmin(distances, axis=1) + 1).all()
+    assert (index.nearest_grid[index.grid > 0] == index.grid[index.grid > 0]).all()
@@ -0,0 +1,57 @@
+import numpy as np
+
+from detection_cache import TrackRecorder
+from segment_processing import match_tracks, plan_segments, stitch
+
+# Segment planning and track stitching across segment boundaries: python -m pytest test_segment_processing.py
+
+def box(frame: int, lane: int):
+    # a person walking right in their own horizontal lane
+    x = 100 + frame * 5
+    return [x, lane * 300, x + 80, lane * 300 + 200]
+
+def record(frames, tracks, total_frames):
+    # tracks: local id -> (lane, first frame, last frame)
+    recorder = TrackRecorder()
+    for frame in frames:
+        visible = [(track_id, lane) for track_id, (lane, first, last) in tracks.items() if first <= frame <= last]
+        recorder.add_frame(frame, [track_id for track_id, _ in visible],
+                           np.array([box(frame, lane) for _, lane in visible]).reshape(-1, 4), [0.9] * len(visible))
+    recorder.total_frames = total_frames
+    return recorder.table()
+
+def test_plan_segments_covers_the_video():
+    segments = plan_segments(100, 4, 10)
+    assert segments == [(0, 25), (25, 50), (50, 75), (75, 100)]
+    # segments shorter than twice the overlap are merged
+    assert plan_segments(100, 8, 30) == [(0, 100)]
+
+def test_stitch_carries_ids_across_the_boundary():
+    segments, overlap = [(0, 10), (10, 20)], 4
+    first = record(range(0, 10), {1: (0, 0, 9), 2: (1, 0, 9)}, 10)
+    # the second segment warms up from frame 6 and numbers its tracks on its own
+    second = record(range(6, 20), {1: (1, 6, 19), 2: (0, 6, 19), 3: (2, 15, 19)}, 20)
+
+    assert match_tracks(first, second, 6, 10) == {1: 2, 2: 1}
+
+    table, carried = stitch([first, second], segments, overlap)
+    assert carried == 2
+    assert table.total_frames == 20
+    # warmup rows of the second segment are dropped, frames stay sorted
+    assert table.frame_index.tolist() == sorted(table.frame_index.tolist())
+    assert np.count_nonzero(table.frame_index < 10) == 20
+
+    ids_by_lane = {}
+    for track_id, bbox in zip(table.track_id.tolist(), table.bbox.tolist()):
+        ids_by_lane.setdefault(int(bbox[1] // 300), set()).add(track_id)
+    assert ids_by_lane == {0: {1}, 1: {2}, 2: {3}}
+
+def test_tracks_seen_together_too_briefly_are_not_matched():
+    first = record(range(0, 10), {1: (0, 0, 9)}, 10)
+    second = record(range(6, 20), {1: (0, 8, 19)}, 20)
+    # two overlap frames in common, fewer than min_frames
+    assert match_tracks(first, second, 6, 10) == {}
+
+    table, carried = stitch([first, second], [(0, 10), (10, 20)], 4)
+    assert carried == 0
+    assert set(table.track_id.tolist()) == {1, 2}
@@ -0,0 +1,86 @@
+import itertools
+import numpy as np
+
+from track_lifecycle import TrackLifecycle
+
+# Track -> human mapping with grace frames and reattachment: python -m pytest test_track_lifecycle.py
+
+class RecordingBackend:
+    def __init__(self):
+        self.calls = []
+        self._ids = itertools.count(1)
+
+    def create(self):
+        human_id = f'human_{next(self._ids)}'
+        self.calls.append(('create', human_id))
+        return human_id
+
+    def move(self, human_id, x, y):
+        self.calls.append(('move', human_id, x, y))
+
+    def delete(self, human_id):
+        self.calls.append(('delete', human_id))
+
+    def count(self, kind):
+        return sum(1 for call in self.calls if call[0] == kind)
+
+def make_lifecycle(grace_frames=3, reattach_distance=150.0):
+    backend = RecordingBackend()
+    return TrackLifecycle(backend.create, backend.move, backend.delete, grace_frames, reattach_distance), backend
+
+def points(*xy):
+    return np.array(xy, dtype=np.float64).reshape(-1, 2)
+
+def test_track_returning_within_grace_keeps_its_human():
+    lifecycle, backend = make_lifecycle(grace_frames=3)
+    lifecycle.update(['1'], points((100, 100)))
+    lifecycle.update([], points())
+    lifecycle.update([], points())
+    lifecycle.update(['1'], points((110, 100)))
+
+    assert lifecycle.humans == {'1': 'human_1'}
+    assert backend.count('create') == 1 and backend.count('delete') == 0
+    assert lifecycle.stats()['resumed'] == 1
+    assert lifecycle.saved == 1
+
+def test_track_lost_for_grace_frames_is_deleted():
+    lifecycle, backend = make_lifecycle(grace_frames=3)
+    lifecycle.update(['1'], points((100, 100)))
+    for _ in range(3):
+        lifecycle.update([], points())
+    assert backend.count('delete') == 0
+
+    lifecycle.update([], points())
+    assert lifecycle.humans == {}
+    assert backend.calls[-1] == ('delete', 'human_1')
+
+def test_new_track_near_a_lost_one_takes_over_its_human():
+    lifecycle, backend = make_lifecycle(grace_frames=5, reattach_distance=150)
+    lifecycle.update(['1', '2'], points((100, 100), (1000, 1000)))
+    lifecycle.update(['2'], points((1000, 1000)))
+    # the tracker gave the person a new id near where track 1 was lost
+    lifecycle.update(['2', '7'], points((1000, 1000), (180, 120)))
+
+    assert lifecycle.humans == {'2': 'human_2', '7': 'human_1'}
+    assert lifecycle.lost == {}
+    assert backend.calls[-1] == ('move', 'human_1', 180.0, 120.0)
+    assert lifecycle.stats()['reattached'] == 1
+
+def test_new_track_far_from_lost_ones_gets_a_new_human():
+    lifecycle, backend = make_lifecycle(grace_frames=5, reattach_distance=150)
+    lifecycle.update(['1'], points((100, 100)))
+    lifecycle.update(['2'], points((900, 900)))
+
+    assert lifecycle.humans == {'1': 'human_1', '2': 'human_2'}
+    assert '1' in lifecycle.lost
+    assert backend.count('create') == 2
+
+def test_flush_deletes_every_human():
+    lifecycle, backend = make_lifecycle()
+    lifecycle.update(['1', '2'], points((100, 100), (900, 900)))
+    lifecycle.update(['2'], points((900, 900)))
+    lifecycle.flush()
+
+    assert lifecycle.humans == {} and lifecycle.lost == {}
+    assert backend.count('delete') == 2
+    assert lifecycle.stats()['deleted'] == 2
@@ -0,0 +1,114 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from trackers import greedy_match
+
+# Maps tracker ids to backend humans without churning them under occlusion. A track that
+# disappears keeps its human for `grace_frames` frames; if the same track id comes back,
+# or a new track appears within `reattach_distance` world units of where the lost one was
+# last seen, the human is reused instead of deleted and created again.
+
+class TrackLifecycle:
+    def __init__(self, create_human: Callable[[], Optional[str]], move_human: Callable[[str, float, float], None],
+                 delete_human: Callable[[str], None], grace_frames: int = 15, reattach_distance: float = 150.0):
+        self.create_human = create_human
+        self.move_human = move_human
+        self.delete_human = delete_human
+        self.grace_frames = grace_frames
+        self.reattach_distance = reattach_distance
+
+        self.humans: Dict[str, str] = {}
+        self.positions: Dict[str, Tuple[float, float]] = {}
+        # track id -> first frame it was missing in
+        self.lost: Dict[str, int] = {}
+        self.frame = 0
+
+        self.created = 0
+        self.deleted = 0
+        self.resumed = 0
+        self.reattached = 0
+
+    @property
+    def saved(self) -> int:
+        # every resumed or reattached track avoided one delete and one create
+        return self.resumed + self.reattached
+
+    def update(self, track_ids: List[str], world_points: Optional[np.ndarray]):
+        self.frame += 1
+        visible = set(track_ids)
+        for track_id in self.humans:
+            if track_id not in visible and track_id not in self.lost:
+                self.lost[track_id] = self.frame
+
+        for track_id in visible & self.lost.keys():
+            del self.lost[track_id]
+            self.resumed += 1
+
+        if world_points is not None:
+            new_tracks = []
+            for track_id, (world_x, world_y) in zip(track_ids, world_points.tolist()):
+                if track_id in self.humans:
+                    self._move(track_id, world_x, world_y)
+                else:
+                    new_tracks.append((track_id, world_x, world_y))
+            if new_tracks:
+                self._start_tracks(new_tracks)
+
+        for track_id, lost_since in list(self.lost.items()):
+            if self.frame - lost_since >= self.grace_frames:
+                self._delete(track_id)
+
+    def flush(self):
+        for track_id in list(self.humans):
+            self._delete(track_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'created': self.created,
+            'deleted': self.deleted,
+            'resumed': self.resumed,
+            'reattached': self.reattached,
+            'creates_saved': self.saved,
+            'deletes_saved': self.saved,
+        }
+
+    def _start_tracks(self, new_tracks: List[Tuple[str, float, float]]):
+        # new track ids take over the nearest lost humans first, closest pairs matched first
+        lost_ids = list(self.lost)
+        matches, unmatched, _ = [], list(range(len(new_tracks))), []
+        if lost_ids:
+            points = np.array([(x, y) for _, x, y in new_tracks])
+            last_seen = np.array([self.positions[track_id] for track_id in lost_ids])
+            distances = np.linalg.norm(points[:, None, :] - last_seen[None, :, :], axis=2)
+            matches, unmatched, _ = greedy_match(self.reattach_distance - distances, 0.0)
+
+        for new_index, lost_index in matches:
+            track_id, world_x, world_y = new_tracks[new_index]
+            lost_id = lost_ids[lost_index]
+            human_id = self.humans.pop(lost_id)
+            del self.lost[lost_id], self.positions[lost_id]
+            self.humans[track_id] = human_id
+            self.reattached += 1
+            print(f"Reattached human {human_id} from track {lost_id} to track {track_id}")
+            self._move(track_id, world_x, world_y)
+
+        for new_index in unmatched:
+            track_id, world_x, world_y = new_tracks[new_index]
+            human_id = self.create_human()
+            if human_id:
+                self.humans[track_id] = human_id
+                self.created += 1
+                print(f"Created human {human_id} for track {track_id}")
+                self._move(track_id, world_x, world_y)
+
+    def _move(self, track_id: str, world_x: float, world_y: float):
+        self.positions[track_id] = (world_x, world_y)
+        self.move_human(self.humans[track_id], world_x, world_y)
+
+    def _delete(self, track_id: str):
+        human_id = self.humans.pop(track_id)
+        self.lost.pop(track_id, None)
+        self.positions.pop(track_id, None)
+        self.delete_human(human_id)
+        self.deleted += 1
+        print(f"Deleted human {human_id} for track {track_id}")
@@ -0,0 +1,234 @@
+from typing import List, Optional
+import numpy as np
+
+# Tracker backends for the tracking loop. Every backend takes detections as
+# ([left, top, width, height], confidence, class) tuples and returns objects with
+# track_id, is_confirmed() and to_ltrb(), the subset of the DeepSort track API the
+# track -> human mapping relies on. DeepSort is imported lazily so the bytetrack
+# backend runs without torch.
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+def greedy_match(ious: np.ndarray, min_iou: float):
+    matches = []
+    if ious.size == 0:
+        return matches, list(range(ious.shape[0])), list(range(ious.shape[1]))
+
+    used_rows, used_cols = set(), set()
+    for flat_index in np.argsort(-ious, axis=None):
+        row, col = divmod(int(flat_index), ious.shape[1])
+        if ious[row, col] < min_iou:
+            break
+        if row in used_rows or col in used_cols:
+            continue
+        matches.append((row, col))
+        used_rows.add(row)
+        used_cols.add(col)
+
+    unmatched_rows = [row for row in range(ious.shape[0]) if row not in used_rows]
+    unmatched_cols = [col for col in range(ious.shape[1]) if col not in used_cols]
+    return matches, unmatched_rows, unmatched_cols
+
+class KalmanBoxFilter:
+    # constant velocity model over (center x, center y, aspect ratio, height), as in DeepSort
+    def __init__(self):
+        self.motion = np.eye(8)
+        self.motion[:4, 4:] = np.eye(4)
+        self.observation = np.eye(4, 8)
+        self.std_position = 1.0 / 20
+        self.std_velocity = 1.0 / 160
+
+    def initiate(self, measurement: np.ndarray):
+        height = measurement[3]
+        std = np.array([
+            2 * self.std_position * height, 2 * self.std_position * height, 1e-2, 2 * self.std_position * height,
+            10 * self.std_velocity * height, 10 * self.std_velocity * height, 1e-5, 10 * self.std_velocity * height,
+        ])
+        return np.r_[measurement, np.zeros(4)], np.diag(std ** 2)
+
+    def predict(self, mean: np.ndarray, covariance: np.ndarray):
+        height = mean[3]
+        std = np.array([
+            self.std_position * height, self.std_position * height, 1e-2, self.std_position * height,
+            self.std_velocity * height, self.std_velocity * height, 1e-5, self.std_velocity * height,
+        ])
+        mean = self.motion @ mean
+        covariance = self.motion @ covariance @ self.motion.T + np.diag(std ** 2)
+        return mean, covariance
+
+    def update(self, mean: np.ndarray, covariance: np.ndarray, measurement: np.ndarray):
+        height = mean[3]
+        std = np.array([self.std_position * height, self.std_position * height, 1e-1, self.std_position * height])
+        projected_mean = self.observation @ mean
+        projected_cov = self.observation @ covariance @ self.observation.T + np.diag(std ** 2)
+
+        gain = np.linalg.solve(projected_cov, (covariance @ self.observation.T).T).T
+        mean = mean + gain @ (measurement - projected_mean)
+        covariance = covariance - gain @ projected_cov @ gain.T
+        return mean, covariance
+
+def ltwh_to_xyah(ltwh) -> np.ndarray:
+    left, top, width, height = ltwh
+    return np.array([left + width / 2, top + height / 2, width / max(height, 1e-6), height], dtype=np.float64)
+
+class IoUTrack:
+    TENTATIVE, CONFIRMED, DELETED = 1, 2, 3
+
+    def __init__(self, track_id: str, mean: np.ndarray, covariance: np.ndarray, confidence: float, n_init: int):
+        self.track_id = track_id
+        self.mean = mean
+        self.covariance = covariance
+        self.det_conf = confidence
+        self.hits = 1
+        self.time_since_update = 0
+        self.state = IoUTrack.CONFIRMED if n_init <= 1 else IoUTrack.TENTATIVE
+
+    def is_tentative(self) -> bool:
+        return self.state == IoUTrack.TENTATIVE
+
+    def is_confirmed(self) -> bool:
+        return self.state == IoUTrack.CONFIRMED
+
+    def is_deleted(self) -> bool:
+        return self.state == IoUTrack.DELETED
+
+    def to_ltrb(self) -> np.ndarray:
+        center_x, center_y, aspect, height = self.mean[:4]
+        width = aspect * height
+        return np.array([center_x - width / 2, center_y - height / 2, center_x + width / 2, center_y + height / 2])
+
+class ByteTracker:
+    # two-stage IoU association in the ByteTrack style: confident detections first,
+    # then low-confidence ones to keep tracks alive through partial occlusion
+    name = 'bytetrack'
+    detection_conf = 0.25
+
+    def __init__(self, high_conf: float = 0.5, match_iou: float = 0.2, low_match_iou: float = 0.5,
+                 max_age: int = 30, n_init: int = 3):
+        self.high_conf = high_conf
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.max_age = max_age
+        self.n_init = n_init
+        self.kf = KalmanBoxFilter()
+        self.tracks: List[IoUTrack] = []
+        self._next_id = 1
+
+    def reset(self):
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, detections: List, frame: Optional[np.ndarray] = None) -> List[IoUTrack]:
+        for track in self.tracks:
+            track.mean, track.covariance = self.kf.predict(track.mean, track.covariance)
+            track.time_since_update += 1
+            track.det_conf = None
+
+        detections = [d for d in detections if d[0][2] > 0 and d[0][3] > 0]
+        high = [d for d in detections if d[1] >= self.high_conf]
+        low = [d for d in detections if d[1] < self.high_conf]
+
+        matches, unmatched_tracks, unmatched_high = self._associate(self.tracks, high, self.match_iou)
+        for track_index, det_index in matches:
+            self._update_track(self.tracks[track_index], high[det_index])
+
+        # only tracks that were already being followed may claim low-confidence boxes
+        remaining = [self.tracks[i] for i in unmatched_tracks if not self.tracks[i].is_tentative()]
+        low_matches, _, _ = self._associate(remaining, low, self.low_match_iou)
+        for track_index, det_index in low_matches:
+            self._update_track(remaining[track_index], low[det_index])
+
+        for track in self.tracks:
+            if track.time_since_update > 0 and (track.is_tentative() or track.time_since_update > self.max_age):
+                track.state = IoUTrack.DELETED
+
+        for det_index in unmatched_high:
+            ltwh, confidence = high[det_index][0], high[det_index][1]
+            mean, covariance = self.kf.initiate(ltwh_to_xyah(ltwh))
+            self.tracks.append(IoUTrack(str(self._next_id), mean, covariance, float(confidence), self.n_init))
+            self._next_id += 1
+
+        self.tracks = [track for track in self.tracks if not track.is_deleted()]
+        return self.tracks
+
+    def _associate(self, tracks: List[IoUTrack], detections: List, min_iou: float):
+        if not tracks or not detections:
+            return [], list(range(len(tracks))), list(range(len(detections)))
+
+        track_boxes = np.array([track.to_ltrb() for track in tracks])
+        det_boxes = np.array([[l, t, l + w, t + h] for (l, t, w, h), *_ in detections], dtype=np.float64)
+        return greedy_match(iou_matrix(track_boxes, det_boxes), min_iou)
+
+    def _update_track(self, track: IoUTrack, detection):
+        track.mean, track.covariance = self.kf.update(track.mean, track.covariance, ltwh_to_xyah(detection[0]))
+        track.det_conf = float(detection[1])
+        track.hits += 1
+        track.time_since_update = 0
+        if track.is_tentative() and track.hits >= self.n_init:
+            track.state = IoUTrack.CONFIRMED
+
+class DeepSortTracker:
+    name = 'deepsort'
+    detection_conf = 0.5
+
+    def __init__(self, **deepsort_kwargs):
+        from deep_sort_realtime.deepsort_tracker import DeepSort
+        self.deepsort = DeepSort(**deepsort_kwargs)
+
+    def reset(self):
+        self.deepsort.tracker.delete_all_tracks()
+
+    def update(self, detections: List, frame: Optional[np.ndarray] = None):
+        return self.deepsort.update_tracks(detections, frame=frame)
+
+class SelectiveDeepSortTracker:
+    name = 'selective'
+    detection_conf = 0.5
+
+    def __init__(self, embed_interval: int = 10, **deepsort_kwargs):
+        from selective_deepsort import SelectiveDeepSort
+        self.deepsort = SelectiveDeepSort(embed_interval=embed_interval, **deepsort_kwargs)
+
+    def reset(self):
+        self.deepsort.tracker.delete_all_tracks()
+        self.deepsort.embedding_cache.clear()
+
+    def update(self, detections: List, frame: Optional[np.ndarray] = None):
+        return self.deepsort.update_tracks(detections, frame=frame)
+
+TRACKERS = {
+    'deepsort': DeepSortTracker,
+    'selective': SelectiveDeepSortTracker,
+    'bytetrack': ByteTracker,
+}
+
+def tracker_kwargs(name: str, embed_interval: int = 10) -> dict:
+    # settings shared by tracking_service and the segment workers
+    if name == 'bytetrack':
+        return dict(max_age=30, n_init=3)
+    if name == 'selective':
+        return dict(embed_interval=embed_interval, max_age=30, n_init=3, max_iou_distance=0.7)
+    return dict(max_age=30, n_init=3, max_iou_distance=0.7)
+
+def detections_from_boxes(boxes: np.ndarray) -> List:
+    # (N, 5) x1, y1, x2, y2, conf detector output -> DeepSort ([l, t, w, h], conf, class) tuples
+    return [([int(x1), int(y1), int(x2 - x1), int(y2 - y1)], confidence, 'person')
+            for x1, y1, x2, y2, confidence in boxes]
+
+def create_tracker(name: str, **kwargs):
+    if name not in TRACKERS:
+        raise ValueError(f"Unknown tracker {name}, expected one of {sorted(TRACKERS)}")
+    return TRACKERS[name](**kwargs)
@@ -1,13 +1,27 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from deep_sort_realtime.deepsort_tracker import DeepSort
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import json
 import os
 import base64
+import itertools
+import time
+import threading
 import requests
+from python_common.metrics import CONTENT_TYPE, REGISTRY, counter, gauge, histogram
+from detectors import create_detector
+from detection_cache import DetectionCache, TrackRecorder
+from detection_log import DetectionRecorder
+from frame_bus import FrameBus
+from heatmap import OccupancyHeatmap
+from presence import EventBatcher, PresenceTracker
+from profiling import FrameProfiler
+from resolution_tuner import ResolutionTuner
+from room_index import RoomIndex
+from segment_processing import process_segments
+from track_lifecycle import TrackLifecycle
+from trackers import TRACKERS, create_tracker, detections_from_boxes, tracker_kwargs
 
 app = Flask(__name__)
 CORS(app)
@@ -15,23 +29,85 @@ CORS(app)
 VIDEO_PATH = '../demo/input2.mp4'
 CALIBRATION_FILE = 'calibration.json'
 BACKEND_URL = 'http://localhost:5000'
-
-model = YOLO('yolov8n.pt', verbose=False)
-tracker = DeepSort(max_age=30, n_init=3, max_iou_distance=0.7)
+# default tracker when /api/process does not pick one: deepsort, selective or bytetrack
+TRACKER = os.getenv('TRACKER', 'deepsort')
+EMBED_INTERVAL = int(os.getenv('EMBED_INTERVAL', '10'))
+# torch, onnx or openvino; onnx backends export yolov8n.pt once into models/
+DETECTOR_BACKEND = os.getenv('DETECTOR_BACKEND', 'torch')
+DETECTOR_INT8 = os.getenv('DETECTOR_INT8', '0') == '1'
+DETECTOR_IMGSZ = int(os.getenv('DETECTOR_IMGSZ', '640'))
+# pick the smallest input size up to DETECTOR_IMGSZ at which people in the video are still large enough
+DETECTOR_AUTO_IMGSZ = os.getenv('DETECTOR_AUTO_IMGSZ', '0') == '1'
+DETECTOR_MODEL = (f"{DETECTOR_BACKEND}:yolov8n.pt:{DETECTOR_IMGSZ}{'-auto' if DETECTOR_AUTO_IMGSZ else ''}:"
+                  f"{'int8' if DETECTOR_INT8 else 'fp32'}")
+# frames each parallel segment re-tracks from the previous one to stitch track ids
+SEGMENT_OVERLAP = int(os.getenv('SEGMENT_OVERLAP', '30'))
+# frames a lost track keeps its human, and how close (world units) a new track must be to take it over
+TRACK_GRACE_FRAMES = int(os.getenv('TRACK_GRACE_FRAMES', '15'))
+TRACK_REATTACH_DISTANCE = float(os.getenv('TRACK_REATTACH_DISTANCE', '150'))
+# positions: move humans on the backend every frame; presence: only batched room enter/leave events
+TRACKING_OUTPUT = os.getenv('TRACKING_OUTPUT', 'positions')
+PRESENCE_MIN_FRAMES = int(os.getenv('PRESENCE_MIN_FRAMES', '10'))
+PRESENCE_BATCH_SECONDS = float(os.getenv('PRESENCE_BATCH_SECONDS', '1.0'))
+# occupancy heatmap: exponential decay with HEATMAP_HALF_LIFE seconds, or HEATMAP_WINDOWS windows of HEATMAP_WINDOW seconds
+HEATMAP_HALF_LIFE = float(os.getenv('HEATMAP_HALF_LIFE', '600'))
+HEATMAP_WINDOW = float(os.getenv('HEATMAP_WINDOW', '0')) or None
+HEATMAP_WINDOWS = int(os.getenv('HEATMAP_WINDOWS', '6'))
+# frame rate assumed for heatmap time when the container does not report one
+DEFAULT_VIDEO_FPS = 30.0
+# write raw detections of live sequential runs here (.npz) for replay_detections.py; bypasses the track cache
+DETECTION_LOG = os.getenv('DETECTION_LOG')
+FLASK_DEBUG = os.getenv('FLASK_DEBUG', '1') == '1'
+
+# built on first use or by the warmup thread, so calibration endpoints answer without loading torch
+detector = None
+trackers = {}
+models_lock = threading.Lock()
+
+FRAME_STAGE_SECONDS = histogram('frame_stage_seconds', 'Per-frame processing time by stage', ['stage'])
+DECODE_SECONDS = FRAME_STAGE_SECONDS.labels('decode')
+INFERENCE_SECONDS = FRAME_STAGE_SECONDS.labels('inference')
+TRACKING_SECONDS = FRAME_STAGE_SECONDS.labels('tracking')
+PROJECTION_SECONDS = FRAME_STAGE_SECONDS.labels('projection')
+BACKEND_REQUEST_SECONDS = histogram('backend_request_seconds', 'Backend HTTP request latency by operation', ['operation'])
+BACKEND_FAILURES = counter('backend_request_failures_total', 'Failed backend HTTP requests by operation', ['operation'])
+FRAMES_PROCESSED = counter('frames_processed_total', 'Frames run through detection and tracking')
+FRAMES_DROPPED = counter('frames_dropped_total', 'Frames that failed to decode before the end of the source')
+BACKEND_CALLS_SAVED = counter('backend_calls_saved_total', 'Human create/delete calls avoided by track debouncing', ['operation'])
+DETECTOR_INPUT_SIZE = gauge('detector_imgsz', 'Inference input size chosen per camera', ['camera']).labels('video')
+
+DETECTOR_INPUT_SIZE.set(DETECTOR_IMGSZ)
+
+profiler = FrameProfiler.from_env('tracking_service')
+detection_cache = DetectionCache(os.getenv('DETECTION_CACHE_DIR', 'cache/detections'))
 
 homography_matrix = None
 calibration_data = None
-track_to_human_map = {}
+lifecycle = None
+presence = None
+event_batcher = None
+map_data = None
 image_dimensions = None
+room_index = None
+heatmap = None
+resolution_tuner = None
+# FrameBus of the running track_video, /api/first_frame and /api/live_frame read from it instead of opening the video again
+active_bus = None
+active_bus_lock = threading.Lock()
 
 def load_map_data():
-    global image_dimensions
+    global map_data, image_dimensions, room_index, heatmap
     try:
         response = requests.get(f'{BACKEND_URL}/api/map', timeout=5)
         if response.status_code == 200:
             map_data = response.json()
             image_dimensions = map_data.get('image_dimensions')
-            print(f"Loaded map dimensions: {image_dimensions}")
+            room_index = RoomIndex.from_map(map_data)
+            # built once, so the heatmap keeps accumulating across map reloads
+            if heatmap is None:
+                heatmap = OccupancyHeatmap.from_map(map_data, half_life=HEATMAP_HALF_LIFE, window=HEATMAP_WINDOW,
+                                                    windows=HEATMAP_WINDOWS)
+            print(f"Loaded map dimensions: {image_dimensions}, {len(room_index.guids) if room_index else 0} rooms")
     except Exception as e:
         print(f"Error loading map data: {e}")
 
@@ -51,13 +127,14 @@ def save_calibration(camera_points, map_points, matrix):
             'matrix': matrix.tolist()
         }, f, indent=2)
 
-def transform_point(x, y):
+def transform_points(points):
     if homography_matrix is None:
         return None
 
-    point = np.array([[[x, y]]], dtype=np.float32)
-    transformed = cv2.perspectiveTransform(point, homography_matrix)
-    return (float(transformed[0][0][0]), float(transformed[0][0][1]))
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+    if len(points) == 0:
+        return np.zeros((0, 2))
+    return cv2.perspectiveTransform(points, homography_matrix).reshape(-1, 2).astype(np.float64)
 
 def block_to_world_coords(block_x, block_y):
     if image_dimensions is None:
@@ -72,26 +149,57 @@ def block_to_world_coords(block_x, block_y):
 
     return (world_x, world_y)
 
+def project_to_world(boxes):
+    # foot point of each ltrb box (bottom centre, integer pixels) -> world coordinates, (N, 2)
+    if homography_matrix is None:
+        return None
+
+    corners = np.asarray(boxes).reshape(-1, 4).astype(np.int64)
+    feet = np.stack([(corners[:, 0] + corners[:, 2]) // 2, corners[:, 3]], axis=1)
+    block_points = transform_points(feet)
+    world_x, world_y = block_to_world_coords(block_points[:, 0], block_points[:, 1])
+    return np.stack([world_x, world_y], axis=1)
+
 @app.route('/api/first_frame', methods=['GET'])
 def get_first_frame():
     if not os.path.exists(VIDEO_PATH):
         return jsonify({'error': 'Video file not found'}), 404
 
-    cap = cv2.VideoCapture(VIDEO_PATH)
-    ret, frame = cap.read()
-    cap.release()
+    # while a run is decoding the video, its bus already holds frame 0
+    with active_bus_lock:
+        frame = active_bus.first_frame.image if active_bus is not None else None
 
-    if not ret:
-        return jsonify({'error': 'Failed to read video'}), 500
+    if frame is None:
+        cap = cv2.VideoCapture(VIDEO_PATH)
+        ret, frame = cap.read()
+        cap.release()
 
+        if not ret:
+            return jsonify({'error': 'Failed to read video'}), 500
+
+    return jsonify(frame_response(frame, 0))
+
+@app.route('/api/live_frame', methods=['GET'])
+def get_live_frame():
+    # newest frame of the running /api/process, read from its frame bus without decoding again
+    with active_bus_lock:
+        snapshot = active_bus.snapshot() if active_bus is not None else None
+
+    if snapshot is None:
+        return jsonify({'error': 'No video is being processed'}), 404
+
+    return jsonify(frame_response(snapshot.image, snapshot.index))
+
+def frame_response(frame, frame_index):
     _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
     frame_base64 = base64.b64encode(buffer).decode('utf-8')
 
-    return jsonify({
+    return {
         'frame_base64': frame_base64,
         'width': frame.shape[1],
-        'height': frame.shape[0]
-    })
+        'height': frame.shape[0],
+        'frame_index': frame_index
+    }
 
 @app.route('/api/calibrate', methods=['POST'])
 def calibrate():
@@ -125,6 +233,48 @@ def calibrate():
 
     return jsonify({'message': 'Calibrated successfully'})
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return REGISTRY.render(), 200, {'Content-Type': CONTENT_TYPE}
+
+@app.route('/api/profile', methods=['GET'])
+def get_profile():
+    return jsonify(profiler.status())
+
+@app.route('/api/profile', methods=['POST'])
+def request_profile():
+    data = request.json or {}
+    try:
+        profiler.request(data.get('mode', 'sampling'), data.get('frames'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(profiler.status())
+
+@app.route('/api/presence', methods=['GET'])
+def get_presence():
+    if presence is None:
+        return jsonify({'error': 'Presence output not running'}), 404
+
+    return jsonify({'occupancy': presence.occupancy_by_room(), 'pending_events': len(event_batcher.pending)})
+
+@app.route('/api/heatmap', methods=['GET'])
+def get_heatmap():
+    if heatmap is None:
+        return jsonify({'error': 'Map not loaded'}), 404
+
+    if request.args.get('format', 'png') == 'npz':
+        return Response(heatmap.to_npz(), mimetype='application/octet-stream')
+    return Response(heatmap.to_png(), mimetype='image/png')
+
+@app.route('/api/detector', methods=['GET'])
+def get_detector_status():
+    return jsonify({
+        'backend': DETECTOR_BACKEND,
+        'imgsz': DETECTOR_IMGSZ if resolution_tuner is None else resolution_tuner.imgsz,
+        'auto_imgsz': None if resolution_tuner is None else resolution_tuner.status(),
+    })
+
 @app.route('/api/calibration', methods=['GET'])
 def get_calibration():
     if calibration_data is None:
@@ -132,116 +282,342 @@ def get_calibration():
 
     return jsonify(calibration_data)
 
+def get_detector():
+    global detector
+    with models_lock:
+        if detector is None:
+            detector = create_detector(DETECTOR_BACKEND, 'yolov8n.pt', DETECTOR_IMGSZ, DETECTOR_INT8)
+    return detector
+
+def get_tracker(name):
+    with models_lock:
+        if name not in trackers:
+            trackers[name] = create_tracker(name, **tracker_kwargs(name, EMBED_INTERVAL))
+    return trackers[name]
+
+def warm_up():
+    start = time.perf_counter()
+    load_map_data()
+    try:
+        get_detector()
+        get_tracker(TRACKER)
+        print(f"Loaded {DETECTOR_BACKEND} detector and {TRACKER} tracker in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        print(f"Error loading models: {e}")
+
+def start_warmup():
+    threading.Thread(target=warm_up, daemon=True).start()
+
 def create_human_on_backend():
+    start = time.perf_counter()
     try:
         response = requests.post(f'{BACKEND_URL}/api/humans', timeout=2)
         if response.status_code == 200:
             human_data = response.json()
             return human_data['id']
+        BACKEND_FAILURES.labels('create_human').inc()
     except Exception as e:
+        BACKEND_FAILURES.labels('create_human').inc()
         print(f"Error creating human: {e}")
+    finally:
+        BACKEND_REQUEST_SECONDS.labels('create_human').observe(time.perf_counter() - start)
     return None
 
 def move_human_on_backend(human_id, x, y):
+    start = time.perf_counter()
     try:
-        requests.put(f'{BACKEND_URL}/api/humans/{human_id}/move',
+        response = requests.put(f'{BACKEND_URL}/api/humans/{human_id}/move',
                     json={'x': x, 'y': y},
                     timeout=2)
+        if response.status_code != 200:
+            BACKEND_FAILURES.labels('move_human').inc()
     except Exception as e:
+        BACKEND_FAILURES.labels('move_human').inc()
         print(f"Error moving human {human_id}: {e}")
+    finally:
+        BACKEND_REQUEST_SECONDS.labels('move_human').observe(time.perf_counter() - start)
 
 def delete_human_on_backend(human_id):
+    start = time.perf_counter()
     try:
-        requests.delete(f'{BACKEND_URL}/api/humans/{human_id}', timeout=2)
+        response = requests.delete(f'{BACKEND_URL}/api/humans/{human_id}', timeout=2)
+        if response.status_code != 200:
+            BACKEND_FAILURES.labels('delete_human').inc()
     except Exception as e:
+        BACKEND_FAILURES.labels('delete_human').inc()
         print(f"Error deleting human {human_id}: {e}")
+    finally:
+        BACKEND_REQUEST_SECONDS.labels('delete_human').observe(time.perf_counter() - start)
+
+def post_events_to_backend(events):
+    start = time.perf_counter()
+    try:
+        response = requests.post(f'{BACKEND_URL}/api/events/batch', json=events, timeout=2)
+        if response.status_code == 200:
+            return True
+        BACKEND_FAILURES.labels('post_events').inc()
+    except Exception as e:
+        BACKEND_FAILURES.labels('post_events').inc()
+        print(f"Error posting {len(events)} events: {e}")
+    finally:
+        BACKEND_REQUEST_SECONDS.labels('post_events').observe(time.perf_counter() - start)
+    return False
+
+def observe_decode(seconds):
+    DECODE_SECONDS.observe(seconds)
+    profiler.record('decode', seconds)
 
 @app.route('/api/process', methods=['POST'])
 def process_video():
-    global track_to_human_map
-
     if not os.path.exists(VIDEO_PATH):
         return jsonify({'error': 'Video file not found'}), 404
 
-    cap = cv2.VideoCapture(VIDEO_PATH)
-
-    track_to_human_map = {}
-    previous_track_ids = set()
-    frame_count = 0
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        results = model(frame, classes=[0], conf=0.5, verbose=False)
-
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                confidence = box.conf[0].cpu().numpy()
-                bbox = [int(x1), int(y1), int(x2 - x1), int(y2 - y1)]
-                detections.append((bbox, confidence, 'person'))
-
-        tracks = tracker.update_tracks(detections, frame=frame)
-
-        current_track_ids = set()
-
-        for track in tracks:
-            if not track.is_confirmed():
-                continue
-
-            track_id = track.track_id
-            current_track_ids.add(track_id)
-
-            bbox = track.to_ltrb()
-            x1, y1, x2, y2 = int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])
-
-            foot_x = (x1 + x2) // 2
-            foot_y = y2
-
-            if homography_matrix is not None:
-                block_coords = transform_point(foot_x, foot_y)
-                if block_coords:
-                    block_x, block_y = block_coords
-                    world_x, world_y = block_to_world_coords(block_x, block_y)
-
-                    if track_id not in track_to_human_map:
-                        human_id = create_human_on_backend()
-                        if human_id:
-                            track_to_human_map[track_id] = human_id
-                            print(f"Created human {human_id} for track {track_id}")
-
-                    if track_id in track_to_human_map:
-                        human_id = track_to_human_map[track_id]
-                        move_human_on_backend(human_id, world_x, world_y)
+    data = request.get_json(silent=True) or {}
+    tracker_name = data.get('tracker', TRACKER)
+    if tracker_name not in TRACKERS:
+        return jsonify({'error': f'Unknown tracker {tracker_name}'}), 400
+
+    output = data.get('output', TRACKING_OUTPUT)
+    if output not in ('positions', 'presence'):
+        return jsonify({'error': f'Unknown output {output}'}), 400
+
+    if image_dimensions is None or (output == 'presence' and room_index is None):
+        load_map_data()
+    if output == 'presence' and room_index is None:
+        return jsonify({'error': 'Room data not available'}), 503
+
+    tracker_key = f'{tracker_name}:{EMBED_INTERVAL}' if tracker_name == 'selective' else tracker_name
+    detection_conf = TRACKERS[tracker_name].detection_conf
+    cache_key = detection_cache.key(VIDEO_PATH, DETECTOR_MODEL, detection_conf, tracker_key)
+    cached_tracks = detection_cache.load(cache_key) if data.get('use_cache', True) and not DETECTION_LOG else None
+    start_run(output, data.get('grace_frames', TRACK_GRACE_FRAMES))
+
+    # detection logs and input size tuning only exist in the sequential track_video path
+    parallel = cached_tracks is None and not DETECTION_LOG and not DETECTOR_AUTO_IMGSZ and bool(data.get('parallel', False))
+    segments = None
+    try:
+        if cached_tracks is not None:
+            frame_count = replay_tracks(cached_tracks)
+        elif parallel:
+            try:
+                table, segments = process_segments(VIDEO_PATH, tracker_name, data.get('workers'), SEGMENT_OVERLAP,
+                                                   DETECTOR_BACKEND, 'yolov8n.pt', DETECTOR_IMGSZ, DETECTOR_INT8,
+                                                   EMBED_INTERVAL)
+            except IOError:
+                raise
+            except Exception as e:
+                # a worker failed (e.g. a seek that missed its segment start); the sequential path needs no seeks
+                print(f"Parallel processing failed, tracking sequentially: {e}")
+                parallel = False
+            else:
+                FRAMES_PROCESSED.inc(table.total_frames)
+                store_tracks(cache_key, table, detection_conf, tracker_key)
+                frame_count = replay_tracks(table)
+        if cached_tracks is None and not parallel:
+            frame_count = track_video(tracker_name, cache_key, tracker_key)
+    except IOError:
+        return jsonify({'error': 'Failed to read video'}), 500
+    finally:
+        # also on failures, so the presence batcher thread is closed and pending humans are flushed
+        summary = finish_run()
 
-        disappeared_tracks = previous_track_ids - current_track_ids
-        for track_id in disappeared_tracks:
-            if track_id in track_to_human_map:
-                human_id = track_to_human_map[track_id]
-                delete_human_on_backend(human_id)
-                del track_to_human_map[track_id]
-                print(f"Deleted human {human_id} for track {track_id}")
+    return jsonify(dict(summary, **{
+        'total_frames': frame_count,
+        'tracker': tracker_name,
+        'cached': cached_tracks is not None,
+        'segments': segments,
+        'message': 'Processing complete'
+    }))
+
+def start_run(output, grace_frames):
+    global lifecycle, presence, event_batcher
+    if output == 'presence':
+        # people only exist locally; the backend hears about room transitions
+        presence = PresenceTracker(room_index, PRESENCE_MIN_FRAMES)
+        event_batcher = EventBatcher(post_events_to_backend, PRESENCE_BATCH_SECONDS)
+        event_batcher.start()
+        person_ids = itertools.count(1)
+        lifecycle = TrackLifecycle(lambda: f'person-{next(person_ids)}', lambda human_id, x, y: None, presence.leave,
+                                   grace_frames=grace_frames, reattach_distance=TRACK_REATTACH_DISTANCE)
+    else:
+        presence = event_batcher = None
+        lifecycle = TrackLifecycle(create_human_on_backend, move_human_on_backend, delete_human_on_backend,
+                                   grace_frames=grace_frames, reattach_distance=TRACK_REATTACH_DISTANCE)
+    profiler.begin_run()
+
+def finish_run():
+    lifecycle.flush()
+    if presence is None:
+        BACKEND_CALLS_SAVED.labels('create_human').inc(lifecycle.saved)
+        BACKEND_CALLS_SAVED.labels('delete_human').inc(lifecycle.saved)
+    else:
+        event_batcher.add(presence.drain())
+        event_batcher.close()
+    profiler.finish()
+
+    return {
+        'humans': lifecycle.stats(),
+        'presence': None if presence is None else {
+            'events_sent': event_batcher.events_sent,
+            'batches_sent': event_batcher.batches_sent,
+            'events_pending': len(event_batcher.pending),
+            'events_dropped': event_batcher.events_dropped,
+        },
+    }
 
-        previous_track_ids = current_track_ids
-        frame_count += 1
+def track_video(tracker_name, cache_key, tracker_key):
+    global resolution_tuner, active_bus
+    detector = get_detector()
+    tracker = get_tracker(tracker_name)
+    tracker.reset()
+
+    # decoding runs on the bus thread, overlapping with inference on this one
+    bus = FrameBus(VIDEO_PATH, slots=8, lossless=True, on_decoded=observe_decode)
+    reader = bus.reader()
+    bus.start()
+    with active_bus_lock:
+        active_bus = bus
+
+    recorder = TrackRecorder()
+    detection_recorder = DetectionRecorder() if DETECTION_LOG else None
+    if DETECTOR_AUTO_IMGSZ:
+        resolution_tuner = ResolutionTuner.up_to(DETECTOR_IMGSZ)
+    frame_count = 0
+    epoch, frame_seconds = video_clock(bus.fps, bus.frame_count)
+    # CAP_PROP_FRAME_COUNT overestimates for many containers, the end of the stream marks a complete run
+    completed = False
 
-    for track_id, human_id in list(track_to_human_map.items()):
-        delete_human_on_backend(human_id)
-        print(f"Cleanup: Deleted human {human_id} for track {track_id}")
+    try:
+        while True:
+            profiler.frame_started()
+            frame_data = reader.read()
+            if frame_data is None:
+                completed = bus.ended
+                FRAMES_DROPPED.inc(bus.dropped)
+                break
+            frame = frame_data.image
+
+            stage_start = time.perf_counter()
+            if resolution_tuner is None:
+                raw_detections = detector.detect(frame, tracker.detection_conf)
+            else:
+                imgsz = resolution_tuner.next_size()
+                raw_detections = detector.detect(frame, tracker.detection_conf, imgsz)
+                resolution_tuner.observe(raw_detections, frame.shape, imgsz)
+                DETECTOR_INPUT_SIZE.set(resolution_tuner.imgsz)
+            detections = detections_from_boxes(raw_detections)
+            elapsed = time.perf_counter() - stage_start
+            INFERENCE_SECONDS.observe(elapsed)
+            profiler.record('inference', elapsed)
+            if detection_recorder is not None:
+                # the file is decoded ahead of inference, so video time paces the replay
+                detection_recorder.add('video', frame_data.index,
+                                       frame_data.index / bus.fps if bus.fps else frame_data.timestamp, raw_detections)
+
+            stage_start = time.perf_counter()
+            tracks = tracker.update(detections, frame)
+            elapsed = time.perf_counter() - stage_start
+            TRACKING_SECONDS.observe(elapsed)
+            profiler.record('tracking', elapsed)
+
+            confirmed = [track for track in tracks if track.is_confirmed()]
+            track_ids = [track.track_id for track in confirmed]
+            boxes = np.array([track.to_ltrb() for track in confirmed], dtype=np.float64).reshape(-1, 4)
+            recorder.add_frame(frame_count, track_ids, boxes, [track.det_conf for track in confirmed])
+
+            stage_start = time.perf_counter()
+            world_points = project_to_world(boxes)
+            elapsed = time.perf_counter() - stage_start
+            PROJECTION_SECONDS.observe(elapsed)
+            profiler.record('projection', elapsed)
+            FRAMES_PROCESSED.inc()
+
+            stage_start = time.perf_counter()
+            sync_frame(track_ids, world_points, epoch + frame_data.index * frame_seconds, frame_seconds)
+            profiler.record('backend', time.perf_counter() - stage_start)
+
+            frame_count += 1
+            profiler.frame_finished()
+    finally:
+        with active_bus_lock:
+            active_bus = None
+        reader.close()
+        bus.close()
+
+    if frame_count > 0 and completed:
+        store_tracks(cache_key, recorder.table(), tracker.detection_conf, tracker_key)
+    if detection_recorder is not None and len(detection_recorder):
+        save_detection_log(detection_recorder, tracker_name)
+    return frame_count
+
+def save_detection_log(recorder, tracker_name):
+    recorder.save(DETECTION_LOG, {
+        'source': 'tracking_service',
+        'video': os.path.abspath(VIDEO_PATH),
+        'model': DETECTOR_MODEL,
+        'tracker': tracker_name,
+        'embed_interval': EMBED_INTERVAL,
+        'homographies': {'video': None if homography_matrix is None else homography_matrix.tolist()},
+        'map': map_data,
+    })
+    print(f"Recorded {len(recorder)} frames of detections to {DETECTION_LOG}")
+
+def store_tracks(cache_key, table, detection_conf, tracker_key):
+    detection_cache.store(cache_key, table, {
+        'video': os.path.abspath(VIDEO_PATH),
+        'model': DETECTOR_MODEL,
+        'conf': detection_conf,
+        'tracker': tracker_key,
+    })
 
-    track_to_human_map = {}
+def replay_tracks(table):
+    # cached tracks only need the current homography: one vectorized projection for the whole video
+    stage_start = time.perf_counter()
+    world_points = project_to_world(table.bbox)
+    PROJECTION_SECONDS.observe(time.perf_counter() - stage_start)
+    cap = cv2.VideoCapture(VIDEO_PATH)
+    epoch, frame_seconds = video_clock(cap.get(cv2.CAP_PROP_FPS), table.total_frames)
     cap.release()
 
-    return jsonify({
-        'total_frames': frame_count,
-        'message': 'Processing complete'
-    })
+    for frame_index, rows in table.frames():
+        profiler.frame_started()
+        track_ids = [str(track_id) for track_id in table.track_id[rows].tolist()]
+
+        stage_start = time.perf_counter()
+        sync_frame(track_ids, None if world_points is None else world_points[rows],
+                   epoch + frame_index * frame_seconds, frame_seconds)
+        profiler.record('backend', time.perf_counter() - stage_start)
+
+        profiler.frame_finished()
+    return table.total_frames
+
+def video_clock(fps, total_frames):
+    # heatmap time of frame i is epoch + i * frame_seconds: the video is placed so that it ends when the run
+    # starts, and every frame weighs the seconds it covers, so a cached replay spreads over the video's own
+    # duration and cells hold person-seconds like realtime_people_positioning.py
+    frame_seconds = 1.0 / (fps if fps and fps > 0 else DEFAULT_VIDEO_FPS)
+    return time.time() - total_frames * frame_seconds, frame_seconds
+
+def sync_frame(track_ids, world_points, frame_time, frame_seconds):
+    lifecycle.update(track_ids, world_points)
+    if heatmap is not None and world_points is not None:
+        heatmap.add(world_points, now=frame_time, weight=frame_seconds)
+    if presence is not None:
+        if world_points is not None:
+            human_ids = [lifecycle.humans.get(track_id) for track_id in track_ids]
+            presence.update(human_ids, room_index.lookup(world_points, nearest=True))
+        event_batcher.add(presence.drain())
+
+def create_app():
+    # entry point for WSGI servers and flask run, e.g. gunicorn 'tracking_service:create_app()'
+    load_calibration()
+    start_warmup()
+    return app
 
 if __name__ == '__main__':
-    load_map_data()
     load_calibration()
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    # the debug reloader's parent process only watches files and restarts the serving child, which warms up
+    # itself; without the reloader this is the serving process
+    if not FLASK_DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warmup()
+    app.run(host='0.0.0.0', port=5001, debug=FLASK_DEBUG)